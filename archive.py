@@ -0,0 +1,282 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, exists, insert, literal, select, text, tuple_
+
+from cache import response_cache
+from changes import prune_change_log
+from feed import decode_cursor, encode_cursor
+from fragments import data_versions
+from models import (CLOSED_APPLICATION_SQL, Application, ArchivedApplication, ArchivedComment,
+                    ArchivedPost, Comment, Post)
+
+# Accepted and rejected applications older than this move to the archive
+APPLICATION_RETENTION_DAYS = int(os.environ.get("ARCHIVE_APPLICATIONS_AFTER_DAYS", "180"))
+# Posts older than this with no comment in as long move, with their comments
+POST_RETENTION_DAYS = int(os.environ.get("ARCHIVE_POSTS_AFTER_DAYS", "365"))
+# Rows moved per transaction. Each batch holds the write lock only briefly,
+# so request writes interleave with a long archival run.
+BATCH_SIZE = 1000
+# Seconds between scheduled runs; 0 disables the scheduler
+INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600"))
+# Free pages handed back to the filesystem per incremental vacuum step
+VACUUM_PAGES = 2000
+ARCHIVE_PAGE_SIZE = 50
+
+logger = logging.getLogger(__name__)
+
+_APPLICATION_COLUMNS = ["id", "student_id", "opportunity_id", "status", "applied_at"]
+_POST_COLUMNS = ["id", "author_id", "title", "content", "domain", "created_at", "comment_count"]
+_COMMENT_COLUMNS = ["id", "post_id", "author_id", "content", "created_at"]
+
+
+@dataclass
+class ArchiveReport:
+    applications: int = 0
+    posts: int = 0
+    comments: int = 0
+    batches: int = 0
+    vacuumed_pages: int = 0
+    pruned_changes: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "applications": self.applications, "posts": self.posts, "comments": self.comments,
+            "batches": self.batches, "vacuumed_pages": self.vacuumed_pages,
+            "pruned_changes": self.pruned_changes,
+            "seconds": round(self.seconds, 3),
+        }
+
+    def summary(self) -> str:
+        return (f"archived {self.applications:,} applications, {self.posts:,} posts and "
+                f"{self.comments:,} comments in {self.batches:,} batches, "
+                f"vacuumed {self.vacuumed_pages:,} pages in {self.seconds:.2f}s")
+
+
+def _copy(conn, archive, model, columns: List[str], condition, now: datetime) -> int:
+    source = select(*[getattr(model, c) for c in columns], literal(now)).where(condition)
+    return conn.execute(insert(archive).from_select(columns + ["archived_at"], source)).rowcount
+
+
+def archive_applications(engine, before: datetime, batch_size: int = BATCH_SIZE,
+                         report: Optional[ArchiveReport] = None,
+                         stop: Optional[threading.Event] = None) -> ArchiveReport:
+    """
+    Move accepted and rejected applications made before `before` to
+    applications_archive, `batch_size` per transaction.
+
+    Candidates are walked in (applied_at, id) order on a partial index of
+    closed applications, continuing after the last one seen, so each batch
+    reads only the rows it moves.
+    Setting `stop` ends the run after the current batch.
+    """
+    report = report or ArchiveReport()
+    position = None
+    while not (stop and stop.is_set()):
+        with engine.begin() as conn:
+            query = select(Application.id, Application.applied_at).where(
+                Application.applied_at < before, text(CLOSED_APPLICATION_SQL))
+            if position is not None:
+                query = query.where(tuple_(Application.applied_at, Application.id) > tuple_(*position))
+            rows = conn.execute(
+                query.order_by(Application.applied_at, Application.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return report
+            ids = [row.id for row in rows]
+            position = tuple(rows[-1])
+            # Copied first: the counter triggers skip deletes of archived ids
+            _copy(conn, ArchivedApplication, Application, _APPLICATION_COLUMNS,
+                  Application.id.in_(ids), datetime.utcnow())
+            report.applications += conn.execute(delete(Application).where(Application.id.in_(ids))).rowcount
+            report.batches += 1
+        _announce("applications")
+    return report
+
+
+def archive_posts(engine, before: datetime, batch_size: int = BATCH_SIZE,
+                  report: Optional[ArchiveReport] = None,
+                  stop: Optional[threading.Event] = None) -> ArchiveReport:
+    """
+    Move posts created before `before` that have had no comment since, and
+    their comments, to posts_archive and comments_archive.
+    """
+    report = report or ArchiveReport()
+    recent_comment = exists().where(Comment.post_id == Post.id, Comment.created_at >= before)
+    position = None
+    while not (stop and stop.is_set()):
+        with engine.begin() as conn:
+            query = select(Post.id, Post.created_at).where(Post.created_at < before, ~recent_comment)
+            if position is not None:
+                query = query.where(tuple_(Post.created_at, Post.id) > tuple_(*position))
+            rows = conn.execute(query.order_by(Post.created_at, Post.id).limit(batch_size)).all()
+            if not rows:
+                return report
+            ids = [row.id for row in rows]
+            position = tuple(rows[-1])
+            now = datetime.utcnow()
+            _copy(conn, ArchivedComment, Comment, _COMMENT_COLUMNS, Comment.post_id.in_(ids), now)
+            _copy(conn, ArchivedPost, Post, _POST_COLUMNS, Post.id.in_(ids), now)
+            report.comments += conn.execute(delete(Comment).where(Comment.post_id.in_(ids))).rowcount
+            report.posts += conn.execute(delete(Post).where(Post.id.in_(ids))).rowcount
+            report.batches += 1
+        _announce("posts")
+    return report
+
+
+def _announce(kind: str) -> None:
+    # Core writes bypass the session hooks. Totals, counters and "already
+    # applied" checks include the archive, so only rendered pages change.
+    response_cache.invalidate()
+    data_versions.bump(kind)
+
+
+def vacuum_step(engine, pages: int = VACUUM_PAGES) -> int:
+    """
+    Return up to `pages` free pages to the filesystem and checkpoint the WAL.
+
+    Unlike VACUUM neither blocks readers: incremental_vacuum is an ordinary
+    short write transaction and a PASSIVE checkpoint copies only what no
+    reader still needs. Does nothing on databases without incremental
+    auto-vacuum (see compact()). Returns the number of pages freed.
+    """
+    raw = engine.raw_connection()
+    try:
+        connection = raw.driver_connection
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        if free:
+            # execute() would step the pragma once, freeing a single page;
+            # executescript() runs it to completion
+            connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        freed = free - connection.execute("PRAGMA freelist_count").fetchone()[0]
+        connection.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        return freed
+    finally:
+        raw.close()
+
+
+def compact(engine) -> None:
+    """
+    Switch the database to incremental auto-vacuum and rebuild it with a
+    full VACUUM. Blocks all other access while it runs; meant for
+    `manage.py archive --vacuum` during maintenance, once per database.
+    """
+    raw = engine.raw_connection()
+    try:
+        raw.driver_connection.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+    finally:
+        raw.close()
+
+
+def run_archival(engine, application_days: int = APPLICATION_RETENTION_DAYS,
+                 post_days: int = POST_RETENTION_DAYS, batch_size: int = BATCH_SIZE,
+                 stop: Optional[threading.Event] = None) -> ArchiveReport:
+    """
+    One full pass: archive both kinds of rows, trim the change log (see
+    changes.py), then release the freed pages.
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    report = ArchiveReport()
+    archive_applications(engine, now - timedelta(days=application_days), batch_size, report, stop)
+    archive_posts(engine, now - timedelta(days=post_days), batch_size, report, stop)
+    with engine.begin() as conn:
+        report.pruned_changes = prune_change_log(conn)
+    while not (stop and stop.is_set()):
+        freed = vacuum_step(engine)
+        report.vacuumed_pages += freed
+        if freed < VACUUM_PAGES:
+            break
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+class ArchiveScheduler:
+    """
+    Runs run_archival() every `interval` seconds in a background thread.
+
+    Each batch is its own short transaction and the vacuum step never
+    blocks readers, so requests keep being served while it runs.
+    """
+
+    def __init__(self, interval: float = INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._engine = None
+        self.runs = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_report: Optional[ArchiveReport] = None
+        self.last_run_at: Optional[datetime] = None
+
+    def start(self, engine) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._engine = engine
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the batch in progress, if any."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.last_report = run_archival(self._engine, stop=self._stop)
+                self.runs += 1
+            except Exception as exc:
+                # Logged and retried at the next interval
+                logger.exception("archival run failed")
+                self.failures += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+            self.last_run_at = datetime.utcnow()
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "running": self._thread is not None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_report": self.last_report.as_dict() if self.last_report else None,
+        }
+
+
+archiver = ArchiveScheduler()
+
+
+def load_archived_applications(db, student_id: int, cursor: Optional[str] = None,
+                               limit: int = ARCHIVE_PAGE_SIZE):
+    """
+    A student's archived applications, newest first, continuing after
+    `cursor`. Returns (applications, next_cursor).
+    """
+    query = db.query(ArchivedApplication).filter(ArchivedApplication.student_id == student_id)
+    position = decode_cursor(cursor)
+    if position:
+        applied_at, application_id = position
+        query = query.filter(
+            tuple_(ArchivedApplication.applied_at, ArchivedApplication.id) < tuple_(applied_at, application_id)
+        )
+    rows = (query.order_by(ArchivedApplication.applied_at.desc(), ArchivedApplication.id.desc())
+            .limit(limit + 1).all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].applied_at, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+import json
+import os
+import stat
+from typing import Dict
+
+import anyio
+import jinja2
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip variants are built
+    brotli = None
+
+STATIC_DIR = "static"
+# Where `manage.py build-static` puts hashed copies, inside STATIC_DIR so the
+# same mount serves them
+BUILD_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Text assets get compressed variants; images and fonts already are compressed
+COMPRESSIBLE = {".css", ".js", ".mjs", ".svg", ".html", ".json", ".txt", ".map", ".xml"}
+# Variants in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+# A hashed file's content never changes under its name
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def hashed_name(path: str, content: bytes) -> str:
+    """css/style.css -> css/style.<first 12 hex digits of its SHA-256>.css"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _compressed(content: bytes) -> Dict[str, bytes]:
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    # A variant that is not smaller is not worth a Content-Encoding
+    return {suffix: data for suffix, data in variants.items() if len(data) < len(content)}
+
+
+def build_static(source: str = STATIC_DIR, build_dir: str = BUILD_DIR) -> Dict[str, str]:
+    """
+    Copy every file under `source` to `source`/`build_dir` under a content
+    hashed name, with .gz (and, if brotli is installed, .br) variants of
+    text assets, and write the manifest mapping each original path to its
+    hashed copy (both relative to `source`). Returns the manifest.
+
+    Copies from earlier builds are left in place, so pages or caches still
+    referring to an old hash keep working.
+    """
+    target = os.path.join(source, build_dir)
+    manifest = {}
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != target)
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(root, name), source).replace(os.sep, "/")
+            with open(os.path.join(source, path), "rb") as f:
+                content = f.read()
+            hashed = f"{build_dir}/{hashed_name(path, content)}"
+            output = os.path.join(source, hashed)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            variants = {"": content}
+            if os.path.splitext(path)[1].lower() in COMPRESSIBLE:
+                variants.update(_compressed(content))
+            for suffix, data in variants.items():
+                with open(output + suffix, "wb") as f:
+                    f.write(data)
+            manifest[path] = hashed
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(source: str = STATIC_DIR, build_dir: str = BUILD_DIR) -> Dict[str, str]:
+    """The last build's manifest, or {} if the assets were never built."""
+    try:
+        with open(os.path.join(source, build_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def install_asset_urls(env: jinja2.Environment, manifest: Dict[str, str]) -> None:
+    """
+    Add `static_url(path)` to templates: the URL of the hashed copy of
+    `path` when built, else of `path` itself.
+    """
+    @jinja2.pass_context
+    def static_url(context, path: str):
+        return context["request"].url_for("static", path=manifest.get(path, path))
+
+    env.globals["static_url"] = static_url
+
+
+def accepted_encodings(scope) -> set:
+    """Content codings the client accepts (q=0 means refused)."""
+    accepted = set()
+    for part in Headers(scope=scope).get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves built assets (the hashed paths in `manifest`)
+    from their precompressed variant when the client accepts one, with
+    `Cache-Control: immutable`. Other files are served as before.
+    """
+
+    def __init__(self, *, manifest: Dict[str, str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.immutable = set((manifest or {}).values())
+
+    async def get_response(self, path: str, scope):
+        if path not in self.immutable:
+            return await super().get_response(path, scope)
+        response = None
+        accepted = accepted_encodings(scope)
+        for coding, suffix in ENCODINGS:
+            if coding in accepted:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    # Content-Type is guessed from the name before the suffix
+                    response = self.file_response(full_path, stat_result, scope)
+                    response.headers["content-encoding"] = coding
+                    break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["cache-control"] = IMMUTABLE
+        response.headers["vary"] = "Accept-Encoding"
+        return response
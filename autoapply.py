@@ -0,0 +1,191 @@
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Set
+
+from sqlalchemy import event, exists, func, literal, select, true
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from broadcast import broadcaster
+from cache import response_cache
+from fragments import data_versions
+from models import Application, ArchivedApplication, Opportunity, Student
+from recommendations import recommender
+from search import ranked_matches
+from stats import stats
+
+# Created applications are announced to live-update clients one by one up
+# to this many per call; past that one "applications" summary goes out
+EVENT_LIMIT = 100
+
+
+@dataclass
+class AutoApplyReport:
+    matched: int = 0   # eligible (student, opportunity) pairs
+    created: int = 0
+    skipped: int = 0   # already applied
+    seconds: float = 0.0
+    # students who got at least one new application
+    students: Set[int] = field(default_factory=set)
+    # (id, student_id, opportunity_id, status) of the first EVENT_LIMIT created
+    created_rows: List[tuple] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        return self.created / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "matched": self.matched, "created": self.created, "skipped": self.skipped,
+            "students": len(self.students), "seconds": round(self.seconds, 3),
+            "applications_per_second": round(self.rate, 1),
+        }
+
+    def summary(self) -> str:
+        return (f"{self.matched:,} matched, {self.created:,} created, {self.skipped:,} already applied "
+                f"for {len(self.students):,} students in {self.seconds:.2f}s ({self.rate:,.0f}/s)")
+
+
+def eligible_pairs(student_ids: Optional[Sequence[int]] = None, cohort_domain: Optional[str] = None,
+                   min_incoscore: Optional[float] = None, opportunity_ids: Optional[Sequence[int]] = None,
+                   domain: Optional[str] = None, match_interest: bool = True,
+                   posted_within_days: Optional[int] = None, keyword: Optional[str] = None):
+    """
+    SELECT of (student_id, opportunity_id) for every student in the cohort
+    and every opportunity matching the criteria.
+
+    The cohort is `student_ids`, students interested in `cohort_domain`,
+    students with at least `min_incoscore`, or the intersection of those
+    given; at least one is required. Opportunities must be in `domain`
+    (when it is None: in each student's own domain_interest, unless
+    `match_interest` is off), among `opportunity_ids`, posted within the
+    last `posted_within_days` days and match `keyword` in the full-text
+    index, where given. Pairs with an archived application are left out,
+    so closed applications are not made again once archived. Raises
+    ValueError on an empty cohort or keyword.
+    """
+    if student_ids is None and cohort_domain is None and min_incoscore is None:
+        raise ValueError("give student ids, a cohort domain or a minimum InCoScore")
+    conditions = [true()]  # SQLite needs a WHERE before ON CONFLICT in INSERT ... SELECT
+    if student_ids is not None:
+        conditions.append(Student.id.in_(student_ids))
+    if cohort_domain is not None:
+        conditions.append(Student.domain_interest == cohort_domain)
+    if min_incoscore is not None:
+        conditions.append(Student.incoscore >= min_incoscore)
+    if opportunity_ids is not None:
+        conditions.append(Opportunity.id.in_(opportunity_ids))
+    if posted_within_days is not None:
+        conditions.append(Opportunity.posted_date >= date.today() - timedelta(days=posted_within_days))
+    if keyword:
+        matches = ranked_matches(keyword)
+        if matches is None:
+            raise ValueError(f"no searchable words in {keyword!r}")
+        conditions.append(Opportunity.id.in_(select(matches.c.opportunity_id)))
+    conditions.append(~exists().where(
+        ArchivedApplication.student_id == Student.id,
+        ArchivedApplication.opportunity_id == Opportunity.id
+    ))
+    if domain is not None:
+        on_domain = Opportunity.domain == domain
+    elif match_interest:
+        on_domain = Opportunity.domain == Student.domain_interest
+    else:
+        on_domain = true()
+    return (
+        select(Student.id.label("student_id"), Opportunity.id.label("opportunity_id"))
+        .select_from(Student).join(Opportunity, on_domain)
+        .where(*conditions)
+    )
+
+
+def apply_matching(conn, **criteria) -> AutoApplyReport:
+    """
+    Create every missing application for the criteria of eligible_pairs()
+    in one INSERT ... SELECT ... ON CONFLICT DO NOTHING on `conn` (a
+    Connection or Session; the caller commits).
+
+    The unique (student_id, opportunity_id) index makes this idempotent and
+    safe against concurrent applies: pairs that already exist are skipped
+    by SQLite rather than checked for first.
+    """
+    started = time.perf_counter()
+    pairs = eligible_pairs(**criteria).subquery()
+    report = AutoApplyReport()
+    report.matched = conn.execute(select(func.count()).select_from(pairs)).scalar_one()
+    if report.matched:
+        statement = (
+            insert(Application)
+            .from_select(
+                ["student_id", "opportunity_id", "status", "applied_at"],
+                select(pairs.c.student_id, pairs.c.opportunity_id,
+                       literal("submitted"), literal(datetime.utcnow())).where(true())
+            )
+            .on_conflict_do_nothing(index_elements=["student_id", "opportunity_id"])
+            .returning(Application.id, Application.student_id,
+                       Application.opportunity_id, Application.status)
+        )
+        for row in conn.execute(statement):
+            report.created += 1
+            report.students.add(row.student_id)
+            if len(report.created_rows) < EVENT_LIMIT:
+                report.created_rows.append(tuple(row))
+    report.skipped = report.matched - report.created
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def announce(report: AutoApplyReport) -> None:
+    """
+    Tell the in-memory caches and live clients about committed applications.
+
+    Core inserts bypass the session hooks, so this does their work: stats,
+    the response cache, data versions, per-student recommendations and
+    live-update events.
+    """
+    if not report.created:
+        return
+    stats.record("applications", report.created)
+    response_cache.invalidate()
+    data_versions.bump("applications")
+    recommender.forget(report.students)
+    if report.created <= EVENT_LIMIT:
+        for aid, sid, oid, status in report.created_rows:
+            broadcaster.publish(
+                "application", ("applications", f"opportunity:{oid}", f"student:{sid}"),
+                {"id": aid, "student_id": sid, "opportunity_id": oid, "status": status}
+            )
+    else:
+        broadcaster.publish("applications", ("applications",),
+                            {"count": report.created, "students": len(report.students)})
+
+
+def auto_apply(engine, **criteria) -> AutoApplyReport:
+    """Apply in a transaction of its own; see eligible_pairs() for the criteria."""
+    with engine.begin() as conn:
+        report = apply_matching(conn, **criteria)
+    announce(report)
+    return report
+
+
+def apply_in_session(db: Session, **criteria) -> AutoApplyReport:
+    """
+    Apply as part of the session's transaction (e.g. a write queue job).
+    The report is announced once the session commits.
+    """
+    report = apply_matching(db, **criteria)
+    if report.created:
+        db.info.setdefault("auto_apply_reports", []).append(report)
+    return report
+
+
+@event.listens_for(Session, "after_commit")
+def _announce_applied(session):
+    for report in session.info.pop("auto_apply_reports", ()):
+        announce(report)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_applied(session):
+    session.info.pop("auto_apply_reports", None)
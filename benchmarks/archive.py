@@ -0,0 +1,150 @@
+"""
+Hot-table size and listing latency before and after archival.
+
+Fills a throwaway database at a synthetic scale, times the listings that
+read the hot tables (a student's applications, the dashboard's recent
+applications, the first feed page), runs one archival pass while a reader
+thread keeps querying, then times the listings again. Reports the size of
+each hot table, the archival rate, and the slowest read seen during the
+pass next to the slowest one before it.
+
+    python -m benchmarks.archive --scale medium
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+
+def table_bytes(conn, *tables: str) -> dict:
+    """table -> (bytes of pages, bytes of row data), indexes included."""
+    from sqlalchemy import text
+
+    return {
+        table: tuple(conn.execute(text(
+            "SELECT coalesce(sum(pgsize), 0), coalesce(sum(payload), 0) FROM dbstat WHERE name = :table "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table)"
+        ), {"table": table}).one())
+        for table in tables
+    }
+
+
+def timed(fn, runs: int) -> float:
+    """Median milliseconds of `runs` calls."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def listings(students: int, runs: int) -> dict:
+    from sqlalchemy.orm import joinedload
+
+    from database import ReadSessionLocal
+    from feed import load_feed
+    from models import Application
+
+    rng = random.Random(5)
+    db = ReadSessionLocal()
+    try:
+        return {
+            "profile applications": timed(lambda: db.query(Application).filter(
+                Application.student_id == rng.randint(1, students)).all(), runs),
+            "dashboard recent": timed(lambda: db.query(Application).options(
+                joinedload(Application.student), joinedload(Application.opportunity)
+            ).order_by(Application.applied_at.desc()).limit(10).all(), runs),
+            "feed first page": timed(lambda: load_feed(db), runs),
+        }
+    finally:
+        db.close()
+
+
+class Reader(threading.Thread):
+    """Reads the first feed page in a loop, keeping the slowest read."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stop = threading.Event()
+        self.reads = 0
+        self.slowest = 0.0
+
+    def run(self):
+        from database import ReadSessionLocal
+        from feed import load_feed
+
+        while not self.stop.is_set():
+            db = ReadSessionLocal()
+            try:
+                started = time.perf_counter()
+                load_feed(db)
+                self.slowest = max(self.slowest, (time.perf_counter() - started) * 1000)
+                self.reads += 1
+            finally:
+                db.close()
+
+
+def read_while(work) -> Reader:
+    reader = Reader()
+    reader.start()
+    try:
+        work()
+    finally:
+        reader.stop.set()
+        reader.join()
+    return reader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", default="small", help="synthetic scale (tiny, small, medium, full)")
+    parser.add_argument("--runs", type=int, default=50, help="timed calls per listing")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'archive.db')}"
+        from archive import run_archival
+        from benchmarks.synthetic import SCALES, generate
+        from database import engine
+        from migrations import migrate
+
+        scale = SCALES[args.scale]
+        migrate(engine)
+        generate(engine, scale)
+        hot = ("applications", "posts", "comments")
+
+        with engine.connect() as conn:
+            before_size = table_bytes(conn, *hot)
+        before = listings(scale.students, args.runs)
+        idle = read_while(lambda: time.sleep(2))
+
+        result = {}
+        during = read_while(lambda: result.setdefault("report", run_archival(engine)))
+        report = result["report"]
+
+        with engine.connect() as conn:
+            after_size = table_bytes(conn, *hot)
+        after = listings(scale.students, args.runs)
+
+        print(report.summary())
+        moved = report.applications + report.posts + report.comments
+        print(f"  {moved / report.seconds:,.0f} rows/s")
+        # Pages only go back to the freelist once emptied, so a table's page
+        # total shrinks less than the rows it holds
+        for table in hot:
+            (pages, data), (pages_after, data_after) = before_size[table], after_size[table]
+            print(f"{table:<22} pages {pages / 2**20:6.1f} MB -> {pages_after / 2**20:6.1f} MB, "
+                  f"rows {data / 2**20:6.1f} MB -> {data_after / 2**20:6.1f} MB")
+        for name in before:
+            print(f"{name:<22} {before[name]:8.2f} ms -> {after[name]:8.2f} ms (median)")
+        print(f"slowest feed read: {idle.slowest:.1f} ms idle ({idle.reads} reads), "
+              f"{during.slowest:.1f} ms during archival ({during.reads} reads)")
+
+
+if __name__ == "__main__":
+    main()
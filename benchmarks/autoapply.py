@@ -0,0 +1,130 @@
+"""
+Throughput of bulk auto-apply, and what it replaces.
+
+Fills a throwaway database, then:
+  - applies a cohort of --cohort students to every opportunity in their
+    domain posted in the last 90 days of the data, in one transaction,
+    and runs it again to show the repeat only skips;
+  - applies --pairs single (student, opportunity) pairs one transaction
+    each, the old way (SELECT, then INSERT if missing) and through
+    apply_in_session (INSERT ... ON CONFLICT DO NOTHING);
+  - has --threads threads apply the same pairs at once, without the write
+    queue, and counts failures under each approach.
+
+    python -m benchmarks.autoapply --opportunities 20000 --students 10000 --cohort 1000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+
+
+def old_apply(db, student_id: int, opportunity_id: int) -> None:
+    from models import Application
+
+    existing = db.query(Application).filter(
+        Application.student_id == student_id,
+        Application.opportunity_id == opportunity_id
+    ).first()
+    if not existing:
+        db.add(Application(student_id=student_id, opportunity_id=opportunity_id, status="submitted"))
+
+
+def new_apply(db, student_id: int, opportunity_id: int) -> None:
+    from autoapply import apply_in_session
+
+    apply_in_session(db, student_ids=[student_id], opportunity_ids=[opportunity_id], match_interest=False)
+
+
+def one_by_one(apply, pairs) -> float:
+    from database import SessionLocal
+
+    started = time.perf_counter()
+    for student_id, opportunity_id in pairs:
+        db = SessionLocal()
+        try:
+            apply(db, student_id, opportunity_id)
+            db.commit()
+        finally:
+            db.close()
+    return time.perf_counter() - started
+
+
+def race(apply, pairs, threads: int) -> int:
+    """Every thread applies every pair; returns how many attempts raised."""
+    from database import SessionLocal
+
+    failures = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        nonlocal failures
+        barrier.wait()
+        for student_id, opportunity_id in pairs:
+            db = SessionLocal()
+            try:
+                apply(db, student_id, opportunity_id)
+                db.commit()
+            except Exception:
+                db.rollback()
+                with lock:
+                    failures += 1
+            finally:
+                db.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--opportunities", type=int, default=20_000)
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--applications", type=int, default=50_000, help="existing applications")
+    parser.add_argument("--cohort", type=int, default=1000, help="students in the bulk apply")
+    parser.add_argument("--pairs", type=int, default=500, help="single applies timed one by one")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'autoapply.db')}"
+        from autoapply import auto_apply
+        from benchmarks.synthetic import FIRST_POSTED, POSTED_DAYS, Scale, generate
+        from database import engine
+        from migrations import migrate
+
+        migrate(engine)
+        generate(engine, Scale(args.opportunities, args.students, args.applications, 0, 0))
+
+        # The last 90 days of the generated posting window
+        days = (date.today() - FIRST_POSTED).days - POSTED_DAYS + 90
+        cohort = list(range(1, args.cohort + 1))
+        for label in ("bulk apply", "same again"):
+            report = auto_apply(engine, student_ids=cohort, posted_within_days=days)
+            print(f"{label:<12} {report.summary()}")
+
+        # Pairs nobody has applied to yet: the last students, the first opportunities
+        pairs = [(args.students - i, 1 + i % args.opportunities) for i in range(args.pairs)]
+        old_seconds = one_by_one(old_apply, pairs[: args.pairs // 2])
+        new_seconds = one_by_one(new_apply, pairs[args.pairs // 2:])
+        half = args.pairs // 2
+        print(f"single applies, one transaction each: old {half / old_seconds:,.0f}/s, "
+              f"new {half / new_seconds:,.0f}/s")
+
+        fresh = [(args.students - args.pairs - i, 1 + i % args.opportunities) for i in range(50)]
+        old_failures = race(old_apply, fresh[:25], args.threads)
+        new_failures = race(new_apply, fresh[25:], args.threads)
+        print(f"{args.threads} threads applying the same 25 pairs: "
+              f"old approach {old_failures} failed, new {new_failures} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cost of idle live-update subscribers and of fanning events out to them.
+
+Opens --subscribers subscriptions on the broadcaster, each with a consumer
+task waiting on it as an SSE connection does, then measures memory per
+idle subscriber, the time from publishing one event on another thread (as
+the write queue does) until every consumer has it, and the cost of a
+publish with nobody listening. Finally it stalls the consumers and
+publishes a burst to show each queue stays bounded.
+
+    python -m benchmarks.broadcast --subscribers 10000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from broadcast import Broadcaster, QUEUE_SIZE
+
+
+async def run(subscribers: int, rounds: int, burst: int) -> None:
+    loop = asyncio.get_running_loop()
+    broadcaster = Broadcaster(max_subscribers=subscribers)
+    broadcaster.start()
+    received = 0
+    all_received = asyncio.Event()
+    stalled = asyncio.Event()
+
+    async def consumer(subscription):
+        nonlocal received
+        while True:
+            message = await subscription.get(25)
+            if message is None:
+                continue
+            received += 1
+            if received == subscribers:
+                all_received.set()
+            if stalled.is_set():
+                await asyncio.sleep(3600)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    tasks = []
+    for i in range(subscribers):
+        subscription = broadcaster.subscribe(["opportunities", f"domain:{i % 5}"])
+        tasks.append(asyncio.ensure_future(consumer(subscription)))
+    await asyncio.sleep(0)
+    subscribe_seconds = time.perf_counter() - started
+    used = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+    print(f"{subscribers:,} idle subscribers: {used / subscribers:,.0f} bytes each "
+          f"({used / 2**20:.1f} MB), subscribed in {subscribe_seconds * 1000:.0f} ms")
+
+    timings = []
+    for _ in range(rounds):
+        received = 0
+        all_received.clear()
+        started = time.perf_counter()
+        await loop.run_in_executor(None, broadcaster.publish, "opportunity", ("opportunities",), {"id": 1})
+        await all_received.wait()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"fan-out to all: median {timings[len(timings) // 2] * 1000:.1f} ms, "
+          f"max {timings[-1] * 1000:.1f} ms over {rounds} events")
+
+    idle = Broadcaster()
+    idle.start()
+    n = 100_000
+    started = time.perf_counter()
+    for _ in range(n):
+        idle.publish("opportunity", ("opportunities",), {"id": 1})
+    print(f"publish with no subscribers: {(time.perf_counter() - started) / n * 1e6:.2f} us")
+
+    stalled.set()
+    received = 0
+    broadcaster.publish("opportunity", ("opportunities",), {"id": 0})
+    await asyncio.sleep(0.1)
+    for i in range(burst):
+        broadcaster.publish("opportunity", ("opportunities",), {"id": i})
+    await asyncio.sleep(0.1)
+    stats = broadcaster.stats()
+    print(f"burst of {burst} to stalled consumers: {stats['dropped']:,} dropped, "
+          f"queues capped at {QUEUE_SIZE}")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20, help="events timed for fan-out")
+    parser.add_argument("--burst", type=int, default=300, help="events published to stalled consumers")
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.rounds, args.burst))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Throughput and accuracy of the opportunity domain classifier.
+
+Times the compiled classifier (single call and classify_many) against the
+original substring scan, then checks accuracy on the labelled seed data
+and exits non-zero if any label regresses.
+
+    python -m benchmarks.classifier --descriptions 100000
+"""
+import argparse
+import random
+import sys
+import time
+
+from classifier import DEFAULT_KEYWORDS, DomainClassifier, classify_many
+from helpers import classify_opportunity
+
+# Seed descriptions from main.seed_database with their intended domain, plus
+# inputs the substring scan got wrong ("ai" inside "aide", "claim", ...).
+LABELLED = [
+    ("Join Harvard's cutting-edge AI research lab to work on machine learning and neural networks.", "AI"),
+    ("Yale's Data Science Institute offers hands-on experience with big data analytics.", "General"),
+    ("Princeton's law and policy center seeks students for legal research and policy analysis.", "Law"),
+    ("Columbia's biomedical center needs research assistants for clinical health studies.", "Biomedical"),
+    ("Penn's robotics lab offers engineering and hardware development opportunities.", "Engineering"),
+    ("MIT's quantum computing lab seeks students for quantum algorithm and quantum machine learning research.", "AI"),
+    ("Stanford Law School invites students to participate in constitutional law litigation and legal advocacy.", "Law"),
+    ("Brown's neuroscience department offers clinical brain research and cognitive science studies.", "Biomedical"),
+    ("Cornell's engineering school focuses on renewable energy and sustainable infrastructure development.", "Engineering"),
+    ("Dartmouth's medical school offers healthcare data analytics and medical AI research opportunities.", "Biomedical"),
+    ("Paid position as a research aide in the history department.", "General"),
+    ("Help process insurance claim records for the finance office.", "General"),
+    ("Apply for the Fellai travel scholarship.", "General"),
+    ("Hands-on work maintaining campus email systems.", "General"),
+]
+
+
+def legacy_classify(description: str) -> str:
+    """The original substring scan, kept here for comparison."""
+    desc_lower = description.lower()
+    if any(kw in desc_lower for kw in ["ai", "machine learning", "neural", "deep learning"]):
+        return "AI"
+    elif any(kw in desc_lower for kw in ["law", "policy", "legal"]):
+        return "Law"
+    elif any(kw in desc_lower for kw in ["biomedical", "health", "clinical"]):
+        return "Biomedical"
+    elif any(kw in desc_lower for kw in ["robotics", "engineering", "hardware"]):
+        return "Engineering"
+    return "General"
+
+
+def scan_classify(table):
+    """The substring scan generalised to any keyword table."""
+    def classify(description: str) -> str:
+        desc_lower = description.lower()
+        for domain, keywords in table.items():
+            if any(kw in desc_lower for kw in keywords):
+                return domain
+        return "General"
+    return classify
+
+
+def large_table(keywords_per_domain: int):
+    table = {domain: dict(words) for domain, words in DEFAULT_KEYWORDS.items()}
+    for domain in table:
+        for i in range(keywords_per_domain - len(table[domain])):
+            table[domain][f"{domain.lower()}term{i}"] = 1
+    return table
+
+
+def synthetic_descriptions(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    words = " ".join(d for d, _ in LABELLED).split() + ["students", "program", "summer", "lab"] * 20
+    return [" ".join(rng.choices(words, k=rng.randint(15, 60))) for _ in range(n)]
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--descriptions", type=int, default=100_000)
+    parser.add_argument("--keywords", type=int, nargs="+", default=[100, 500],
+                        help="keywords per domain for the large-table comparison")
+    args = parser.parse_args()
+
+    texts = synthetic_descriptions(args.descriptions)
+    legacy = timed(lambda: [legacy_classify(t) for t in texts])
+    single = timed(lambda: [classify_opportunity(t) for t in texts])
+    batch = timed(lambda: classify_many(texts))
+    compile_ms = timed(DomainClassifier) * 1000
+
+    print(f"{len(texts):,} descriptions (classifier compiles in {compile_ms:.2f} ms)")
+    for name, seconds in [("substring scan", legacy), ("compiled, per call", single), ("compiled, batch", batch)]:
+        print(f"  {name:<20}{seconds * 1000:10.1f} ms  {len(texts) / seconds:12,.0f} /s")
+
+    for per_domain in args.keywords:
+        table = large_table(per_domain)
+        scan, compiled = scan_classify(table), DomainClassifier(table)
+        scan_s = timed(lambda: [scan(t) for t in texts])
+        compiled_s = timed(lambda: compiled.classify_many(texts))
+        print(f"{per_domain} keywords per domain: substring scan {len(texts) / scan_s:,.0f} /s, "
+              f"compiled {len(texts) / compiled_s:,.0f} /s")
+
+    failures = 0
+    labels = classify_many(d for d, _ in LABELLED)
+    for (description, expected), label in zip(LABELLED, labels):
+        if label != expected:
+            failures += 1
+            print(f"  MISMATCH expected {expected}, got {label}: {description}")
+    legacy_correct = sum(legacy_classify(d) == e for d, e in LABELLED)
+    print(f"accuracy: compiled {len(LABELLED) - failures}/{len(LABELLED)}, "
+          f"substring scan {legacy_correct}/{len(LABELLED)}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
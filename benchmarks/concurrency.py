@@ -0,0 +1,126 @@
+"""
+Latency of the read routes under many concurrent clients.
+
+Starts the app under uvicorn in a subprocess against a throwaway database
+and hits it from 200 concurrent HTTP clients. Latency is measured on the
+client, so time spent queued behind a blocked event loop is included.
+Run it on two commits to compare.
+
+    python -m benchmarks.concurrency --clients 200 --requests 10
+
+Requires httpx (`pip install httpx`).
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROUTES = ["/", "/leaderboard", "/dashboard", "/community", "/student/{sid}", "/opportunity/{oid}"]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def populate(opportunities: int, students: int, seed: int = 7) -> None:
+    from benchmarks.synthetic import Scale, generate
+    from database import engine
+    from migrations import migrate
+
+    migrate(engine)
+    generate(engine, Scale(opportunities, students, 0, 0, 0), seed=seed)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(http, deadline: float = 60) -> None:
+    started = time.perf_counter()
+    while time.perf_counter() - started < deadline:
+        try:
+            await http.get("/dashboard")
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def drive(base_url: str, clients: int, requests_per_client: int, opportunities: int, students: int):
+    import httpx
+
+    rng = random.Random(1)
+    latencies = []
+    errors = 0
+
+    async def client(http):
+        nonlocal errors
+        for _ in range(requests_per_client):
+            path = rng.choice(ROUTES).format(
+                sid=rng.randint(1, students), oid=rng.randint(1, opportunities)
+            )
+            started = time.perf_counter()
+            try:
+                response = await http.get(path)
+            except httpx.TransportError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as http:
+        await wait_until_ready(http)
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--opportunities", type=int, default=500)
+    parser.add_argument("--students", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        populate(args.opportunities, args.students)
+
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--timeout-keep-alive", "300", "--log-level", "warning"],
+            env=os.environ.copy()
+        )
+        try:
+            latencies, errors, elapsed = asyncio.run(drive(
+                f"http://127.0.0.1:{port}", args.clients, args.requests, args.opportunities, args.students
+            ))
+        finally:
+            server.terminate()
+            server.wait()
+
+    ms = [v * 1000 for v in latencies]
+    print(f"{args.clients} clients x {args.requests} requests "
+          f"({args.opportunities:,} opportunities, {args.students:,} students)")
+    print(f"  throughput  {len(ms) / elapsed:8.1f} req/s   errors {errors}")
+    print(f"  latency ms  p50 {percentile(ms, 50):8.1f}   p95 {percentile(ms, 95):8.1f}   "
+          f"p99 {percentile(ms, 99):8.1f}   max {max(ms):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
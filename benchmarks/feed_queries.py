@@ -0,0 +1,87 @@
+"""
+Statement count of the community feed, which must not grow with the posts.
+
+Builds one throwaway database per size, then renders every page of
+/community in each sort order through the route handler (template
+included, so a lazy load in the template is counted too) and counts the
+statements with a before_cursor_execute listener. Every full page must
+cost the same at every size, and so must every final page (which also
+checks the archive once). Exits non-zero if any count differs.
+
+    python -m benchmarks.feed_queries --posts 10 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+
+def build(path: str, posts: int):
+    from sqlalchemy import create_engine
+    from benchmarks.synthetic import Scale, generate
+    from migrations import migrate
+
+    engine = create_engine(f"sqlite:///{path}")
+    migrate(engine)
+    # Five comments a post on average, more than a page shows for the busy ones
+    generate(engine, Scale(0, 50, 0, posts, posts * 5), seed=4)
+    return engine
+
+
+def page_counts(engine, sort: str):
+    """Statements run for each page of the feed, first to last."""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from starlette.requests import Request
+    import main
+
+    count = [0]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        count[0] += 1
+
+    event.listen(engine, "before_cursor_execute", record)
+    counts, cursor = [], None
+    try:
+        while True:
+            request = Request({"type": "http", "method": "GET", "path": "/community", "query_string": b"",
+                               "headers": [], "app": main.app, "router": main.app.router})
+            count[0] = 0
+            with Session(engine) as db:
+                response = main.community(request, cursor=cursor, sort=sort, db=db)
+            counts.append(count[0])
+            cursor = response.context["feed"].next_cursor
+            if cursor is None:
+                return counts
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, nargs="+", default=[10, 500], help="feed sizes to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'unused.db')}"
+        from feed import SORTS
+
+        full, final = set(), set()
+        for posts in args.posts:
+            engine = build(os.path.join(tmp, f"feed_{posts}.db"), posts)
+            for sort in SORTS:
+                counts = page_counts(engine, sort)
+                full.update(counts[:-1])
+                final.add(counts[-1])
+                print(f"{posts:>6,} posts, {sort:<9}: {len(counts)} pages, statements per page {counts}")
+            engine.dispose()
+
+        failures = len(full) > 1 or len(final) > 1
+        print(f"full pages: {sorted(full)} statements; final pages: {sorted(final)} statements"
+              + (" -- MISMATCH" if failures else ""))
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Request-side cost of maintenance work run inline versus queued as jobs.
+
+Fills a throwaway database at a synthetic scale, then:
+  - runs each maintenance job kind inline, as a handler doing the work
+    itself would, next to the time enqueue() takes to queue a job;
+  - pushes --jobs no-op jobs through the queue from --threads threads and
+    reports throughput and wait latency;
+  - queues a round of every kind and times the shutdown drain.
+
+    python -m benchmarks.jobs --scale medium
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+KINDS = ("recount", "scores", "recommendations", "reclassify")
+
+
+def inline(engine, kind: str) -> float:
+    from jobs import HANDLERS
+
+    started = time.perf_counter()
+    HANDLERS[kind](engine, {}, threading.Event())
+    return time.perf_counter() - started
+
+
+async def enqueue_times(queue, runs: int) -> float:
+    """Median milliseconds per enqueue(), each for a distinct job."""
+    samples = []
+    for i in range(runs):
+        started = time.perf_counter()
+        await asyncio.to_thread(queue.enqueue, "noop", {"run": i})
+        samples.append((time.perf_counter() - started) * 1000)
+    await queue.stop(timeout=None)
+    return statistics.median(samples)
+
+
+async def throughput(queue, jobs: int, threads: int) -> float:
+    def producer(n):
+        for i in range(n):
+            queue.enqueue("noop", {"n": i, "thread": threading.get_ident()})
+
+    started = time.perf_counter()
+    await asyncio.gather(*[asyncio.to_thread(producer, jobs // threads) for _ in range(threads)])
+    await queue.stop(timeout=None)
+    return time.perf_counter() - started
+
+
+async def drain(queue) -> float:
+    for kind in KINDS:
+        await asyncio.to_thread(queue.enqueue, kind)
+    started = time.perf_counter()
+    await queue.stop(timeout=None)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", default="small", help="synthetic scale (tiny, small, medium, full)")
+    parser.add_argument("--runs", type=int, default=200, help="enqueue() calls timed")
+    parser.add_argument("--jobs", type=int, default=2000, help="no-op jobs in the throughput run")
+    parser.add_argument("--threads", type=int, default=4, help="threads enqueueing them")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'jobs.db')}"
+        from benchmarks.synthetic import SCALES, generate
+        from database import engine
+        from jobs import JobQueue, register
+        from migrations import migrate
+
+        migrate(engine)
+        generate(engine, SCALES[args.scale])
+        register("noop")(lambda engine, payload, stop: None)
+
+        async def started(**kwargs):
+            queue = JobQueue(**kwargs)
+            await queue.start(engine)
+            return queue
+
+        async def run():
+            for kind in KINDS:
+                print(f"{kind:<16} inline {inline(engine, kind) * 1000:9.1f} ms")
+            enqueue_ms = await enqueue_times(await started(), args.runs)
+            print(f"{'enqueue()':<16} {enqueue_ms:16.2f} ms (median)")
+
+            queue = await started()
+            seconds = await throughput(queue, args.jobs, args.threads)
+            stats = queue.stats()
+            print(f"{stats['done']:,} no-op jobs from {args.threads} threads in {seconds:.2f}s "
+                  f"({stats['done'] / seconds:,.0f}/s), wait p50 {stats['wait_ms']['p50']} ms, "
+                  f"p95 {stats['wait_ms']['p95']} ms")
+
+            queue = await started()
+            print(f"drain of one job of each kind at shutdown: {await drain(queue):.2f}s")
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+In-process load test of every route, with a JSON report for comparing commits.
+
+Drives the app through httpx's ASGI transport, with no server process or
+sockets, so the numbers are the app's own cost: routing, queries and
+rendering. Each route is requested --requests times at each --concurrency
+level. The report gives throughput, p50/p95/p99 latency and SQL statements
+per request for every (route, concurrency) pair, along with the commit and
+the dataset, so two runs can be diffed with --compare.
+
+    python -m benchmarks.synthetic --db /tmp/bench.db --scale full
+    python -m benchmarks.load --db /tmp/bench.db --concurrency 1 10 50 --output before.json
+    python -m benchmarks.load --compare before.json after.json
+
+Without --db a dataset is generated at --scale into a temporary file. With
+--db, the database is copied first so writes do not leak between runs.
+The response cache is emptied after every request unless --response-cache
+is given, so repeated GETs measure the handler rather than the cache.
+
+Requires httpx (`pip install httpx`).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from benchmarks.concurrency import percentile
+from benchmarks.synthetic import SCALES, generate
+
+
+class Route(NamedTuple):
+    name: str
+    method: str
+    path: str
+    form: Optional[dict] = None
+    upload: Optional[str] = None
+
+
+# One entry per handler in main.py; "{sid}", "{oid}" and "{pid}" are filled
+# with random existing ids. Add new routes here (the run warns about any
+# route of the app missing from this list or from NOT_LOADED).
+ROUTES = [
+    Route("home", "GET", "/"),
+    Route("home_student", "GET", "/?student_id={sid}"),
+    Route("home_domain", "GET", "/?domain=AI"),
+    Route("home_search", "GET", "/?search=machine+learning"),
+    Route("home_most_applied", "GET", "/?domain=AI&sort=applied"),
+    Route("leaderboard", "GET", "/leaderboard"),
+    Route("leaderboard_page", "GET", "/leaderboard?after_score=30&after_id={sid}"),
+    Route("leaderboard_preview", "GET", "/api/leaderboard/preview?weights=1,1,1,1&k=10"),
+    Route("student_lookup", "GET", "/api/students?q=student+12&limit=8"),
+    Route("student", "GET", "/student/{sid}"),
+    Route("opportunity", "GET", "/opportunity/{oid}"),
+    Route("candidates", "GET", "/api/opportunity/{oid}/candidates?k=10"),
+    Route("community", "GET", "/community"),
+    Route("community_discussed", "GET", "/community?sort=discussed"),
+    Route("community_archive", "GET", "/community?archive=true"),
+    Route("post_comments", "GET", "/community/post/{pid}/comments"),
+    Route("dashboard", "GET", "/dashboard"),
+    Route("cache_stats", "GET", "/cache/stats"),
+    Route("metrics", "GET", "/metrics"),
+    Route("events_stats", "GET", "/events/stats"),
+    Route("archive_stats", "GET", "/archive/stats"),
+    Route("job_stats", "GET", "/jobs/stats"),
+    Route("job", "GET", "/jobs/1"),
+    Route("apply", "POST", "/apply/{oid}", form={"student_id": "{sid}"}),
+    Route("auto_apply", "POST", "/auto-apply", form={"student_id": "{sid}", "keyword": "research"}),
+    Route("create_post", "POST", "/community/post",
+          form={"title": "Load test", "content": "Posted by the load benchmark", "author_id": "{sid}"}),
+    Route("add_comment", "POST", "/community/comment/{pid}",
+          form={"content": "Load test reply", "author_id": "{sid}"}),
+    Route("ingest", "POST", "/ingest/opportunities", upload="opportunities"),
+]
+
+
+# Routes this suite deliberately skips, and why
+NOT_LOADED = {
+    "GET /events": "long-lived event stream; see benchmarks.broadcast",
+    "POST /jobs/{kind}": "queues whole-table maintenance jobs; see benchmarks.jobs",
+    "GET /export/opportunities.ndjson": "whole-table export; see benchmarks.streaming",
+    "GET /export/leaderboard.ndjson": "whole-table export; see benchmarks.streaming",
+}
+
+
+def ingest_body(rng: random.Random) -> bytes:
+    n = rng.randrange(10**9)
+    record = {"title": f"Load Test Opportunity {n}", "university": "MIT",
+              "description": "Machine learning research", "posted_date": "2026-03-01"}
+    return (json.dumps(record) + "\n").encode()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def count_statements():
+    """A dict whose "count" goes up by one for every statement either engine runs."""
+    from sqlalchemy import event
+    from database import engine, read_engine
+
+    counter = {"count": 0}
+
+    def record(*_):
+        counter["count"] += 1
+
+    for target in {engine, read_engine}:
+        event.listen(target, "before_cursor_execute", record)
+    return counter
+
+
+def dataset_size() -> dict:
+    from sqlalchemy import text
+    from database import engine
+
+    with engine.connect() as conn:
+        return {
+            table: conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+            for table in ("opportunities", "students", "applications", "posts", "comments")
+        }
+
+
+def max_ids() -> dict:
+    from sqlalchemy import text
+    from database import engine
+
+    with engine.connect() as conn:
+        return {
+            key: conn.execute(text(f"SELECT coalesce(max(id), 1) FROM {table}")).scalar()
+            for key, table in (("sid", "students"), ("oid", "opportunities"), ("pid", "posts"))
+        }
+
+
+def uncovered_routes(app) -> list:
+    from fastapi.routing import APIRoute
+
+    covered = {(r.method, r.path.split("?")[0]) for r in ROUTES}
+    missing = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        for method in route.methods - {"HEAD"}:
+            pattern = route.path_format
+            if f"{method} {pattern}" in NOT_LOADED:
+                continue
+            if not any(m == method and _matches(pattern, path) for m, path in covered):
+                missing.append(f"{method} {pattern}")
+    return sorted(missing)
+
+
+def _matches(pattern: str, path: str) -> bool:
+    pattern_parts, path_parts = pattern.strip("/").split("/"), path.strip("/").split("/")
+    return len(pattern_parts) == len(path_parts) and all(
+        p == q or p.startswith("{") for p, q in zip(pattern_parts, path_parts)
+    )
+
+
+async def run_route(http, route: Route, requests: int, concurrency: int, ids: dict,
+                    counter: dict, keep_cache: bool, seed: int) -> dict:
+    from cache import response_cache
+
+    rng = random.Random(f"{route.name}-{concurrency}-{seed}")
+    remaining = iter(range(requests))
+    latencies, errors = [], 0
+
+    def fill(template: str) -> str:
+        return template.format(**{key: rng.randint(1, top) for key, top in ids.items()})
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            path = fill(route.path)
+            kwargs = {}
+            if route.form:
+                kwargs["data"] = {key: fill(value) for key, value in route.form.items()}
+            if route.upload:
+                kwargs["files"] = {"file": ("feed.jsonl", io.BytesIO(ingest_body(rng)))}
+            started = time.perf_counter()
+            response = await http.request(route.method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400 and response.status_code != 404:
+                errors += 1
+            if not keep_cache:
+                response_cache.invalidate()
+
+    statements_before = counter["count"]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ms = [v * 1000 for v in latencies]
+    return {
+        "route": route.name,
+        "method": route.method,
+        "path": route.path,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "queries_per_request": round((counter["count"] - statements_before) / len(latencies), 2),
+    }
+
+
+async def drive(args) -> dict:
+    import httpx
+    import main as app_module
+
+    app = app_module.app
+    routes = [r for r in ROUTES if not args.routes or r.name in args.routes]
+    missing = uncovered_routes(app)
+    if missing:
+        print(f"warning: not benchmarked: {', '.join(missing)}", file=sys.stderr)
+
+    async with app.router.lifespan_context(app):
+        counter = count_statements()
+        ids = max_ids()
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "dataset": dataset_size(),
+            "requests_per_route": args.requests,
+            "response_cache": args.response_cache,
+            "results": [],
+        }
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     timeout=None, follow_redirects=False) as http:
+            for route in routes:
+                # Warm lazily built indexes and snapshots outside the timings
+                await run_route(http, route, 1, 1, ids, counter, args.response_cache, seed=-1)
+            for concurrency in args.concurrency:
+                for route in routes:
+                    result = await run_route(http, route, args.requests, concurrency, ids, counter,
+                                             args.response_cache, args.seed)
+                    report["results"].append(result)
+                    print(f"{route.name:<20}c={concurrency:<4}{result['throughput_rps']:>9.1f} req/s"
+                          f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f} ms"
+                          f"{result['queries_per_request']:>8.1f} q/req"
+                          + (f"  errors {result['errors']}" if result["errors"] else ""),
+                          file=sys.stderr)
+    return report
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    old = {(r["route"], r["concurrency"]): r for r in before["results"]}
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    print(f"{'route':<20}{'conc':>5}{'req/s':>18}{'p95 ms':>20}{'q/req':>14}")
+    for result in after["results"]:
+        prior = old.get((result["route"], result["concurrency"]))
+        if prior is None:
+            continue
+        print(f"{result['route']:<20}{result['concurrency']:>5}"
+              f"{prior['throughput_rps']:>9.1f}{result['throughput_rps']:>9.1f}"
+              f"{prior['p95_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{prior['queries_per_request']:>7.1f}{result['queries_per_request']:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="database made by benchmarks.synthetic (copied, not modified)")
+    parser.add_argument("--scale", choices=list(SCALES), default="tiny", help="dataset to generate without --db")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=100, help="requests per route and concurrency level")
+    parser.add_argument("--routes", nargs="+", help="only these route names")
+    parser.add_argument("--response-cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "load.db")
+        if args.db:
+            shutil.copy(args.db, path)
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        if not args.db:
+            from database import engine
+            from migrations import migrate
+
+            migrate(engine)
+            generate(engine, SCALES[args.scale], seed=args.seed)
+
+        report = asyncio.run(drive(args))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Mixed read/write throughput under the legacy and production engine profiles.
+
+Runs the app under uvicorn twice against fresh copies of the same database:
+once with SQLite defaults and a commit per write (DB_PROFILE=legacy,
+DB_GROUP_COMMIT=0), once with WAL, tuned pragmas, the read pool and the
+group-commit write queue (DB_PROFILE=production). Each client mixes page
+reads with /apply and /community/post writes.
+
+Page rendering is CPU-bound and shares the CPU with the database work, so
+each mode is first measured without HTTP: --threads threads submitting small
+inserts through writer.write_queue, which is what the write routes do.
+
+    python -m benchmarks.mixed_load --clients 100 --requests 20 --writes 0.3
+
+Requires httpx (`pip install httpx`).
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.concurrency import free_port, percentile, populate, wait_until_ready
+
+READS = ["/", "/leaderboard", "/dashboard", "/community", "/student/{sid}", "/opportunity/{oid}"]
+
+MODES = {
+    "legacy": {"DB_PROFILE": "legacy", "DB_GROUP_COMMIT": "0"},
+    "production": {"DB_PROFILE": "production", "DB_GROUP_COMMIT": "1"},
+}
+
+
+async def drive(base_url, clients, requests_per_client, write_share, opportunities, students):
+    import httpx
+
+    rng = random.Random(5)
+    timings = {"read": [], "write": []}
+    errors = 0
+
+    async def client(http):
+        nonlocal errors
+        for _ in range(requests_per_client):
+            sid, oid = rng.randint(1, students), rng.randint(1, opportunities)
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_share:
+                    kind = "write"
+                    if rng.random() < 0.5:
+                        response = await http.post(f"/apply/{oid}", data={"student_id": sid})
+                    else:
+                        response = await http.post("/community/post", data={
+                            "title": "Load test", "content": "Posted by the mixed load benchmark",
+                            "author_id": sid,
+                        })
+                else:
+                    kind = "read"
+                    response = await http.get(rng.choice(READS).format(sid=sid, oid=oid))
+            except httpx.TransportError:
+                errors += 1
+                continue
+            timings[kind].append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits,
+                                 follow_redirects=False) as http:
+        await wait_until_ready(http)
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return timings, errors, elapsed
+
+
+def writer_throughput(threads: int, writes_per_thread: int = 200) -> float:
+    """Writes/s through write_queue for the engine profile in the environment."""
+    import threading
+    from sqlalchemy import text
+    from database import SessionLocal
+    from models import Post
+    from writer import write_queue
+
+    db = SessionLocal()
+    author_id = db.execute(text("SELECT min(id) FROM students")).scalar()
+    db.close()
+
+    def worker():
+        for _ in range(writes_per_thread):
+            write_queue.run(lambda db: db.add(Post(author_id=author_id, title="t", content="c")))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    write_queue.stop()
+    return threads * writes_per_thread / (time.perf_counter() - started)
+
+
+def run_writer(name, template_db, tmp, threads) -> float:
+    path = os.path.join(tmp, f"{name}-writer.db")
+    shutil.copy(template_db, path)
+    env = {**os.environ, **MODES[name], "DATABASE_URL": f"sqlite:///{path}"}
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.mixed_load", "--writer-only", "--threads", str(threads)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip())
+
+
+def run_mode(name, template_db, tmp, args):
+    path = os.path.join(tmp, f"{name}.db")
+    shutil.copy(template_db, path)
+    env = {**os.environ, **MODES[name], "DATABASE_URL": f"sqlite:///{path}"}
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--timeout-keep-alive", "300", "--log-level", "warning"],
+        env=env
+    )
+    try:
+        return asyncio.run(drive(
+            f"http://127.0.0.1:{port}", args.clients, args.requests, args.writes,
+            args.opportunities, args.students
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--writes", type=float, default=0.3, help="share of requests that write")
+    parser.add_argument("--opportunities", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--threads", type=int, default=16, help="writer threads for the database-only test")
+    parser.add_argument("--writer-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.writer_only:
+        print(writer_throughput(args.threads))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template_db = os.path.join(tmp, "template.db")
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{template_db}"
+        os.environ["DB_PROFILE"] = "legacy"
+        populate(args.opportunities, args.students)
+
+        print(f"database only: {args.threads} threads x 200 inserts")
+        for name in args.modes:
+            print(f"  {name:<11} {run_writer(name, template_db, tmp, args.threads):8.0f} writes/s")
+
+        print(f"HTTP: {args.clients} clients x {args.requests} requests, {args.writes:.0%} writes "
+              f"({args.opportunities:,} opportunities, {args.students:,} students)")
+        for name in args.modes:
+            timings, errors, elapsed = run_mode(name, template_db, tmp, args)
+            total = len(timings["read"]) + len(timings["write"])
+            print(f"  {name:<11} {total / elapsed:8.1f} req/s   errors {errors}")
+            for kind in ("read", "write"):
+                ms = [v * 1000 for v in timings[kind]]
+                if ms:
+                    print(f"    {kind:<6} p50 {percentile(ms, 50):8.1f} ms   "
+                          f"p95 {percentile(ms, 95):8.1f} ms   p99 {percentile(ms, 99):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
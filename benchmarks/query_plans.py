@@ -0,0 +1,160 @@
+"""
+Query-plan regression check for every route.
+
+Populates a throwaway database with enough rows that SQLite's planner
+behaves as it would in production, requests every route, and runs
+EXPLAIN QUERY PLAN on each statement the route executed. Exits non-zero
+if a statement scans a large table without an index, unless the scan is
+listed in ALLOWED_SCANS with the reason it is intended.
+
+    python -m benchmarks.query_plans --rows 20000
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+LARGE_TABLES = {"opportunities", "students", "applications", "posts", "comments"}
+
+# (pattern matched against the SQL, why a full scan is expected there)
+ALLOWED_SCANS = [
+    (r"^SELECT students\.id, students\.name\s+FROM students ORDER BY students\.id$",
+     "one-off build of the student name index, in rowid order"),
+    (r"^SELECT students\.id, students\.domain_interest, students\.incoscore, students\.skills\s+FROM students$",
+     "one-off build of the per-domain candidate lists"),
+    (r"^SELECT opportunities\.id, opportunities\.title, opportunities\.description, "
+     r"opportunities\.domain, opportunities\.posted_date\s+FROM opportunities$",
+     "one-off build of the recommendation index"),
+    (r"^SELECT students\.id, coalesce\(",
+     "leaderboard preview loads every student's metrics by design"),
+    (r"^SELECT opportunities\.id, opportunities\.title, opportunities\.description, "
+     r"opportunities\.university, .*FROM opportunities ORDER BY opportunities\.id$",
+     "full opportunity export reads the table in rowid order by design"),
+]
+
+GET_ROUTES = [
+    "/", "/?student_id=1", "/?domain=AI", "/?search=research", "/?student_id=2&domain=Law&search=lab",
+    "/?sort=applied", "/?domain=AI&sort=applied",
+    "/leaderboard", "/leaderboard?after_score=20&after_id=50",
+    "/student/1", "/opportunity/1", "/api/opportunity/1/candidates?k=20",
+    "/community", "/community?sort=discussed", "/community?archive=true", "/community/post/1/comments",
+    "/community/post/1/comments?archived=true", "/student/1?archive=true",
+    "/dashboard", "/api/leaderboard/preview?weights=1,1,1,1",
+    "/api/students?q=a", "/api/students?q=student%201", "/api/students?limit=5",
+    "/jobs/stats", "/jobs/1",
+    "/export/opportunities.ndjson", "/export/opportunities.ndjson?domain=AI", "/export/leaderboard.ndjson",
+]
+POST_ROUTES = [
+    ("/apply/3", {"student_id": "7"}),
+    ("/auto-apply", {"student_id": "8", "keyword": "research"}),
+    ("/community/post", {"title": "Plan check", "content": "Query plan check", "author_id": "1"}),
+    ("/community/comment/1", {"content": "Plan check", "author_id": "2"}),
+    ("/jobs/recount", {}),
+]
+
+
+def populate(rows: int, seed: int = 3) -> None:
+    from benchmarks.synthetic import Scale, generate
+    from database import engine
+
+    generate(engine, Scale(rows, rows, rows * 2, max(1, rows // 4), rows * 2), seed=seed)
+
+
+def capture_statements():
+    """Record (route, sql, params) for every statement run by either engine."""
+    from sqlalchemy import event
+    from database import engine, read_engine
+
+    captured = []
+    current = {"route": None}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if current["route"] and re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)", statement, re.I):
+            params = parameters[0] if executemany and parameters else parameters
+            captured.append((current["route"], statement, tuple(params or ())))
+
+    for target in {engine, read_engine}:
+        event.listen(target, "before_cursor_execute", record)
+    return captured, current
+
+
+def scans(db_path: str, statement: str, params: tuple):
+    """Unindexed scans of large tables, plus temp-sort warnings, in one plan."""
+    with sqlite3.connect(db_path) as conn:
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement, params)]
+    full, sorts = [], []
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)(.*)", detail)
+        if match:
+            table = re.sub(r"_\d+$", "", match.group(1))
+            if table in LARGE_TABLES and "USING" not in match.group(2):
+                full.append(detail)
+        elif "USE TEMP B-TREE" in detail:
+            sorts.append(detail)
+    return full, sorts, plan
+
+
+def allowed(statement: str):
+    normalized = statement.strip()
+    for pattern, reason in ALLOWED_SCANS:
+        if re.search(pattern, normalized, re.S):
+            return reason
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000, help="opportunities and students")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "plans.db")
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from fastapi.testclient import TestClient
+        import main as app_module
+        from database import engine
+        from migrations import migrate
+
+        migrate(engine)
+        populate(args.rows)
+        captured, current = capture_statements()
+        with TestClient(app_module.app) as client:
+            for path in GET_ROUTES:
+                current["route"] = f"GET {path}"
+                client.get(path)
+            for path, form in POST_ROUTES:
+                current["route"] = f"POST {path}"
+                client.post(path, data=form, follow_redirects=False)
+            current["route"] = None
+
+        failures = warnings = 0
+        seen = set()
+        for route, statement, params in captured:
+            if (route, statement) in seen:
+                continue
+            seen.add((route, statement))
+            full, sorts, plan = scans(db_path, statement, params)
+            if args.verbose:
+                print(f"{route}\n  {' '.join(statement.split())}\n    " + "\n    ".join(plan))
+            if full:
+                reason = allowed(statement)
+                if reason:
+                    print(f"allowed  {route}: {'; '.join(full)} ({reason})")
+                else:
+                    failures += 1
+                    print(f"FULL SCAN {route}: {'; '.join(full)}\n  {' '.join(statement.split())}")
+            for detail in sorts:
+                warnings += 1
+                print(f"sort     {route}: {detail}\n  {' '.join(statement.split())[:160]}")
+
+        print(f"{len(seen)} statements across {len(GET_ROUTES) + len(POST_ROUTES)} routes: "
+              f"{failures} unindexed scans, {warnings} temp sorts")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Render time and size of the community page with a large feed.
+
+Fills a throwaway database with --students students and --posts posts
+(three comments each), then renders community.html for one page holding
+every post, as the route does. The author picker looks students up on
+demand, so the page size no longer grows with --students. Also times
+loading every template with and without the on-disk bytecode cache.
+
+    python -m benchmarks.render --posts 200 --students 5000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def time_render(render, repeat: int):
+    timings, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(render().encode())
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, size
+
+
+def time_template_loading(cache_dir: str) -> float:
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+    from fragments import install_fragment_cache
+
+    env = Environment(loader=FileSystemLoader("templates"))
+    install_fragment_cache(env)
+    env.bytecode_cache = FileSystemBytecodeCache(cache_dir) if cache_dir else None
+    started = time.perf_counter()
+    for name in env.list_templates():
+        env.get_template(name)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10, help="renders per case; the median is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'render.db')}"
+        from benchmarks.synthetic import Scale, generate
+        from database import SessionLocal, engine
+        from feed import encode_cursor, load_feed
+        from main import templates
+        from migrations import migrate
+
+        migrate(engine)
+        generate(engine, Scale(0, args.students, 0, args.posts, args.posts * 3))
+        db = SessionLocal()
+        try:
+            feed = load_feed(db, limit=args.posts)
+            template = templates.get_template("community.html")
+
+            def render():
+                return template.render(
+                    request=None, feed=feed, posts=feed.posts,
+                    encode_cursor=encode_cursor, url_for=lambda *a, **k: "/static/css/style.css",
+                )
+
+            ms, size = time_render(render, args.repeat)
+            print(f"community page, {len(feed.posts)} posts, {args.students:,} students: "
+                  f"{ms:.1f} ms, {size / 1024:.1f} KiB")
+        finally:
+            db.close()
+
+        cache_dir = os.path.join(tmp, "bytecode")
+        os.mkdir(cache_dir)
+        no_cache = time_template_loading(None)
+        time_template_loading(cache_dir)  # compiles and writes the cache
+        cached = time_template_loading(cache_dir)
+        print(f"loading all templates: {no_cache:.1f} ms compiled, {cached:.1f} ms from bytecode cache")
+
+
+if __name__ == "__main__":
+    main()
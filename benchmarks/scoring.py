@@ -0,0 +1,69 @@
+"""
+Batch InCoScore scoring and top-K selection versus the per-object path.
+
+Scores N synthetic students once with calculate_incoscore over objects
+followed by a full sort, and once with the vectorized scorer followed by
+argpartition top-K, then checks both return the same top K.
+
+    python -m benchmarks.scoring --students 10000 100000 1000000 --top 3 50
+"""
+import argparse
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from helpers import calculate_incoscore
+from scoring import METRICS, StudentMetrics, top_k
+
+
+def synthetic_metrics(n: int, seed: int = 11) -> StudentMetrics:
+    rng = np.random.default_rng(seed)
+    values = np.column_stack([
+        rng.integers(0, 9, n),
+        rng.integers(0, 5, n),
+        rng.integers(0, 6, n),
+        np.round(rng.uniform(50, 100, n), 1),
+    ]).astype(np.float64)
+    return StudentMetrics(np.arange(1, n + 1, dtype=np.int64), values)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--top", type=int, nargs="+", default=[3, 50])
+    args = parser.parse_args()
+
+    mismatches = 0
+    for n in args.students:
+        metrics = synthetic_metrics(n)
+        objects = [
+            SimpleNamespace(id=int(i), **dict(zip(METRICS, row)))
+            for i, row in zip(metrics.ids, metrics.values.tolist())
+        ]
+        print(f"{n:,} students")
+        for k in args.top:
+            def per_object():
+                scored = [(calculate_incoscore(s), s.id) for s in objects]
+                scored.sort(key=lambda pair: (-pair[0], pair[1]))
+                return [(sid, score) for score, sid in scored[:k]]
+
+            expected, slow = timed(per_object)
+            got, fast = timed(lambda: metrics.top_k(k))
+            if got != expected:
+                mismatches += 1
+                print(f"  MISMATCH top {k}")
+            print(f"  top {k:<4} per-object + sort {slow * 1000:9.1f} ms   "
+                  f"vectorized + argpartition {fast * 1000:8.1f} ms   ({slow / fast:5.1f}x)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare the FTS5 search index against the old ILIKE scan.
+
+Builds a throwaway SQLite database per row count, fills it with synthetic
+opportunities and times the home page search query both ways.
+
+    python -m benchmarks.search --rows 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Opportunity
+from search import create_search_index, ranked_matches
+from benchmarks.synthetic import UNIVERSITIES, VOCABULARY, WEIGHTS
+
+QUERIES = ["machine learning", "quantum", "clin", "harvard robotics", "genomics fellowship"]
+
+
+def populate(engine, rows: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            batch.append({
+                "title": " ".join(rng.choices(VOCABULARY, WEIGHTS, k=3)).title(),
+                "description": " ".join(rng.choices(VOCABULARY, WEIGHTS, k=25)),
+                "university": rng.choice(UNIVERSITIES),
+                "domain": "General",
+                "posted_date": start + timedelta(days=i % 900),
+            })
+            if len(batch) == 10_000:
+                conn.execute(insert(Opportunity), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Opportunity), batch)
+
+
+def ilike_query(db, search: str):
+    return db.query(Opportunity).filter(
+        (Opportunity.title.ilike(f"%{search}%")) |
+        (Opportunity.description.ilike(f"%{search}%"))
+    ).order_by(Opportunity.posted_date.desc())
+
+
+def fts_query(db, search: str):
+    matches = ranked_matches(search)
+    return (
+        db.query(Opportunity)
+        .join(matches, matches.c.opportunity_id == Opportunity.id)
+        .order_by(matches.c.rank, Opportunity.posted_date.desc())
+    )
+
+
+def time_query(build, db, search: str, repeat: int, limit: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build(db, search).limit(limit).all()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def run(rows: int, repeat: int, limit: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        started = time.perf_counter()
+        populate(engine, rows)
+        with engine.begin() as conn:
+            create_search_index(conn)
+        build_seconds = time.perf_counter() - started
+
+        db = sessionmaker(bind=engine)()
+        try:
+            print(f"\n{rows:,} rows (load + index {build_seconds:.1f}s)")
+            print(f"{'query':<22}{'ILIKE ms':>12}{'FTS5 ms':>12}{'speedup':>10}")
+            for search in QUERIES:
+                ilike_ms = time_query(ilike_query, db, search, repeat, limit)
+                fts_ms = time_query(fts_query, db, search, repeat, limit)
+                print(f"{search:<22}{ilike_ms:>12.2f}{fts_ms:>12.2f}{ilike_ms / fts_ms:>9.1f}x")
+        finally:
+            db.close()
+            engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query; the median is reported")
+    parser.add_argument("--limit", type=int, default=50, help="rows fetched per query, like one results page")
+    args = parser.parse_args()
+    for rows in args.rows:
+        run(rows, args.repeat, args.limit)
+
+
+if __name__ == "__main__":
+    main()
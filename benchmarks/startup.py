@@ -0,0 +1,115 @@
+"""
+Worker start-up time, before and after the schema-version check.
+
+Fills a throwaway database at a synthetic scale, then:
+  - times the schema step of start-up in process: migrate() (create_all's
+    reflection of every table plus the migration table) and the old seed
+    probe, against ensure_schema() on a database stamped as current;
+  - starts uvicorn --runs times each way (the stamp cleared before every
+    run, so it takes the full path, and left in place) and times how long
+    until the first request is answered;
+  - builds the static assets into a scratch copy and reports their sizes.
+
+    python -m benchmarks.startup --scale small
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+def timed(fn, runs: int) -> float:
+    """Median milliseconds of `runs` calls."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def clear_stamp(engine) -> None:
+    from sqlalchemy import text
+
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA user_version = 0"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_ready(timeout: float = 120) -> float:
+    """Seconds from starting uvicorn to its first answered request."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/jobs/stats", timeout=1):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("server did not come up")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", default="small", help="synthetic scale (tiny, small, medium, full)")
+    parser.add_argument("--runs", type=int, default=5, help="server starts timed each way")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported; inherited by the servers
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        # Keep the servers from archiving between runs
+        os.environ["ARCHIVE_INTERVAL_SECONDS"] = "0"
+        from assets import build_static
+        from benchmarks.synthetic import SCALES, generate
+        from database import engine
+        from migrations import ensure_schema, migrate
+        from seed import seed_database
+
+        migrate(engine)
+        generate(engine, SCALES[args.scale])
+
+        def old_path():
+            migrate(engine)
+            seed_database()
+
+        print(f"schema step, migrate() + seed probe  {timed(old_path, 20):8.2f} ms (median)")
+        print(f"schema step, ensure_schema()         {timed(lambda: ensure_schema(engine), 20):8.2f} ms (median)")
+
+        cold, warm = [], []
+        for _ in range(args.runs):
+            clear_stamp(engine)
+            cold.append(time_to_ready())
+            warm.append(time_to_ready())
+        print(f"uvicorn to first response, full schema path {statistics.median(cold):6.2f}s (median of {args.runs})")
+        print(f"uvicorn to first response, stamp current    {statistics.median(warm):6.2f}s (median of {args.runs})")
+
+        static = os.path.join(tmp, "static")
+        shutil.copytree("static", static, ignore=shutil.ignore_patterns("dist"))
+        for original, hashed in sorted(build_static(static).items()):
+            sizes = {suffix: os.path.getsize(os.path.join(static, hashed + suffix))
+                     for suffix in ("", ".gz", ".br") if os.path.exists(os.path.join(static, hashed + suffix))}
+            print(f"{original}: " + ", ".join(f"{suffix[1:] or 'raw'} {size:,} B" for suffix, size in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Time to first byte and peak memory of streamed versus buffered listings.
+
+Fills a throwaway database at a synthetic scale, then calls the home page
+handler for the unfiltered listing (every opportunity) twice: rendered in
+one piece, as before, and streamed with Template.generate() over a
+yield_per query. Also runs both NDJSON exports next to the same rows
+loaded into a list and dumped at once. Memory is measured with
+tracemalloc in separate runs, as tracing slows everything down.
+
+    python -m benchmarks.streaming --scale medium
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def home_response(buffered: bool):
+    import main
+    import streaming
+    from database import ReadSessionLocal
+    from starlette.requests import Request
+
+    request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                       "headers": [], "app": main.app, "router": main.app.router})
+    main.STREAM_THRESHOLD = 10**9 if buffered else streaming.STREAM_THRESHOLD
+    db = ReadSessionLocal()
+    try:
+        return main.home(request, db=db)
+    finally:
+        db.close()
+
+
+async def consume(response):
+    """(seconds to first chunk, seconds to last chunk, bytes)"""
+    started = time.perf_counter()
+    first, size = None, 0
+    if hasattr(response, "body_iterator"):
+        async for chunk in response.body_iterator:
+            first = first or time.perf_counter() - started
+            size += len(chunk)
+    else:
+        first, size = 0.0, len(response.body)
+    return first, time.perf_counter() - started, size
+
+
+def measure(make_response, trace: bool):
+    """(first byte s, total s, bytes, peak MB); the peak only when traced."""
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    response = make_response()
+    built = time.perf_counter() - started
+    first, total, size = asyncio.run(consume(response))
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return built + first, built + total, size, peak
+
+
+def export_list(engine, statement):
+    """The baseline: every row in memory, then one dump."""
+    with engine.connect() as conn:
+        rows = [dict(row) for row in conn.execute(statement).mappings()]
+
+    class Response:
+        body = "\n".join(json.dumps(row, default=str) for row in rows).encode()
+    return Response()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", default="small", help="synthetic scale (tiny, small, medium, full)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before `database` is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'streaming.db')}"
+        from benchmarks.synthetic import SCALES, generate
+        from database import engine, read_engine
+        from migrations import migrate
+        from streaming import leaderboard_export, ndjson_response, opportunity_export
+
+        migrate(engine)
+        generate(engine, SCALES[args.scale])
+
+        cases = [
+            ("home, buffered", lambda: home_response(buffered=True)),
+            ("home, streamed", lambda: home_response(buffered=False)),
+            ("opportunities, list", lambda: export_list(read_engine, opportunity_export())),
+            ("opportunities.ndjson", lambda: ndjson_response(read_engine, opportunity_export())),
+            ("leaderboard, list", lambda: export_list(read_engine, leaderboard_export())),
+            ("leaderboard.ndjson", lambda: ndjson_response(read_engine, leaderboard_export(), rank=True)),
+        ]
+        for name, make_response in cases:
+            first, total, size, _ = measure(make_response, trace=False)
+            *_, peak = measure(make_response, trace=True)
+            print(f"{name:<22} first byte {first * 1000:8.1f} ms, all {total * 1000:8.1f} ms, "
+                  f"{size / 2**20:6.1f} MB sent, peak {peak:7.1f} MB allocated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Deterministic synthetic dataset for benchmarks.
+
+Fills a database with opportunities, students, applications and a
+posts/comments graph at any scale, up to and past production size. The
+same seed and scale always produce the same rows, so results from two
+commits are comparable. Rows are generated lazily and inserted in chunks,
+so memory stays flat however many are asked for.
+
+    python -m benchmarks.synthetic --db /tmp/full.db --scale full
+    python -m benchmarks.synthetic --db /tmp/custom.db --opportunities 50000 --students 20000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+
+
+
+class Scale(NamedTuple):
+    opportunities: int
+    students: int
+    applications: int
+    posts: int
+    comments: int
+
+
+SCALES = {
+    "tiny": Scale(1_000, 500, 5_000, 200, 2_000),
+    "small": Scale(20_000, 10_000, 100_000, 2_000, 20_000),
+    "medium": Scale(100_000, 50_000, 500_000, 10_000, 100_000),
+    "full": Scale(1_000_000, 500_000, 5_000_000, 100_000, 1_000_000),
+}
+CHUNK_SIZE = 20_000
+
+UNIVERSITIES = ["Harvard", "Yale", "Princeton", "Columbia", "UPenn", "Brown", "Dartmouth", "Cornell", "MIT", "Stanford"]
+WORDS = [
+    "research", "fellowship", "internship", "machine", "learning", "neural", "clinical", "health",
+    "policy", "legal", "robotics", "hardware", "quantum", "analytics", "genomics", "climate",
+    "program", "students", "laboratory", "summer", "data", "science", "engineering", "medicine",
+]
+# Filler vocabulary so term frequencies follow a Zipf curve like real postings:
+# "research" is everywhere, "genomics" is rare.
+VOCABULARY = WORDS + [f"term{i}" for i in range(5000)]
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+_CUM_WEIGHTS = list(itertools.accumulate(WEIGHTS))
+
+# Domain share of postings, and phrases typical of each domain
+DOMAINS = {
+    "AI": (0.3, ["machine learning", "neural networks", "deep learning", "nlp", "computer vision"]),
+    "Law": (0.15, ["legal policy", "constitutional law", "litigation", "public policy"]),
+    "Biomedical": (0.2, ["clinical trials", "biomedical", "healthcare", "neuroscience", "medicine"]),
+    "Engineering": (0.2, ["robotics", "hardware", "mechanical engineering", "embedded systems"]),
+    "General": (0.15, ["summer program", "fellowship", "community outreach", "research"]),
+}
+_DOMAIN_NAMES = list(DOMAINS)
+_DOMAIN_CUM = list(itertools.accumulate(share for share, _ in DOMAINS.values()))
+SKILLS = {
+    "AI": ["Python", "PyTorch", "TensorFlow", "NLP", "Computer Vision", "Statistics"],
+    "Law": ["Legal Writing", "Research", "Policy Analysis", "Debate", "Negotiation"],
+    "Biomedical": ["Biology", "Lab Techniques", "R", "Bioinformatics", "Chemistry"],
+    "Engineering": ["CAD", "C++", "Embedded Systems", "Robotics", "MATLAB"],
+    "General": ["Writing", "Leadership", "Excel", "Public Speaking", "Python"],
+}
+STATUSES = ["submitted", "under_review", "accepted", "rejected"]
+_STATUS_CUM = list(itertools.accumulate([0.6, 0.25, 0.05, 0.1]))
+
+FIRST_POSTED = date(2023, 1, 1)
+POSTED_DAYS = 1000
+FIRST_POST_AT = datetime(2024, 1, 1)
+
+
+def _words(rng: random.Random, k: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=_CUM_WEIGHTS, k=k))
+
+
+def opportunity_rows(count: int, seed: int) -> Iterator[dict]:
+    rng = random.Random(f"opportunities-{seed}")
+    for i in range(1, count + 1):
+        domain = rng.choices(_DOMAIN_NAMES, cum_weights=_DOMAIN_CUM)[0]
+        phrase = rng.choice(DOMAINS[domain][1])
+        yield {
+            "title": f"{phrase.title()} {_words(rng, 2).title()} {i}",
+            "description": f"{_words(rng, 12)} {phrase} {_words(rng, 12)}",
+            "university": rng.choice(UNIVERSITIES),
+            "domain": domain,
+            # Spread over the posting window so ids and dates are not in step
+            "posted_date": FIRST_POSTED + timedelta(days=rng.randrange(POSTED_DAYS)),
+        }
+
+
+def student_rows(count: int, seed: int) -> Iterator[dict]:
+    rng = random.Random(f"students-{seed}")
+    for i in range(1, count + 1):
+        domain = rng.choices(_DOMAIN_NAMES, cum_weights=_DOMAIN_CUM)[0]
+        yield {
+            "name": f"Student {i}",
+            "email": f"student{i}@university.edu",
+            "domain_interest": domain,
+            "skills": ", ".join(rng.sample(SKILLS[domain], rng.randint(2, 4))),
+            "bio": f"Interested in {rng.choice(DOMAINS[domain][1])} and {_words(rng, 3)}",
+            "hackathons": rng.randint(0, 8),
+            "internships": rng.randint(0, 4),
+            "research_papers": rng.randint(0, 5),
+            "coding_score": round(rng.uniform(40, 100), 1),
+        }
+
+
+def application_rows(count: int, students: int, opportunities: int, seed: int) -> Iterator[dict]:
+    """`count` applications spread evenly over students, never two for the same pair."""
+    if not students or not opportunities:
+        return
+    rng = random.Random(f"applications-{seed}")
+    per_student, extra = divmod(count, students)
+    started = datetime(2024, 1, 1)
+    for student_id in range(1, students + 1):
+        k = min(opportunities, per_student + (1 if student_id <= extra else 0))
+        for opportunity_id in rng.sample(range(1, opportunities + 1), k):
+            yield {
+                "student_id": student_id,
+                "opportunity_id": opportunity_id,
+                "status": rng.choices(STATUSES, cum_weights=_STATUS_CUM)[0],
+                "applied_at": started + timedelta(minutes=rng.randrange(POSTED_DAYS * 24 * 60)),
+            }
+
+
+def post_created_at(post_id: int) -> datetime:
+    # One post every ten minutes, in id order, so comments can follow their post
+    return FIRST_POST_AT + timedelta(minutes=10 * post_id)
+
+
+def post_rows(count: int, students: int, seed: int) -> Iterator[dict]:
+    if not students:
+        return
+    rng = random.Random(f"posts-{seed}")
+    for i in range(1, count + 1):
+        yield {
+            "author_id": rng.randint(1, students),
+            "title": f"{_words(rng, 4).capitalize()}?",
+            "content": _words(rng, 30),
+            "domain": rng.choices(_DOMAIN_NAMES, cum_weights=_DOMAIN_CUM)[0],
+            "created_at": post_created_at(i),
+        }
+
+
+def comment_rows(count: int, posts: int, students: int, seed: int) -> Iterator[dict]:
+    if not posts or not students:
+        return
+    rng = random.Random(f"comments-{seed}")
+    for _ in range(count):
+        # Squaring skews replies towards a few busy threads, as on a real forum
+        post_id = int(posts * rng.random() ** 2) + 1
+        yield {
+            "post_id": post_id,
+            "author_id": rng.randint(1, students),
+            "content": _words(rng, 12),
+            "created_at": post_created_at(post_id) + timedelta(minutes=rng.randrange(7 * 24 * 60)),
+        }
+
+
+def _insert(engine, model, rows: Iterable[dict], chunk_size: int, progress) -> int:
+    from sqlalchemy import insert
+
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return total
+        with engine.begin() as conn:
+            conn.execute(insert(model), chunk)
+        total += len(chunk)
+        if progress:
+            progress(model.__tablename__, total)
+
+
+def generate(engine, scale: Scale, seed: int = 1, chunk_size: int = CHUNK_SIZE,
+             progress=None) -> Dict[str, int]:
+    """
+    Insert `scale` rows into an empty, migrated database. Returns rows per table.
+
+    Uses Core inserts, so the app's in-memory indexes are not told; generate
+    before the app starts (or rebuild them afterwards).
+    """
+    from models import Application, Comment, Opportunity, Post, Student
+
+    students = scale.students
+    return {
+        "opportunities": _insert(engine, Opportunity, opportunity_rows(scale.opportunities, seed),
+                                 chunk_size, progress),
+        "students": _insert(engine, Student, student_rows(students, seed), chunk_size, progress),
+        "applications": _insert(engine, Application,
+                                application_rows(scale.applications, students, scale.opportunities, seed),
+                                chunk_size, progress),
+        "posts": _insert(engine, Post, post_rows(scale.posts, students, seed), chunk_size, progress),
+        "comments": _insert(engine, Comment, comment_rows(scale.comments, scale.posts, students, seed),
+                            chunk_size, progress),
+    }
+
+
+def resolve_scale(name: Optional[str], **overrides) -> Scale:
+    base = SCALES[name or "tiny"]
+    return base._replace(**{k: v for k, v in overrides.items() if v is not None})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", required=True, help="SQLite file to create")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    for field in Scale._fields:
+        parser.add_argument(f"--{field}", type=int, help=f"override the scale's {field}")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+    # Must be set before `database` is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    from database import engine
+    from migrations import migrate
+
+    scale = resolve_scale(args.scale, **{field: getattr(args, field) for field in Scale._fields})
+
+    def progress(table, done):
+        if not args.quiet:
+            print(f"\r{table:<14}{done:>12,}", end="", file=sys.stderr, flush=True)
+
+    migrate(engine)
+    started = time.perf_counter()
+    counts = generate(engine, scale, seed=args.seed, chunk_size=args.chunk_size, progress=progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"{table:<14}{count:>12,}")
+    print(f"generated in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
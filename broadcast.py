@@ -0,0 +1,368 @@
+import asyncio
+import json
+from collections import deque
+from datetime import date, datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from models import Application, Comment, Opportunity, Post
+
+# Messages kept per connection; a client that falls further behind loses
+# the oldest ones and is told how many it missed
+QUEUE_SIZE = 100
+MAX_SUBSCRIBERS = 20_000
+MAX_TOPICS = 20
+HEARTBEAT_SECONDS = 25
+# Event streams end after this long and the browser reconnects (EventSource
+# does so on its own). The server waits for open responses before it shuts
+# down, so this also bounds how long a graceful shutdown takes.
+STREAM_SECONDS = 300
+
+# Topics a client can subscribe to. Every event goes to its kind's topic
+# ("opportunities") plus the narrower ones it belongs to.
+TOPIC_KINDS = ("opportunities", "applications", "posts", "comments")
+TOPIC_PREFIXES = ("domain:", "post:", "opportunity:", "student:")
+
+
+class Message(NamedTuple):
+    type: str
+    text: str  # {"type": ..., "data": ...} as JSON, serialized once for every subscriber
+
+
+CLOSED = Message("closed", "")
+
+
+def parse_topics(topics: Iterable[str], allow_empty: bool = False) -> List[str]:
+    """Validate client-supplied topics; raises ValueError on an unknown one."""
+    parsed = []
+    for topic in topics:
+        topic = topic.strip()
+        if topic in TOPIC_KINDS or (topic.startswith(TOPIC_PREFIXES) and topic.split(":", 1)[1]):
+            parsed.append(topic)
+        elif topic:
+            raise ValueError(f"unknown topic {topic!r}")
+    if not parsed and not allow_empty:
+        raise ValueError("no topics given")
+    if len(parsed) > MAX_TOPICS:
+        raise ValueError(f"at most {MAX_TOPICS} topics per connection")
+    return parsed
+
+
+class Subscription:
+    """
+    One connection's bounded queue.
+
+    An idle subscription holds no queue (the deque is created on the first
+    message and dropped once drained) and waits on a bare future rather
+    than an asyncio.Event, which would cost a task per wait, so thousands
+    of idle connections cost little.
+    When the queue is full the oldest message is dropped, so a slow client
+    never holds up the publisher or grows memory; `dropped` counts the
+    losses so the client can be told to reload.
+    """
+
+    __slots__ = ("topics", "dropped", "_size", "_queue", "_waiter")
+
+    def __init__(self, topics: Iterable[str], size: int = QUEUE_SIZE):
+        self.topics: Set[str] = set(topics)
+        self.dropped = 0
+        self._size = size
+        self._queue: Optional[deque] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    def push(self, message: Message) -> bool:
+        """Queue `message`; returns False if an older one had to be dropped."""
+        if self._queue is None:
+            self._queue = deque(maxlen=self._size)
+        full = len(self._queue) == self._size
+        if full:
+            self.dropped += 1
+        self._queue.append(message)
+        self._wake()
+        return not full
+
+    def close(self) -> None:
+        self._queue = deque([CLOSED])
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Message]:
+        """Next message, CLOSED once the broadcaster stops, or None after `timeout`."""
+        while not self._queue:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self._waiter = None
+        message = self._queue.popleft()
+        if not self._queue:
+            self._queue = None
+        return message
+
+
+class Broadcaster:
+    """
+    In-process pub/sub from the write paths to SSE and WebSocket clients.
+
+    Subscriptions are indexed by topic and only touched on the event loop.
+    `publish` may be called from any thread (the write queue, ingestion):
+    it serializes the event once and hands it to the loop, which appends it
+    to the queue of every subscription on a matching topic. With no
+    subscribers publishing returns immediately.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._subscriptions: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscriptions)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscriptions) >= self.max_subscribers
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self._loop = loop or asyncio.get_running_loop()
+
+    def stop(self) -> None:
+        """End every open stream, so connections close on shutdown."""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+            self.unsubscribe(subscription)
+        self._loop = None
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        if self.full:
+            raise OverflowError("too many subscribers")
+        subscription = Subscription(topics, self.queue_size)
+        self._subscriptions.add(subscription)
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def update(self, subscription: Subscription, add: Iterable[str] = (), remove: Iterable[str] = ()) -> None:
+        for topic in remove:
+            subscription.topics.discard(topic)
+            self._discard(topic, subscription)
+        for topic in add:
+            if len(subscription.topics) >= MAX_TOPICS:
+                raise ValueError(f"at most {MAX_TOPICS} topics per connection")
+            subscription.topics.add(topic)
+            self._topics.setdefault(topic, set()).add(subscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        for topic in subscription.topics:
+            self._discard(topic, subscription)
+
+    def _discard(self, topic: str, subscription: Subscription) -> None:
+        subscribers = self._topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[topic]
+
+    def publish(self, event_type: str, topics: Iterable[str], data: dict) -> None:
+        if not self._subscriptions or self._loop is None:
+            return
+        message = Message(event_type, json.dumps({"type": event_type, "data": data}, default=_json_default))
+        topics = tuple(topics)
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._deliver(topics, message)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._deliver, topics, message)
+            except RuntimeError:
+                pass  # loop already closed during shutdown
+
+    def _deliver(self, topics, message: Message) -> None:
+        self.published += 1
+        if len(topics) == 1:
+            targets = self._topics.get(topics[0], ())
+        else:
+            targets = set()
+            for topic in topics:
+                targets.update(self._topics.get(topic, ()))
+        for subscription in targets:
+            if subscription.push(message):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscriptions),
+            "topics": len(self._topics),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+broadcaster = Broadcaster()
+
+
+def sse_format(message: Message) -> str:
+    return f"event: {message.type}\ndata: {message.text}\n\n"
+
+
+def _dropped_message(count: int) -> Message:
+    return Message("dropped", json.dumps({"type": "dropped", "data": {"count": count}}))
+
+
+async def sse_stream(topics: List[str], heartbeat: float = HEARTBEAT_SECONDS,
+                     duration: float = STREAM_SECONDS):
+    """Server-sent events on `topics`, with a comment line as heartbeat."""
+    # Subscribed here rather than by the caller, so the finally clause below
+    # always runs for it
+    subscription = broadcaster.subscribe(topics)
+    try:
+        yield "retry: 5000\n\n"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        reported = 0
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            message = await subscription.get(min(heartbeat, remaining))
+            if message is None:
+                yield ": ping\n\n"
+                continue
+            if message is CLOSED:
+                return
+            if subscription.dropped != reported:
+                yield sse_format(_dropped_message(subscription.dropped - reported))
+                reported = subscription.dropped
+            yield sse_format(message)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+async def websocket_session(websocket: WebSocket) -> None:
+    """
+    Stream events over a WebSocket.
+
+    Topics come from the ?topic= query parameters and can be changed with
+    {"subscribe": [...]} and {"unsubscribe": [...]} messages.
+    """
+    try:
+        topics = parse_topics(websocket.query_params.getlist("topic"), allow_empty=True)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    if broadcaster.full:
+        await websocket.close(code=1013)  # try again later
+        return
+    await websocket.accept()
+    subscription = broadcaster.subscribe(topics)
+
+    async def receive():
+        while True:
+            try:
+                request = await websocket.receive_json()
+                broadcaster.update(
+                    subscription,
+                    add=parse_topics(request.get("subscribe", []), allow_empty=True),
+                    remove=request.get("unsubscribe", []),
+                )
+            except (ValueError, AttributeError) as exc:
+                await websocket.send_json({"type": "error", "data": {"message": str(exc)}})
+
+    async def send():
+        reported = 0
+        while True:
+            message = await subscription.get()
+            if message is CLOSED:
+                await websocket.close(code=1001)
+                return
+            if subscription.dropped != reported:
+                await websocket.send_text(_dropped_message(subscription.dropped - reported).text)
+                reported = subscription.dropped
+            await websocket.send_text(message.text)
+
+    tasks = [asyncio.ensure_future(receive()), asyncio.ensure_future(send())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not isinstance(task.exception(), (WebSocketDisconnect, type(None))):
+                raise task.exception()
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+# Events describing what was committed. Collected on flush, published after
+# commit, so clients never hear about rows that were rolled back. Bulk Core
+# inserts bypass these hooks and publish themselves (see ingest.py).
+
+def opportunity_event(obj) -> tuple:
+    data = {"id": obj.id, "title": obj.title, "university": obj.university,
+            "domain": obj.domain, "posted_date": obj.posted_date}
+    return "opportunity", ("opportunities", f"domain:{obj.domain}"), data
+
+
+def _describe(obj):
+    if isinstance(obj, Opportunity):
+        return opportunity_event(obj)
+    if isinstance(obj, Application):
+        data = {"id": obj.id, "student_id": obj.student_id,
+                "opportunity_id": obj.opportunity_id, "status": obj.status}
+        return "application", ("applications", f"opportunity:{obj.opportunity_id}",
+                               f"student:{obj.student_id}"), data
+    if isinstance(obj, Post):
+        data = {"id": obj.id, "title": obj.title, "author_id": obj.author_id, "domain": obj.domain}
+        return "post", ("posts",), data
+    if isinstance(obj, Comment):
+        data = {"id": obj.id, "post_id": obj.post_id, "author_id": obj.author_id,
+                "content": obj.content[:200]}
+        return "comment", ("comments", f"post:{obj.post_id}"), data
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_broadcast_events(session, flush_context):
+    if not broadcaster.active:
+        return
+    for obj in session.new:
+        described = _describe(obj)
+        if described is not None:
+            session.info.setdefault("broadcast_events", []).append(described)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_broadcast_events(session):
+    for event_type, topics, data in session.info.pop("broadcast_events", ()):
+        broadcaster.publish(event_type, topics, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_broadcast_events(session):
+    session.info.pop("broadcast_events", None)
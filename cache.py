@@ -0,0 +1,269 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from fragments import data_versions
+
+CACHE_SIZE = 1024
+CACHE_SECONDS = 60
+# Larger bodies are served but not kept
+MAX_BODY_BYTES = 1024 * 1024
+
+# Read-heavy pages whose output depends only on the URL and the database
+CACHED_PATHS = ("/", "/leaderboard", "/dashboard")
+CACHED_PREFIXES = ("/opportunity/", "/student/")
+
+CachedResponse = namedtuple("CachedResponse", "status headers body etag stored_at")
+
+
+def is_cacheable(path: str) -> bool:
+    return path in CACHED_PATHS or path.startswith(CACHED_PREFIXES)
+
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """Path plus query parameters in sorted order, so `?a=1&b=2` == `?b=2&a=1`."""
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class DataVersionWatch:
+    """
+    Tells whether anything was committed to a SQLite database since the
+    last check.
+
+    PRAGMA data_version, read on a connection of its own, changes whenever
+    any other connection commits: this process's pools, `manage.py`, another
+    worker or a sqlite3 shell alike. Reading it touches no table.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._version = self._read()
+
+    def _read(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        with self._lock:
+            version = self._read()
+            changed, self._version = version != self._version, version
+        return changed
+
+
+class ResponseCache:
+    """
+    Bounded LRU of rendered responses with a TTL.
+
+    A committed ORM write clears it at once (see the session hooks below).
+    Once watch() has been called, every lookup also checks the database's
+    data_version and clears the cache if anything else was committed since,
+    so entries are not served after a write from a Core statement, another
+    process or raw SQL either. Without a watch (in-memory databases) such
+    writes show after at most the TTL. A generation counter stops a
+    response rendered before an invalidation from being stored after it.
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._watch = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def watch(self, path: str) -> None:
+        """Check the SQLite database file at `path` for outside writes."""
+        if path and path != ":memory:":
+            self._watch = DataVersionWatch(path)
+
+    def get(self, key: str):
+        if self._watch is not None and self._watch.changed():
+            self.invalidate()
+            # Cached fragments go too, since pages are rendered from them
+            data_versions.bump_all()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry.stored_at > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResponse, generation: int) -> None:
+        if len(entry.body) > MAX_BODY_BYTES:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = ResponseCache()
+
+
+class ResponseCacheMiddleware:
+    """
+    Serve cacheable GET pages from `cache`, with strong ETags.
+
+    Every 200 response gets an ETag (a hash of the body) and
+    `Cache-Control: no-cache`, so browsers revalidate and get a 304 while
+    the page is unchanged. Only complete 200 responses are stored; other
+    statuses, and responses that stream their body in several messages,
+    are passed through untouched.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "GET"
+                or not is_cacheable(scope["path"])):
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(scope["path"], scope.get("query_string", b""))
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._send(send, entry, if_none_match, "HIT")
+            return
+
+        generation = self.cache.generation
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    # Streaming response: forward what we have and stop buffering
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+
+        await self.app(scope, receive, capture)
+        if passthrough:
+            return
+
+        body = b"".join(chunks)
+        if start["status"] != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"etag", b"content-length")]
+        entry = CachedResponse(start["status"], headers, body, make_etag(body), time.time())
+        self.cache.put(key, entry, generation)
+        await self._send(send, entry, if_none_match, "MISS")
+
+    async def _send(self, send, entry: CachedResponse, if_none_match, outcome: str) -> None:
+        headers = list(entry.headers) + [
+            (b"etag", entry.etag.encode()),
+            (b"cache-control", b"no-cache"),
+            (b"x-cache", outcome.encode()),
+        ]
+        if if_none_match and etag_matches(if_none_match, entry.etag):
+            self.cache.count_not_modified()
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers.append((b"content-length", str(len(entry.body)).encode()))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+
+# Any committed ORM write clears the cache. Bulk Core inserts bypass the
+# session and call response_cache.invalidate() themselves, so the change
+# shows before the data_version check would notice it.
+
+@event.listens_for(Session, "after_flush")
+def _mark_cache_dirty(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info["response_cache_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("response_cache_dirty", False):
+        response_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_cache_dirty(session):
+    session.info.pop("response_cache_dirty", None)
@@ -0,0 +1,194 @@
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from changes import LogFollower
+from models import Opportunity, Student
+from recommendations import tokenize
+
+SHORTLIST_SIZE = 5
+MAX_SHORTLIST_SIZE = 100
+# Students tied on InCoScore with the last one to make the cut are ranked by
+# skill overlap too; at most this many beyond the cut are looked at
+TIE_SCAN = 1000
+
+_MAX_CENTS = 2**31 - 1
+_ID_MASK = 2**32 - 1
+
+
+def _pack(score: Optional[float], sid: int) -> int:
+    # Higher scores sort first, then lower ids; scores are rounded to cents
+    cents = max(0, int(round((score or 0) * 100)))
+    return (_MAX_CENTS - cents) << 32 | sid
+
+
+def _unpack_score(key: int) -> float:
+    return (_MAX_CENTS - (key >> 32)) / 100
+
+
+class Candidate(NamedTuple):
+    student_id: int
+    incoscore: float
+    matched: Tuple[str, ...]  # skill tokens shared with the opportunity
+
+
+class CandidateIndex(LogFollower):
+    """
+    Students of each domain in InCoScore order, for opportunity shortlists.
+
+    Each domain keeps a sorted array of packed (score, id) keys, so the top
+    of a domain is simply the front of its array. Per student only the key,
+    the domain and an interned set of skill tokens are kept, in arrays
+    indexed by id, which keeps the whole index to a few tens of bytes per
+    student. A shortlist reads the first K keys plus anyone tied with the
+    K-th, then breaks ties by overlap between the student's skills and the
+    opportunity's title and description, all in memory.
+
+    Like the name index (typeahead.py) it is built in the background at
+    startup and follows the change log (see changes.py): a student added,
+    rescored or deleted by any process is re-read before the next shortlist.
+    """
+
+    tables = ("students",)
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._by_domain: Dict[str, array] = {}
+        self._domains: List[str] = []
+        self._positions: Dict[str, int] = {}  # domain -> position in _domains
+        self._keys = array("q")        # id -> packed key, -1 if absent
+        self._domain_of = array("H")   # id -> position in _domains
+        self._skills: List[Optional[FrozenSet[str]]] = []  # id -> skill tokens
+        self._interned: Dict[FrozenSet[str], FrozenSet[str]] = {}
+
+    def _load(self, db) -> None:
+        size = (db.execute(select(func.max(Student.id))).scalar() or 0) + 1
+        keys_of, domain_of, skills_of = array("q", [-1]) * size, array("H", [0]) * size, [None] * size
+        domains: Dict[str, int] = {}
+        by_domain: Dict[str, list] = {}
+        # Skill lists repeat a lot; tokenize each distinct one once
+        tokens_of: Dict[Optional[str], FrozenSet[str]] = {}
+        rows = db.connection().execute(
+            select(Student.id, Student.domain_interest, Student.incoscore, Student.skills)
+        )
+        for chunk in rows.partitions(10_000):
+            for sid, domain, score, skills in chunk:
+                key = _pack(score, sid)
+                tokens = tokens_of.get(skills)
+                if tokens is None:
+                    tokens = tokens_of[skills] = frozenset(tokenize(skills))
+                position = domains.get(domain)
+                if position is None:
+                    position = domains[domain] = len(domains)
+                if sid >= len(keys_of):  # inserted since max(id) was read
+                    grow = sid + 1 - len(keys_of)
+                    keys_of.extend([-1] * grow)
+                    domain_of.extend([0] * grow)
+                    skills_of.extend([None] * grow)
+                keys_of[sid], domain_of[sid], skills_of[sid] = key, position, tokens
+                by_domain.setdefault(domain, []).append(key)
+        by_domain = {domain: array("q", sorted(keys)) for domain, keys in by_domain.items()}
+        with self._lock:
+            self._by_domain, self._domains, self._positions = by_domain, list(domains), domains
+            self._keys, self._domain_of, self._skills = keys_of, domain_of, skills_of
+            self._interned = {tokens: tokens for tokens in tokens_of.values()}
+
+    def _replay(self, db, table: str, ids) -> None:
+        rows = {row.id: tuple(row) for row in db.connection().execute(
+            select(Student.id, Student.domain_interest, Student.incoscore, Student.skills)
+            .where(Student.id.in_(ids))
+        )}
+        with self._lock:
+            self._apply(rows.get(sid, (sid, None, None, None)) for sid in ids)
+
+    def _apply(self, changes: Iterable[tuple]) -> None:
+        """
+        Apply (id, domain, incoscore, skills) rows for new or changed
+        students; a row of (id, None, None, None) removes a deleted one.
+        """
+        for sid, domain, score, skills in changes:
+            self._discard(sid)
+            if domain is not None:
+                key = _pack(score, sid)
+                self._remember(sid, domain, key, frozenset(tokenize(skills)))
+                keys = self._by_domain.setdefault(domain, array("q"))
+                keys.insert(bisect_left(keys, key), key)
+
+    def _remember(self, sid: int, domain: str, key: int, tokens: FrozenSet[str]) -> None:
+        if sid >= len(self._keys):
+            grow = sid + 1 - len(self._keys)
+            self._keys.extend([-1] * grow)
+            self._domain_of.extend([0] * grow)
+            self._skills.extend([None] * grow)
+        self._keys[sid] = key
+        if domain not in self._positions:
+            self._positions[domain] = len(self._domains)
+            self._domains.append(domain)
+        self._domain_of[sid] = self._positions[domain]
+        self._skills[sid] = self._interned.setdefault(tokens, tokens)
+
+    def _discard(self, sid: int) -> None:
+        if sid >= len(self._keys) or self._keys[sid] < 0:
+            return
+        key = self._keys[sid]
+        keys = self._by_domain[self._domains[self._domain_of[sid]]]
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+        self._keys[sid] = -1
+        self._skills[sid] = None
+
+    def top(self, domain: str, tokens: FrozenSet[str], k: int = SHORTLIST_SIZE) -> List[Candidate]:
+        """Best `k` students of `domain`: highest InCoScore, then most skills in `tokens`."""
+        with self._lock:
+            keys = self._by_domain.get(domain)
+            if not keys:
+                return []
+            end = min(k, len(keys))
+            boundary = keys[end - 1] >> 32
+            while end < len(keys) and end < k + TIE_SCAN and keys[end] >> 32 == boundary:
+                end += 1
+            ranked = []
+            for key in keys[:end]:
+                sid = key & _ID_MASK
+                matched = self._skills[sid] & tokens
+                ranked.append((key >> 32, -len(matched), sid, matched, key))
+        ranked.sort()
+        return [
+            Candidate(sid, _unpack_score(key), tuple(sorted(matched)))
+            for _, _, sid, matched, key in ranked[:k]
+        ]
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._by_domain.values())
+
+
+candidate_index = CandidateIndex()
+
+
+def opportunity_tokens(opportunity: Opportunity) -> FrozenSet[str]:
+    return frozenset(tokenize(opportunity.title) | tokenize(opportunity.description))
+
+
+def shortlist(db, opportunity: Opportunity, k: int = SHORTLIST_SIZE):
+    """
+    The `k` best-fit students for `opportunity` as (student, candidate)
+    pairs: students interested in its domain, by InCoScore, ties broken by
+    skill overlap with the posting.
+    """
+    candidate_index.ensure_current(db)
+    tokens = opportunity_tokens(opportunity)
+    want = k
+    while True:
+        picks = candidate_index.top(opportunity.domain, tokens, want)
+        students = {s.id: s for s in db.query(Student).filter(
+            Student.id.in_([c.student_id for c in picks]))}
+        found = [(students[c.student_id], c) for c in picks if c.student_id in students]
+        if len(found) >= k or len(picks) < want:
+            return found[:k]
+        # Picks deleted after the index caught up: ask for that many more
+        want += len(picks) - len(found)
@@ -0,0 +1,148 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterator, List, NamedTuple, Tuple
+
+from sqlalchemy import text
+
+# Entries kept in change_log by prune_change_log(). An index further behind
+# than this rebuilds instead of replaying.
+KEEP_ENTRIES = 200_000
+# Row ids reloaded per query while replaying the log
+REPLAY_BATCH_SIZE = 1000
+
+
+class Tracked(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]  # an UPDATE of any of these is logged
+
+
+# Tables mirrored by in-memory indexes (leaderboard.py, typeahead.py,
+# candidates.py, recommendations.py), with the columns those indexes read.
+TRACKED = [
+    Tracked("students", ("name", "domain_interest", "skills", "bio", "hackathons", "internships",
+                         "research_papers", "coding_score")),
+    Tracked("opportunities", ("title", "description", "university", "domain", "posted_date")),
+]
+
+
+def _triggers(tracked: Tracked):
+    name = f"{tracked.table}_change_log"
+
+    def log(row):
+        return f"INSERT INTO change_log (table_name, row_id) VALUES ('{tracked.table}', {row}.id);"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {tracked.table} BEGIN {log('new')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {tracked.table} BEGIN {log('old')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {', '.join(tracked.columns)} "
+        f"ON {tracked.table} BEGIN {log('new')} END",
+    ]
+
+
+def create_change_log_triggers(conn) -> None:
+    """
+    Create the triggers that append the id of every inserted, deleted or
+    changed row of a tracked table to change_log.
+
+    Like the counter triggers (counters.py) they run inside the writing
+    statement, so every write is logged whether it came through a session
+    of this process, a bulk Core insert, `manage.py`, another worker or
+    raw SQL.
+    """
+    for tracked in TRACKED:
+        for statement in _triggers(tracked):
+            conn.execute(text(statement))
+
+
+def latest_change(conn) -> int:
+    """Id of the last change_log entry, 0 if there is none."""
+    return conn.execute(text("SELECT coalesce(max(id), 0) FROM change_log")).scalar()
+
+
+def changed_ids(conn, table: str, after: int, until: int,
+                batch_size: int = REPLAY_BATCH_SIZE) -> Iterator[List[int]]:
+    """Distinct ids of `table` rows logged after entry `after` up to `until`, in batches."""
+    ids = list(conn.execute(
+        text("SELECT DISTINCT row_id FROM change_log WHERE id > :after AND id <= :until "
+             "AND table_name = :table"),
+        {"after": after, "until": until, "table": table}
+    ).scalars())
+    for start in range(0, len(ids), batch_size):
+        yield ids[start:start + batch_size]
+
+
+def prune_change_log(conn, keep: int = KEEP_ENTRIES) -> int:
+    """Delete all but the last `keep` entries. Returns the number deleted."""
+    return conn.execute(
+        text("DELETE FROM change_log WHERE id <= (SELECT max(id) FROM change_log) - :keep"),
+        {"keep": keep}
+    ).rowcount
+
+
+class LogFollower(ABC):
+    """
+    Base for in-memory indexes mirroring tracked tables.
+
+    An index remembers the last change_log entry it reflects. Before it
+    answers, ensure_current() reads the log's last id (a single rowid
+    lookup) and, if entries were added since, reloads just the rows they
+    name; it rebuilds instead when the log was pruned past its position.
+    Writes are seen at the next use however they were made, the process's
+    own included, so no session hooks are needed.
+
+    Subclasses set `tables` and implement _load(db), which builds the index
+    from scratch, and _replay(db, table, ids), which brings the given rows
+    up to date (ids whose row is gone were deleted). Both may run while
+    other connections write: an entry committed during a build is after the
+    position recorded for it and is replayed next time, so replays must be
+    idempotent.
+    """
+
+    tables: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self._sync_lock = threading.Lock()
+        self.position = 0
+        self.loaded = False
+
+    def rebuild(self, db) -> None:
+        with self._sync_lock:
+            self._rebuild(db)
+
+    def _rebuild(self, db) -> None:
+        position = latest_change(db.connection())
+        self._load(db)
+        self.position = position
+        self.loaded = True
+
+    def ensure_current(self, db) -> None:
+        # Once built, a caller that finds another thread already updating
+        # the index answers from it as it stands rather than waiting
+        if not self._sync_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            if not self.loaded:
+                self._rebuild(db)
+                return
+            conn = db.connection()
+            latest = latest_change(conn)
+            if latest == self.position:
+                return
+            oldest = conn.execute(text("SELECT min(id) FROM change_log")).scalar()
+            # Pruned past our position, or a different database
+            if oldest is None or oldest > self.position + 1 or latest < self.position:
+                self._rebuild(db)
+                return
+            for table in self.tables:
+                for ids in changed_ids(conn, table, self.position, latest):
+                    self._replay(db, table, ids)
+            self.position = latest
+        finally:
+            self._sync_lock.release()
+
+    @abstractmethod
+    def _load(self, db) -> None:
+        """Build the index from scratch."""
+
+    @abstractmethod
+    def _replay(self, db, table: str, ids: List[int]) -> None:
+        """Bring the index up to date for these rows of `table`."""
@@ -0,0 +1,120 @@
+import string
+from typing import Dict, Iterable, List
+
+# Weighted keyword table per domain. Matching is case-insensitive and on
+# word boundaries, so "ai" no longer matches "aide" or "claim"; a trailing
+# `*` also matches longer words ("health*" matches "healthcare"), and a
+# phrase matches across any whitespace or punctuation. Earlier domains win
+# ties.
+DEFAULT_KEYWORDS = {
+    "AI": {
+        "ai": 2, "artificial intelligence": 3, "machine learning": 3,
+        "neural": 2, "deep learning": 3, "nlp": 2, "computer vision": 2,
+    },
+    "Law": {
+        "law": 2, "laws": 2, "legal": 2, "policy": 1, "policies": 1,
+        "litigation": 2, "constitutional": 2,
+    },
+    "Biomedical": {
+        "biomedical": 3, "health*": 2, "clinical": 2, "medical": 2,
+        "medicine": 2, "neuroscience": 2, "pharmaceutical": 2,
+    },
+    "Engineering": {
+        "robotics": 3, "engineering": 2, "hardware": 2, "mechanical": 2,
+        "infrastructure": 1, "embedded": 1,
+    },
+}
+DEFAULT_DOMAIN = "General"
+
+
+# Punctuation becomes whitespace, so str.split() yields the words
+_SEPARATORS = str.maketrans({c: " " for c in string.punctuation})
+
+
+def split_words(text: str) -> List[str]:
+    """Lowercased words of `text`, split on whitespace and punctuation."""
+    return text.lower().translate(_SEPARATORS).split()
+
+
+def _has_word_prefix(text: str, prefix: str) -> bool:
+    """True if some word in `text` starts with `prefix`."""
+    i = text.find(prefix)
+    while i != -1:
+        if i == 0 or not text[i - 1].isalnum():
+            return True
+        i = text.find(prefix, i + 1)
+    return False
+
+
+class DomainClassifier:
+    """
+    Keyword classifier that tokenizes a description once.
+
+    All single-word keywords (and the first word of every phrase) live in
+    one set, which is intersected with the description's words in a single
+    C-level pass; phrases are only checked when their first word is
+    present. Cost per description is therefore flat in the number of
+    keywords, where the old scan re-read the text once per keyword. Each
+    keyword counts once per description, however often it appears.
+    """
+
+    def __init__(self, keywords: Dict[str, Dict[str, float]] = None, default: str = DEFAULT_DOMAIN):
+        keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+        self.default = default
+        self.domains = list(keywords)
+        self._words = {}
+        self._phrases = {}
+        self._prefixes = []
+        for domain_index, domain in enumerate(self.domains):
+            for keyword, weight in keywords[domain].items():
+                target = (domain_index, weight)
+                words = keyword.lower().rstrip("*").split()
+                if keyword.endswith("*"):
+                    self._prefixes.append((words[0], target))
+                elif len(words) == 1:
+                    self._words.setdefault(words[0], []).append(target)
+                else:
+                    phrase = " " + " ".join(words) + " "
+                    self._phrases.setdefault(words[0], []).append((phrase, target))
+        self._lookup = frozenset(self._words) | frozenset(self._phrases)
+
+    def scores(self, description: str) -> List[float]:
+        """Summed keyword weight per domain, in `self.domains` order."""
+        totals = [0.0] * len(self.domains)
+        if not description:
+            return totals
+        text = description.lower()
+        tokens = text.translate(_SEPARATORS).split()
+        joined = None
+        for word in self._lookup.intersection(tokens):
+            for domain_index, weight in self._words.get(word, ()):
+                totals[domain_index] += weight
+            for phrase, (domain_index, weight) in self._phrases.get(word, ()):
+                if joined is None:
+                    joined = " " + " ".join(tokens) + " "
+                if phrase in joined:
+                    totals[domain_index] += weight
+        for prefix, (domain_index, weight) in self._prefixes:
+            if _has_word_prefix(text, prefix):
+                totals[domain_index] += weight
+        return totals
+
+    def classify(self, description: str) -> str:
+        totals = self.scores(description)
+        best, best_score = self.default, 0
+        for domain, score in zip(self.domains, totals):
+            if score > best_score:
+                best, best_score = domain, score
+        return best
+
+    def classify_many(self, descriptions: Iterable[str]) -> List[str]:
+        classify = self.classify
+        return [classify(d) for d in descriptions]
+
+
+default_classifier = DomainClassifier()
+
+
+def classify_many(descriptions: Iterable[str]) -> List[str]:
+    """Classify a batch of descriptions with the default keyword table."""
+    return default_classifier.classify_many(descriptions)
@@ -0,0 +1,92 @@
+from typing import Dict, NamedTuple
+
+from sqlalchemy import text
+
+
+class Counter(NamedTuple):
+    table: str      # the counted-on table
+    column: str     # its counter column
+    child: str      # the table whose rows are counted
+    key: str        # child column referencing table.id
+    archive: str    # where archive.py moves child rows; they still count
+
+
+# Denormalized row counts. Reading them is a column lookup instead of a
+# COUNT over the child table, and with an index on the column "most
+# discussed" / "most applied" orderings are index walks.
+COUNTERS = [
+    Counter("posts", "comment_count", "comments", "post_id", "comments_archive"),
+    Counter("opportunities", "application_count", "applications", "opportunity_id", "applications_archive"),
+    Counter("students", "application_count", "applications", "student_id", "applications_archive"),
+]
+
+
+def _triggers(counter: Counter):
+    name = f"{counter.child}_{counter.table}_{counter.column}"
+    increment = (f"UPDATE {counter.table} SET {counter.column} = {counter.column} + 1 "
+                 f"WHERE id = new.{counter.key};")
+    decrement = (f"UPDATE {counter.table} SET {counter.column} = {counter.column} - 1 "
+                 f"WHERE id = old.{counter.key};")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {counter.child} BEGIN {increment} END",
+        # A row deleted after being copied to the archive was moved, not
+        # removed. Ids are never reused (the child tables are AUTOINCREMENT),
+        # so an archived row with this id and parent is this row.
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {counter.child} "
+        f"WHEN NOT EXISTS (SELECT 1 FROM {counter.archive} "
+        f"WHERE id = old.id AND {counter.key} = old.{counter.key}) BEGIN {decrement} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {counter.key} ON {counter.child} "
+        f"WHEN old.{counter.key} IS NOT new.{counter.key} BEGIN {decrement} {increment} END",
+    ]
+
+
+def drop_counter_triggers(conn) -> None:
+    for counter in COUNTERS:
+        name = f"{counter.child}_{counter.table}_{counter.column}"
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}_{suffix}"))
+
+
+def create_counter_triggers(conn) -> None:
+    """
+    Create the triggers that keep every counter column in step.
+
+    Like the full-text index triggers (search.py) they run inside the
+    writing statement, so a count always commits or rolls back with the
+    row it counts, whether it came through the ORM, a bulk Core insert
+    (ingest.py, autoapply.py) or raw SQL. ORM objects already loaded in the
+    writing session are not refreshed; they see the new count once expired,
+    which commit does.
+    """
+    for counter in COUNTERS:
+        for statement in _triggers(counter):
+            conn.execute(text(statement))
+
+
+def recount(conn) -> Dict[str, int]:
+    """
+    Recompute every counter from the child tables and their archives and
+    fix those that drifted.
+
+    Each table is grouped once into a temporary table keyed by id, so
+    this is a scan per table rather than a COUNT per row. Returns the number
+    of rows corrected per counter ("posts.comment_count": 3, ...). Runs on
+    the caller's connection, inside its transaction.
+    """
+    fixed = {}
+    for counter in COUNTERS:
+        conn.execute(text("DROP TABLE IF EXISTS temp.counted"))
+        conn.execute(text("CREATE TEMP TABLE counted (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)"))
+        conn.execute(text(
+            f"INSERT INTO counted (id, n) SELECT {counter.key}, count(*) FROM ("
+            f"SELECT {counter.key} FROM {counter.child} UNION ALL "
+            f"SELECT {counter.key} FROM {counter.archive}) GROUP BY {counter.key}"
+        ))
+        actual = f"coalesce((SELECT n FROM counted WHERE counted.id = {counter.table}.id), 0)"
+        result = conn.execute(text(
+            f"UPDATE {counter.table} SET {counter.column} = {actual} "
+            f"WHERE {counter.column} IS NOT {actual}"
+        ))
+        fixed[f"{counter.table}.{counter.column}"] = result.rowcount
+        conn.execute(text("DROP TABLE temp.counted"))
+    return fixed
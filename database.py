@@ -1,10 +1,74 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./ivy_league.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./ivy_league.db")
+
+# Route handlers run in FastAPI's worker thread pool. The pool is capped at
+# POOL_SIZE threads (see main.lifespan) and the engine keeps the same number of
+# connections, so a worker rarely has to wait for a connection.
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+
+# Connection settings by profile. "production" runs SQLite in WAL mode, so
+# readers never block the writer (or each other), and syncs only at
+# checkpoints; "legacy" keeps SQLite's defaults (rollback journal, full sync).
+PROFILES = {
+    "production": {
+        # Pages freed by archival are returned a batch at a time (see
+        # archive.py) instead of by a blocking VACUUM. Only takes effect on
+        # new databases, and must come before journal_mode, which writes
+        # the header; `manage.py archive --vacuum` converts old ones.
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,          # KiB, i.e. 16 MB per connection
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "legacy": {},
+}
+DB_PROFILE = os.environ.get("DB_PROFILE", "production")
+PRAGMAS = PROFILES[DB_PROFILE]
+
+
+def _set_pragmas(pragmas: dict, query_only: bool = False):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+    return on_connect
+
+
+def _make_engine(query_only: bool = False):
+    new_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=POOL_SIZE,
+        max_overflow=0
+    )
+    if PRAGMAS or query_only:
+        event.listen(new_engine, "connect", _set_pragmas(PRAGMAS, query_only))
+    return new_engine
+
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = _make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# GET handlers read through their own pool of query-only connections, so
+# they never queue behind writers for a connection. With WAL, each read sees
+# the last committed state. Without WAL (or for in-memory databases) a second
+# pool buys nothing, and reads share the main engine.
+if PRAGMAS.get("journal_mode") == "WAL" and ":memory:" not in DATABASE_URL:
+    read_engine = _make_engine(query_only=True)
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 
@@ -14,3 +78,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for handlers that only read."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import joinedload
+
+from models import ArchivedComment, ArchivedPost, Comment, Post
+
+PAGE_SIZE = 20
+COMMENTS_PER_POST = 3
+COMMENTS_PAGE_SIZE = 20
+# Feed orders: newest first, or most comments first (Post.comment_count)
+SORTS = ("newest", "discussed")
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return f"{created_at.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor: Optional[str]):
+    """Parse a `created_at_id` cursor; malformed cursors mean "from the start"."""
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        return None
+
+
+def decode_count_cursor(cursor: Optional[str]):
+    """Parse a `count_id` cursor of the "discussed" order; malformed means "from the start"."""
+    if not cursor:
+        return None
+    try:
+        count, row_id = cursor.split("_", 1)
+        return int(count), int(row_id)
+    except ValueError:
+        return None
+
+
+@dataclass
+class FeedPage:
+    posts: list
+    # post id -> first comments (oldest first), capped at COMMENTS_PER_POST
+    comments: dict = field(default_factory=dict)
+    next_cursor: Optional[str] = None
+    # ids of the posts on the page that come from the archive
+    archived: set = field(default_factory=set)
+
+
+def feed_cursor(post, sort: str = "newest") -> str:
+    """Cursor for the feed page that follows `post`."""
+    if sort == "discussed":
+        return f"{post.comment_count}_{post.id}"
+    return encode_cursor(post.created_at, post.id)
+
+
+def _sort_key(post, sort: str):
+    if sort == "discussed":
+        return post.comment_count, post.id
+    return post.created_at, post.id
+
+
+def _posts(db, model, cursor: Optional[str], limit: int, sort: str) -> list:
+    """Up to `limit` rows of `model` (Post or ArchivedPost) after `cursor` in feed order."""
+    query = db.query(model).options(joinedload(model.author))
+    if sort == "discussed":
+        position = decode_count_cursor(cursor)
+        if position:
+            count, post_id = position
+            query = query.filter(or_(
+                model.comment_count < count,
+                and_(model.comment_count == count, model.id < post_id)
+            ))
+        query = query.order_by(model.comment_count.desc(), model.id.desc())
+    else:
+        position = decode_cursor(cursor)
+        if position:
+            created_at, post_id = position
+            query = query.filter(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < post_id)
+            ))
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    return query.limit(limit).all()
+
+
+def _first_comments(db, model, post_ids: list, comments_per_post: int) -> list:
+    """The first `comments_per_post` comments of each post, oldest first, with authors."""
+    ranked = select(
+        model.id,
+        func.row_number().over(
+            partition_by=model.post_id, order_by=(model.created_at, model.id)
+        ).label("position"),
+    ).where(model.post_id.in_(post_ids)).subquery()
+    return (
+        db.query(model)
+        .join(ranked, ranked.c.id == model.id)
+        .filter(ranked.c.position <= comments_per_post)
+        .options(joinedload(model.author))
+        .order_by(model.post_id, model.created_at, model.id)
+        .all()
+    )
+
+
+def load_feed(db, cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+              comments_per_post: int = COMMENTS_PER_POST, sort: str = "newest",
+              include_archive: bool = False) -> FeedPage:
+    """
+    One page of the community feed in two queries: newest first, or with
+    `sort="discussed"` most commented first (newest first on ties).
+
+    Posts come with their author joined in and carry their comment total
+    (Post.comment_count); comments for all posts on the page (with
+    authors) come from a single windowed query. Nothing is left for the
+    template to lazy-load.
+
+    With `include_archive` archived posts (see archive.py) are merged in
+    under the same cursor, at the cost of the same two queries against the
+    archive tables; `page.archived` says which posts came from there.
+    """
+    posts = _posts(db, Post, cursor, limit + 1, sort)
+    if include_archive:
+        old = _posts(db, ArchivedPost, cursor, limit + 1, sort)
+        posts = sorted(posts + old, key=lambda p: _sort_key(p, sort), reverse=True)[:limit + 1]
+
+    page = FeedPage(posts=posts[:limit])
+    page.archived = {p.id for p in page.posts if isinstance(p, ArchivedPost)}
+    if len(posts) > limit:
+        page.next_cursor = feed_cursor(page.posts[-1], sort)
+
+    page.comments = {p.id: [] for p in page.posts}
+    for model, ids in ((Comment, [p.id for p in page.posts if p.comment_count and p.id not in page.archived]),
+                       (ArchivedComment, [p.id for p in page.posts if p.comment_count and p.id in page.archived])):
+        if ids:
+            for comment in _first_comments(db, model, ids, comments_per_post):
+                page.comments[comment.post_id].append(comment)
+    return page
+
+
+def has_archived_posts(db) -> bool:
+    return db.query(ArchivedPost.id).limit(1).first() is not None
+
+
+def load_comments(db, post_id: int, cursor: Optional[str] = None, limit: int = COMMENTS_PAGE_SIZE,
+                  archived: bool = False):
+    """
+    Comments on one post, oldest first, continuing after `cursor`; with
+    `archived`, on an archived post.
+
+    Returns (comments, next_cursor); backs the feed's "load more" button.
+    """
+    model = ArchivedComment if archived else Comment
+    query = db.query(model).options(joinedload(model.author)).filter(model.post_id == post_id)
+    position = decode_cursor(cursor)
+    if position:
+        created_at, comment_id = position
+        query = query.filter(or_(
+            model.created_at > created_at,
+            and_(model.created_at == created_at, model.id > comment_id)
+        ))
+    comments = query.order_by(model.created_at, model.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = encode_cursor(comments[-1].created_at, comments[-1].id)
+    return comments, next_cursor
@@ -0,0 +1,158 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup, escape
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+FRAGMENT_CACHE_SIZE = 64
+# Compiled templates are kept here across restarts (default: a per-user
+# directory under the system temp dir)
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR")
+
+
+class DataVersions:
+    """
+    A counter per table, bumped by every commit that changes the table.
+
+    Fragment cache keys include the versions of the tables a fragment shows,
+    so a changed row makes the old entry unreachable instead of stale.
+    bump_all() bumps every table at once, for commits whose tables are not
+    known (see cache.DataVersionWatch).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._all = 0
+
+    def get(self, table: str) -> int:
+        return self._all + self._versions.get(table, 0)
+
+    def bump(self, *tables: str) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def bump_all(self) -> None:
+        with self._lock:
+            self._all += 1
+
+
+data_versions = DataVersions()
+
+
+class FragmentCache:
+    """Bounded LRU of rendered template fragments, keyed by name and data version."""
+
+    def __init__(self, max_entries: int = FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Markup]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Markup]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: Tuple[Hashable, ...], html: Markup) -> None:
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """
+    `{% cache "name", key, ... %}body{% endcache %}` renders the body once per
+    key and reuses the HTML after that.
+
+    The body must depend only on the key: pass the data version of whatever
+    it shows (`data_version("students")`), never per-request state such as
+    the selected item. Variables the body reads are only touched on a miss,
+    so a lazy query passed in for the body costs nothing on a hit.
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", [nodes.List(key)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        key = tuple(key)
+        html = fragment_cache.get(key)
+        if html is None:
+            html = Markup(caller())
+            fragment_cache.put(key, html)
+        return html
+
+
+def mark_selected(html, value) -> Markup:
+    """Select the <option> with `value` in cached option HTML."""
+    if value is None:
+        return Markup(html)
+    # Escaped the way the template escaped it, or `&`, `"` etc. never match
+    needle = f'<option value="{escape(value)}"'
+    return Markup(str(html).replace(needle, needle + " selected", 1))
+
+
+def install_fragment_cache(env: Environment) -> None:
+    """Add the {% cache %} tag, its helpers and the on-disk bytecode cache to `env`."""
+    env.add_extension(FragmentCacheExtension)
+    env.globals["data_version"] = data_versions.get
+    env.filters["mark_selected"] = mark_selected
+    env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+
+# Commits bump the version of every table they touched. Bulk Core inserts
+# bypass the session and must call data_versions.bump() themselves.
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    changed = session.info.setdefault("changed_tables", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            changed.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_data_versions(session):
+    changed = session.info.pop("changed_tables", None)
+    if changed:
+        data_versions.bump(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session):
+    session.info.pop("changed_tables", None)
@@ -1,3 +1,4 @@
+from classifier import default_classifier
 from models import Student
 
 
@@ -6,19 +7,20 @@ def classify_opportunity(description: str) -> str:
     Classify an opportunity based on keywords in its description.
     
     Returns domain category: AI, Law, Biomedical, Engineering, or General.
+    Keywords match on word boundaries and are weighted per domain; see
+    classifier.DEFAULT_KEYWORDS. Use classifier.classify_many for batches.
     """
-    desc_lower = description.lower()
-    
-    if any(kw in desc_lower for kw in ["ai", "machine learning", "neural", "deep learning"]):
-        return "AI"
-    elif any(kw in desc_lower for kw in ["law", "policy", "legal"]):
-        return "Law"
-    elif any(kw in desc_lower for kw in ["biomedical", "health", "clinical"]):
-        return "Biomedical"
-    elif any(kw in desc_lower for kw in ["robotics", "engineering", "hardware"]):
-        return "Engineering"
-    else:
-        return "General"
+    return default_classifier.classify(description or "")
+
+
+# InCoScore weight per metric column. models.INCOSCORE_SQL and the
+# vectorized scorer in scoring.py use the same weights.
+INCOSCORE_WEIGHTS = {
+    "hackathons": 2,
+    "internships": 3,
+    "research_papers": 4,
+    "coding_score": 0.1,
+}
 
 
 def calculate_incoscore(student: Student) -> float:
@@ -27,10 +29,8 @@ def calculate_incoscore(student: Student) -> float:
     
     Formula: hackathons*2 + internships*3 + research_papers*4 + coding_score*0.1
     """
-    score = (
-        student.hackathons * 2 +
-        student.internships * 3 +
-        student.research_papers * 4 +
-        student.coding_score * 0.1
+    score = sum(
+        (getattr(student, metric) or 0) * weight
+        for metric, weight in INCOSCORE_WEIGHTS.items()
     )
     return round(score, 2)
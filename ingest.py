@@ -0,0 +1,308 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import insert, select, tuple_
+
+from broadcast import broadcaster
+from cache import response_cache
+from classifier import DEFAULT_DOMAIN
+from fragments import data_versions
+from helpers import classify_opportunity
+from models import Opportunity, Student
+from stats import stats
+
+CHUNK_SIZE = 5000
+KINDS = ("opportunities", "students")
+
+_STUDENT_FIELDS = (
+    "name", "email", "domain_interest", "skills", "bio", "resume_url",
+    "hackathons", "internships", "research_papers", "coding_score",
+)
+_STUDENT_NUMBERS = {
+    "hackathons": int, "internships": int, "research_papers": int, "coding_score": float,
+}
+
+
+def read_records(stream, fmt: str) -> Iterator[dict]:
+    """
+    Yield one dict per JSONL line or CSV row of a text stream.
+
+    Only the current line is held in memory. Blank lines are skipped and
+    malformed JSON lines are yielded as None so they can be counted.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield record if isinstance(record, dict) else None
+    else:
+        raise ValueError(f"unknown format {fmt!r} (expected jsonl or csv)")
+
+
+def guess_format(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text(record: dict, key: str) -> Optional[str]:
+    value = record.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _opportunity_row(record: dict) -> Optional[dict]:
+    title, university = _text(record, "title"), _text(record, "university")
+    if not title or not university:
+        return None
+    posted = record.get("posted_date")
+    try:
+        posted_date = date.fromisoformat(str(posted)[:10]) if posted else date.today()
+    except ValueError:
+        return None
+    return {
+        "title": title,
+        "description": _text(record, "description"),
+        "university": university,
+        "domain": _text(record, "domain"),
+        "posted_date": posted_date,
+    }
+
+
+def _student_row(record: dict) -> Optional[dict]:
+    row = {name: _text(record, name) for name in _STUDENT_FIELDS}
+    if not row["name"]:
+        return None
+    row["domain_interest"] = row["domain_interest"] or "General"
+    try:
+        for name, cast in _STUDENT_NUMBERS.items():
+            row[name] = cast(row[name]) if row[name] is not None else cast(0)
+    except ValueError:
+        return None
+    return row
+
+
+@dataclass
+class IngestReport:
+    kind: str
+    read: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    # domain -> inserted opportunities
+    domains: Dict[str, int] = field(default_factory=dict)
+    # Ids of opportunities filed under DEFAULT_DOMAIN unclassified (classify=False)
+    unclassified: List[int] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind, "read": self.read, "inserted": self.inserted,
+            "duplicates": self.duplicates, "invalid": self.invalid, "chunks": self.chunks,
+            "seconds": round(self.seconds, 3), "rows_per_second": round(self.rate, 1),
+            "domains": self.domains, "unclassified": len(self.unclassified),
+        }
+
+    def summary(self) -> str:
+        return (f"{self.kind}: {self.read:,} read, {self.inserted:,} inserted, "
+                f"{self.duplicates:,} duplicates, {self.invalid:,} invalid "
+                f"in {self.seconds:.1f}s ({self.rate:,.0f} rows/s)")
+
+
+class Ingester:
+    """
+    Streams records into one table in bounded chunks.
+
+    Each chunk is validated, deduplicated against itself and the database
+    (opportunities by (title, university), students by email), classified
+    if it has no domain, and written with one executemany INSERT in its own
+    transaction. Memory use is one chunk regardless of feed size.
+
+    Descriptions are classified in a process pool when `workers` > 1; with
+    one worker (or a single CPU) they are classified inline, which avoids
+    the cost of shipping text between processes for no gain. With
+    `classify` false they are not classified here at all: the rows are
+    filed under DEFAULT_DOMAIN and their ids listed in the report, for the
+    caller to queue a reclassify job (see jobs.py).
+    """
+
+    def __init__(self, engine, kind: str, chunk_size: int = CHUNK_SIZE,
+                 workers: Optional[int] = None,
+                 progress: Optional[Callable[[IngestReport], None]] = None,
+                 classify: bool = True):
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r} (expected one of {', '.join(KINDS)})")
+        self.engine = engine
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.progress = progress
+        self.classify = classify
+
+    def run(self, records: Iterable[Optional[dict]]) -> IngestReport:
+        report = IngestReport(self.kind)
+        started = time.perf_counter()
+        pool = None
+        if self.kind == "opportunities" and self.classify and self.workers > 1:
+            # spawn: the web server calls this from a worker thread, and
+            # forking a multi-threaded process is unsafe
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            for chunk in chunked(records, self.chunk_size):
+                if self.kind == "opportunities":
+                    self._opportunities(chunk, report, pool)
+                else:
+                    self._students(chunk, report)
+                report.chunks += 1
+                report.seconds = time.perf_counter() - started
+                if self.progress:
+                    self.progress(report)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _classify(self, descriptions: List[str], pool) -> List[str]:
+        if pool is None:
+            return [classify_opportunity(d) for d in descriptions]
+        per_worker = max(1, len(descriptions) // (self.workers * 4))
+        return list(pool.map(classify_opportunity, descriptions, chunksize=per_worker))
+
+    def _opportunities(self, chunk: List[Optional[dict]], report: IngestReport, pool) -> None:
+        report.read += len(chunk)
+        rows = {}
+        for record in chunk:
+            row = _opportunity_row(record) if record else None
+            if row is None:
+                report.invalid += 1
+            elif (row["title"], row["university"]) in rows:
+                report.duplicates += 1
+            else:
+                rows[(row["title"], row["university"])] = row
+
+        with self.engine.begin() as conn:
+            if rows:
+                existing = conn.execute(
+                    select(Opportunity.title, Opportunity.university)
+                    .where(tuple_(Opportunity.title, Opportunity.university).in_(list(rows)))
+                ).all()
+                for key in existing:
+                    if rows.pop(tuple(key), None) is not None:
+                        report.duplicates += 1
+            unclassified = [row for row in rows.values() if not row["domain"]]
+            # Unclassified rows last, so their ids are the tail of the insert's
+            new = [row for row in rows.values() if row["domain"]] + unclassified
+            if self.classify:
+                domains = self._classify([row["description"] or "" for row in unclassified], pool)
+            else:
+                domains = [DEFAULT_DOMAIN] * len(unclassified)
+            for row, domain in zip(unclassified, domains):
+                row["domain"] = domain
+            if new and (self.classify or not unclassified):
+                conn.execute(insert(Opportunity), new)
+            elif new:
+                ids = conn.execute(
+                    insert(Opportunity).returning(Opportunity.id, sort_by_parameter_order=True), new
+                ).scalars().all()
+                report.unclassified.extend(ids[len(new) - len(unclassified):])
+
+        # Core inserts bypass the session hooks that keep the response cache
+        # current (the in-memory indexes follow the change log)
+        if new:
+            response_cache.invalidate()
+            data_versions.bump("opportunities")
+        per_domain = {}
+        for row in new:
+            per_domain[row["domain"]] = per_domain.get(row["domain"], 0) + 1
+        for domain, n in per_domain.items():
+            stats.record("opportunities", n, domain)
+            report.domains[domain] = report.domains.get(domain, 0) + n
+            # One summary per domain and chunk rather than an event per row
+            broadcaster.publish("opportunities", ("opportunities", f"domain:{domain}"),
+                                {"domain": domain, "count": n})
+        report.inserted += len(new)
+
+    def _students(self, chunk: List[Optional[dict]], report: IngestReport) -> None:
+        report.read += len(chunk)
+        rows, seen = [], set()
+        for record in chunk:
+            row = _student_row(record) if record else None
+            if row is None:
+                report.invalid += 1
+            elif row["email"] and row["email"].lower() in seen:
+                report.duplicates += 1
+            else:
+                if row["email"]:
+                    seen.add(row["email"].lower())
+                rows.append(row)
+
+        with self.engine.begin() as conn:
+            if seen:
+                existing = {
+                    email.lower() for email in conn.execute(
+                        select(Student.email).where(Student.email.in_(
+                            [row["email"] for row in rows if row["email"]]
+                        ))
+                    ).scalars()
+                }
+                kept = [row for row in rows if not row["email"] or row["email"].lower() not in existing]
+                report.duplicates += len(rows) - len(kept)
+                rows = kept
+            if rows:
+                conn.execute(insert(Student), rows)
+
+        stats.record("students", len(rows))
+        if rows:
+            response_cache.invalidate()
+            data_versions.bump("students")
+        report.inserted += len(rows)
+
+
+def ingest_stream(engine, kind: str, stream, fmt: str, **options) -> IngestReport:
+    """Ingest a text stream of JSONL or CSV records; see Ingester for options."""
+    return Ingester(engine, kind, **options).run(read_records(stream, fmt))
+
+
+def ingest_file(engine, kind: str, path: str, fmt: Optional[str] = None, **options) -> IngestReport:
+    with open(path, newline="", encoding="utf-8") as stream:
+        return ingest_stream(engine, kind, stream, fmt or guess_format(path), **options)
+
+
+def ingest_upload(engine, kind: str, binary, filename: str = "", fmt: Optional[str] = None,
+                  **options) -> IngestReport:
+    """Ingest a binary file object, e.g. an uploaded (disk-spooled) file."""
+    stream = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    try:
+        return ingest_stream(engine, kind, stream, fmt or guess_format(filename), **options)
+    finally:
+        stream.detach()
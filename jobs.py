@@ -0,0 +1,534 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import and_, bindparam, delete, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from cache import response_cache
+from candidates import candidate_index
+from classifier import classify_many
+from counters import recount
+from fragments import data_versions
+from leaderboard import score_index
+from models import Job, Opportunity
+from recommendations import recommender
+from stats import stats
+from typeahead import name_index
+
+logger = logging.getLogger(__name__)
+
+# Jobs run at once, each in a thread of the event loop's default executor
+WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# Runs per job before it is marked failed; retries wait RETRY_SECONDS,
+# doubling after each failure
+MAX_ATTEMPTS = 3
+RETRY_SECONDS = 5.0
+# How long shutdown waits for queued jobs before leaving them for next start
+DRAIN_SECONDS = float(os.environ.get("JOB_DRAIN_SECONDS", "30"))
+# Finished jobs older than this are deleted at startup
+HISTORY_DAYS = 7
+# Recent latencies kept for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+# Opportunities read and classified per transaction by the reclassify job
+RECLASSIFY_BATCH_SIZE = 2000
+# How often the jobs table is checked for jobs queued by other processes
+# (manage.py, other workers), and for periodic jobs that are due
+POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "5"))
+# kind -> seconds between runs queued by every server (0 disables). Counter
+# repair catches drift from writes made with the triggers missing.
+PERIODIC = {"recount": float(os.environ.get("RECOUNT_INTERVAL_SECONDS", str(6 * 3600)))}
+# A process refreshes the heartbeat of its running jobs every POLL_SECONDS;
+# a job whose heartbeat is older than this belongs to a process that is gone
+LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+
+# kind -> handler(engine, payload, stop). See register().
+HANDLERS: Dict[str, Callable[[Any, dict, threading.Event], Any]] = {}
+# Kinds that work on the memory of the process that queued them
+LOCAL_KINDS = set()
+
+
+def _process_id() -> str:
+    # Unique per process start, even where pids repeat (containers, forks)
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Interrupted(Exception):
+    """Raised by a handler that saw `stop` set; the job is queued again."""
+
+
+def register(kind: str, local: bool = False):
+    """
+    Register a handler for jobs of `kind`.
+
+    A `local` job, such as an in-memory index rebuild, is run only by the
+    process that queued it; any other job by whichever process takes it
+    first.
+
+    Handlers run in a worker thread with the engine, the job's payload
+    and the queue's stop event, and return a JSON-serializable result.
+    They must be safe to run again: a job whose handler raises is retried,
+    and one interrupted by a shutdown runs again at the next start. Long
+    handlers should check `stop` between steps and raise Interrupted.
+    """
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        if local:
+            LOCAL_KINDS.add(kind)
+        return fn
+    return decorator
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1] * 1000, 1)}
+
+
+class JobQueue:
+    """
+    Persisted background jobs run by a pool of asyncio workers.
+
+    enqueue() writes a row to the jobs table and hands its id to the event
+    loop, so a request handler (in its worker thread) returns as soon as
+    the row is committed. Workers take ids off an asyncio.Queue and run the
+    blocking handler in a thread. A failed job is queued again with
+    exponential backoff until max_attempts; jobs left queued by a shutdown
+    are picked up again by start(). Every POLL_SECONDS the table is checked
+    for jobs queued by other processes, which enqueue without a running
+    loop (see attach()), and PERIODIC jobs are queued when due.
+
+    Several processes can share the table. Each job row names its `owner`:
+    the process running it, or for LOCAL_KINDS the one that queued it and
+    alone may run it. Owners refresh the heartbeat of their jobs at every
+    poll. A running job whose heartbeat is older than LEASE_SECONDS was cut
+    off by a crash and is queued again for anyone; a local job of a process
+    that is gone is marked failed, since no other process can run it.
+
+    Job rows are written with Core statements, outside the ORM session
+    hooks that track data changes. The response cache still sees each of
+    these commits through PRAGMA data_version (see cache.py) and clears,
+    which costs a few re-rendered pages per job and one per POLL_SECONDS
+    while a job runs; an idle queue writes nothing.
+    """
+
+    def __init__(self, workers: int = WORKERS, max_attempts: int = MAX_ATTEMPTS,
+                 retry_seconds: float = RETRY_SECONDS, handlers: Dict[str, Callable] = HANDLERS,
+                 poll_seconds: float = POLL_SECONDS, periodic: Dict[str, float] = PERIODIC,
+                 local_kinds: set = LOCAL_KINDS, lease_seconds: float = LEASE_SECONDS):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.handlers = handlers
+        self.poll_seconds = poll_seconds
+        self.periodic = periodic
+        self.local_kinds = local_kinds
+        self.lease_seconds = lease_seconds
+        self.owner: Optional[str] = None  # set by start() or attach(), in the process that runs
+        self.engine = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._poller: Optional[asyncio.Task] = None
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        # Ids handed to the queue or a timer and not yet taken by a worker
+        self._scheduled = set()
+        self._next_run: Dict[str, float] = {}
+        self._closing = False
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.running = 0
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.done = 0
+        self.failed = 0
+        self.retried = 0
+        self.interrupted = 0
+        self._waits = deque(maxlen=LATENCY_SAMPLES)
+        self._runs: Dict[str, deque] = {}
+
+    # ---- lifecycle ----
+
+    async def start(self, engine) -> None:
+        """Resume unfinished jobs and start the workers (on the running loop)."""
+        if self._tasks:
+            return
+        self.engine = engine
+        self.owner = _process_id()
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._closing = False
+        self._stop.clear()
+        for job_id, run_after in await asyncio.to_thread(self._recover):
+            self._schedule(job_id, run_after)
+        self._tasks = [asyncio.create_task(self._work(), name=f"job-worker-{i}")
+                       for i in range(self.workers)]
+        self._poller = asyncio.create_task(self._poll(), name="job-poller")
+
+    def attach(self, engine) -> None:
+        """
+        Enqueue into `engine`'s jobs table without running jobs in this
+        process (manage.py). A running server picks them up at its next poll.
+        """
+        self.engine = engine
+        self.owner = _process_id()
+
+    async def stop(self, timeout: Optional[float] = DRAIN_SECONDS) -> None:
+        """
+        Drain: wait up to `timeout` seconds for queued jobs to finish, then
+        stop the workers. Past the timeout, jobs not yet started stay queued
+        in the table and running ones are asked to stop at their next check;
+        no handler is abandoned halfway through a write.
+        """
+        if not self._tasks:
+            return
+        self._closing = True
+        self._poller.cancel()
+        for handle in self._timers.values():
+            handle.cancel()
+        self._timers.clear()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self._stop.set()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self._queue.task_done()
+            await self._queue.join()
+        tasks, self._tasks = self._tasks + [self._poller], []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _recover(self):
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            conn.execute(delete(Job).where(Job.finished_at < now - timedelta(days=HISTORY_DAYS)))
+            self._release_abandoned(conn, now)
+            return conn.execute(
+                select(Job.id, Job.run_after).where(self._runnable()).order_by(Job.id)
+            ).all()
+
+    def _runnable(self):
+        """Queued jobs this process may run."""
+        return and_(Job.status == "queued", or_(Job.owner.is_(None), Job.owner == self.owner))
+
+    def _release_abandoned(self, conn, now: datetime) -> None:
+        """Requeue jobs cut off by a crash elsewhere; fail local jobs of a process that is gone."""
+        stale = and_(
+            or_(Job.owner.is_(None), Job.owner != self.owner),
+            or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < now - timedelta(seconds=self.lease_seconds)),
+        )
+        local = Job.kind.in_(self.local_kinds)
+        # Handlers are safe to re-run
+        conn.execute(update(Job).where(Job.status == "running", stale, ~local)
+                     .values(status="queued", owner=None))
+        conn.execute(update(Job).where(Job.status.in_(("queued", "running")), Job.owner.is_not(None),
+                                       stale, local)
+                     .values(status="failed", finished_at=now, last_error="owner process is gone"))
+
+    # ---- enqueueing ----
+
+    def enqueue(self, kind: str, payload: Optional[dict] = None,
+                max_attempts: Optional[int] = None) -> int:
+        """
+        Persist a job and return its id without waiting for it to run.
+
+        Safe to call from any thread. A job identical to one still waiting
+        for its first run (for a local kind, one queued by this process) is
+        not added again; that job's id is returned. Raises ValueError for
+        an unknown kind.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"unknown job kind {kind!r}")
+        data = json.dumps(payload or {}, sort_keys=True)
+        now = datetime.utcnow()
+        owner = self.owner if kind in self.local_kinds else None
+        with self.engine.begin() as conn:
+            job_id = conn.execute(
+                select(Job.id).where(Job.status == "queued", Job.kind == kind,
+                                     Job.payload == data, Job.attempts == 0,
+                                     Job.owner.is_(None) if owner is None else Job.owner == owner).limit(1)
+            ).scalar()
+            if job_id is not None:
+                with self._lock:
+                    self.deduplicated += 1
+                return job_id
+            job_id = conn.execute(insert(Job).values(
+                kind=kind, payload=data, status="queued", attempts=0,
+                max_attempts=max_attempts or self.max_attempts, created_at=now, run_after=now,
+                owner=owner, heartbeat_at=now if owner else None
+            )).inserted_primary_key[0]
+        with self._lock:
+            self.enqueued += 1
+        self._notify(job_id, now)
+        return job_id
+
+    def _notify(self, job_id: int, run_after: datetime) -> None:
+        # Without a running loop the row waits in the table for start()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._schedule, job_id, run_after)
+
+    def _schedule(self, job_id: int, run_after: datetime) -> None:
+        if self._closing or self._queue is None:
+            return
+        with self._lock:
+            if job_id in self._scheduled:
+                return
+            self._scheduled.add(job_id)
+        delay = (run_after - datetime.utcnow()).total_seconds()
+        if delay > 0:
+            self._timers[job_id] = self._loop.call_later(delay, self._release, job_id)
+        else:
+            self._queue.put_nowait(job_id)
+
+    def _release(self, job_id: int) -> None:
+        self._timers.pop(job_id, None)
+        self._queue.put_nowait(job_id)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                for job_id, run_after in await asyncio.to_thread(self._due):
+                    self._schedule(job_id, run_after)
+            except Exception:
+                logger.exception("polling the jobs table failed")
+
+    def _due(self):
+        """
+        Refresh this process's leases, release those of processes that are
+        gone and queue the periodic jobs that are due; return the queued
+        jobs this process may run and has not scheduled yet.
+        """
+        stamp = datetime.utcnow()
+        with self.engine.begin() as conn:
+            # Matches no row, and so commits nothing, while this process has no jobs
+            conn.execute(update(Job).where(Job.owner == self.owner, Job.status.in_(("queued", "running")))
+                         .values(heartbeat_at=stamp))
+            self._release_abandoned(conn, stamp)
+        now = time.monotonic()
+        for kind, interval in self.periodic.items():
+            if not interval:
+                continue
+            due = self._next_run.setdefault(kind, now + interval)
+            if now >= due:
+                self._next_run[kind] = now + interval
+                self.enqueue(kind)
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(Job.id, Job.run_after).where(self._runnable())).all()
+        with self._lock:
+            return [row for row in rows if row.id not in self._scheduled]
+
+    # ---- running ----
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._run, job_id)
+            except Exception:
+                pass  # the job's row records handler errors; this is bookkeeping failing
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: int) -> None:
+        with self._lock:
+            self._scheduled.discard(job_id)
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            job = conn.execute(
+                update(Job).where(Job.id == job_id, self._runnable())
+                .values(status="running", attempts=Job.attempts + 1, started_at=now,
+                        owner=self.owner, heartbeat_at=now)
+                .returning(Job.kind, Job.payload, Job.attempts, Job.max_attempts, Job.run_after)
+            ).first()
+        if job is None:
+            return  # already run, or handed to the queue twice
+        with self._lock:
+            self.running += 1
+            self._waits.append(max(0.0, (now - job.run_after).total_seconds()))
+        started = time.perf_counter()
+        values = {}
+        try:
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"no handler for job kind {job.kind!r}")
+            result = handler(self.engine, json.loads(job.payload or "{}"), self._stop)
+        except Interrupted:
+            values = {"status": "queued", "attempts": job.attempts - 1, "started_at": None}
+            counter = "interrupted"
+        except Exception as exc:
+            values = {"last_error": f"{type(exc).__name__}: {exc}"}
+            if job.attempts < job.max_attempts:
+                run_after = datetime.utcnow() + timedelta(
+                    seconds=self.retry_seconds * 2 ** (job.attempts - 1))
+                values.update(status="queued", run_after=run_after)
+                counter = "retried"
+            else:
+                values.update(status="failed", finished_at=datetime.utcnow())
+                counter = "failed"
+        else:
+            values = {"status": "done", "finished_at": datetime.utcnow(),
+                      "result": json.dumps(result, default=str)}
+            counter = "done"
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self._runs.setdefault(job.kind, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+        if values["status"] == "queued" and job.kind not in self.local_kinds:
+            values["owner"] = None  # the next attempt may run anywhere
+        with self.engine.begin() as conn:
+            # Unless a lease this process failed to renew was taken over
+            conn.execute(update(Job).where(Job.id == job_id, Job.owner == self.owner).values(**values))
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        if counter == "retried":
+            self._notify(job_id, values["run_after"])
+
+    # ---- inspection ----
+
+    def get(self, job_id: int) -> Optional[dict]:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(Job).where(Job.id == job_id)).mappings().first()
+        if row is None:
+            return None
+        job = dict(row)
+        for name in ("payload", "result"):
+            job[name] = json.loads(job[name]) if job[name] else None
+        for name in ("created_at", "run_after", "started_at", "finished_at", "heartbeat_at"):
+            job[name] = job[name].isoformat() if job[name] else None
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self._tasks),
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "waiting_to_retry": len(self._timers),
+                "running": self.running,
+                "enqueued": self.enqueued,
+                "deduplicated": self.deduplicated,
+                "done": self.done,
+                "failed": self.failed,
+                "retried": self.retried,
+                "interrupted": self.interrupted,
+                # From due (enqueued, or the retry time) to started
+                "wait_ms": _percentiles(self._waits),
+                "run_ms": {kind: _percentiles(runs) for kind, runs in sorted(self._runs.items())},
+            }
+
+
+job_queue = JobQueue()
+
+
+# ---- job kinds ----
+
+@register("warm", local=True)
+def warm_indexes(engine, payload: dict, stop: threading.Event) -> None:
+    """Build whichever in-memory indexes are not loaded yet (run at startup)."""
+    with Session(engine) as db:
+        name_index.ensure_current(db)
+        if stop.is_set():
+            raise Interrupted
+        candidate_index.ensure_current(db)
+        if stop.is_set():
+            raise Interrupted
+        score_index.ensure_current(db)
+        if stop.is_set():
+            raise Interrupted
+        recommender.ensure_current(db)
+
+
+@register("scores", local=True)
+def refresh_scores(engine, payload: dict, stop: threading.Event) -> dict:
+    """
+    Rebuild the leaderboard's score index, the student name index and the
+    candidate shortlist index from the students table, e.g. after students
+    were changed outside the app. Also drops name index words left by
+    renamed and deleted students.
+    """
+    with Session(engine) as db:
+        score_index.rebuild(db)
+        name_index.rebuild(db)
+        candidate_index.rebuild(db)
+    response_cache.invalidate()
+    return {"students": score_index.total}
+
+
+@register("recommendations", local=True)
+def rebuild_recommendations(engine, payload: dict, stop: threading.Event) -> None:
+    """Rebuild the recommendation index from the opportunities table."""
+    with Session(engine) as db:
+        recommender.rebuild(db)
+
+
+@register("recount")
+def repair_counters(engine, payload: dict, stop: threading.Event) -> dict:
+    """Recompute the trigger-kept counters and fix any that drifted (see counters.py)."""
+    with engine.begin() as conn:
+        fixed = recount(conn)
+    if any(fixed.values()):
+        response_cache.invalidate()
+        for name, n in fixed.items():
+            if n:
+                data_versions.bump(name.split(".")[0])
+    return fixed
+
+
+@register("reclassify")
+def reclassify(engine, payload: dict, stop: threading.Event) -> dict:
+    """
+    Run the domain classifier again over opportunities (all, or those in
+    payload["ids"]) and store the domains that changed, e.g. after the
+    keyword table in classifier.py was edited.
+    """
+    ids = sorted(payload["ids"]) if payload.get("ids") is not None else None
+    checked = changed = 0
+    last_id = 0
+    while True:
+        if stop.is_set():
+            raise Interrupted
+        with engine.begin() as conn:
+            query = select(Opportunity.id, Opportunity.description,
+                           Opportunity.domain).where(Opportunity.id > last_id)
+            if ids is not None:
+                # A slice at a time, to stay under SQLite's bound parameter limit
+                batch, ids = ids[:RECLASSIFY_BATCH_SIZE], ids[RECLASSIFY_BATCH_SIZE:]
+                query = query.where(Opportunity.id.in_(batch))
+            rows = conn.execute(query.order_by(Opportunity.id).limit(RECLASSIFY_BATCH_SIZE)).all()
+            if not rows and not ids:
+                break
+            last_id = rows[-1].id if rows else last_id
+            moved = [
+                (row, domain)
+                for row, domain in zip(rows, classify_many(row.description or "" for row in rows))
+                if domain != row.domain
+            ]
+            if moved:
+                conn.execute(
+                    update(Opportunity).where(Opportunity.id == bindparam("b_id"))
+                    .values(domain=bindparam("b_domain")),
+                    [{"b_id": row.id, "b_domain": domain} for row, domain in moved]
+                )
+        checked += len(rows)
+        changed += len(moved)
+    if changed:
+        response_cache.invalidate()
+        data_versions.bump("opportunities")
+        stats.invalidate()
+    return {"checked": checked, "changed": changed}
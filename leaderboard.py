@@ -0,0 +1,169 @@
+import threading
+from array import array
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from changes import LogFollower
+from models import Student
+
+PAGE_SIZE = 50
+
+
+def _score_key(score: float) -> int:
+    # Scores are rounded to cents, so cents make an exact integer key.
+    return max(0, int(round((score or 0) * 100)))
+
+
+class ScoreIndex(LogFollower):
+    """
+    Order-statistics index over InCoScores for O(log n) rank lookups.
+
+    A Fenwick tree counts students per score (in cents), and an array by
+    id holds each student's own score key, so a changed or deleted student
+    can be taken out of the count it was in. It is built from one pass over
+    `ix_students_incoscore_id` and follows the change log (see changes.py),
+    so scores changed by another worker, `manage.py` or raw SQL are counted
+    at the next lookup.
+    """
+
+    tables = ("students",)
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._tree = [0] * 2
+        self._keys = array("l")  # id -> score key, -1 if absent
+        self._total = 0
+
+    def _grow(self, key: int) -> None:
+        size = len(self._tree) - 1
+        if key < size:
+            return
+        while size <= key:
+            size *= 2
+        counts = self._counts()
+        self._tree = [0] * (size + 1)
+        for k, n in counts.items():
+            self._add(k, n)
+
+    def _counts(self) -> dict:
+        counts = {}
+        for key in range(len(self._tree) - 1):
+            n = self._prefix(key) - (self._prefix(key - 1) if key else 0)
+            if n:
+                counts[key] = n
+        return counts
+
+    def _add(self, key: int, delta: int) -> None:
+        i = key + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, key: int) -> int:
+        """Number of students whose score key is <= key."""
+        i, total = min(key + 1, len(self._tree) - 1), 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _load(self, db) -> None:
+        # In index order, so this walks ix_students_incoscore_id rather than the table
+        rows = db.connection().execute(
+            select(Student.id, Student.incoscore).order_by(Student.incoscore.desc(), Student.id)
+        ).all()
+        keys = array("l", [-1]) * (max((sid for sid, _ in rows), default=0) + 1)
+        counts = {}
+        for sid, score in rows:
+            key = keys[sid] = _score_key(score)
+            counts[key] = counts.get(key, 0) + 1
+        size = 2
+        while size <= max(counts, default=0):
+            size *= 2
+        with self._lock:
+            self._tree = [0] * (size + 1)
+            for key, n in counts.items():
+                self._add(key, n)
+            self._keys = keys
+            self._total = len(rows)
+
+    def _replay(self, db, table: str, ids) -> None:
+        scores = dict(db.connection().execute(
+            select(Student.id, Student.incoscore).where(Student.id.in_(ids))
+        ).all())
+        with self._lock:
+            for sid in ids:
+                old = self._keys[sid] if sid < len(self._keys) else -1
+                new = _score_key(scores[sid]) if sid in scores else -1
+                if old == new:
+                    continue
+                if old >= 0:
+                    self._add(old, -1)
+                    self._total -= 1
+                if new >= 0:
+                    self._grow(new)
+                    self._add(new, 1)
+                    self._total += 1
+                if sid >= len(self._keys):
+                    self._keys.extend([-1] * (sid + 1 - len(self._keys)))
+                self._keys[sid] = new
+
+    def count_above(self, score: float) -> int:
+        with self._lock:
+            return self._total - self._prefix(_score_key(score))
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+
+score_index = ScoreIndex()
+
+
+def rank_of(db, student: Student) -> int:
+    """
+    1-based leaderboard position of `student`.
+
+    Students with a higher score come from the Fenwick tree, brought up to
+    date with the database first; ties are broken by id, which only needs
+    an index seek over students sharing the score.
+    """
+    score_index.ensure_current(db)
+    ties_before = db.execute(
+        select(func.count()).select_from(Student).where(
+            Student.incoscore == student.incoscore,
+            Student.id < student.id
+        )
+    ).scalar_one()
+    return score_index.count_above(student.incoscore) + ties_before + 1
+
+
+def ranked_total(db) -> int:
+    """Number of students on the leaderboard."""
+    score_index.ensure_current(db)
+    return score_index.total
+
+
+def leaderboard_page(db, after_score: Optional[float] = None, after_id: Optional[int] = None,
+                     limit: int = PAGE_SIZE):
+    """
+    One page of students in leaderboard order, using keyset pagination.
+
+    Returns (students, has_more). Pass the score and id of the last student
+    on the previous page to continue after it; cost is independent of how
+    deep into the leaderboard the page is.
+    """
+    query = db.query(Student)
+    if after_score is not None and after_id is not None:
+        query = query.filter(
+            Student.incoscore <= after_score,
+            (Student.incoscore < after_score) | (Student.id > after_id)
+        )
+    rows = query.order_by(Student.incoscore.desc(), Student.id).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def top_students(db, limit: int):
+    return db.query(Student).order_by(Student.incoscore.desc(), Student.id).limit(limit).all()
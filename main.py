@@ -1,195 +1,64 @@
 from contextlib import asynccontextmanager
-from datetime import date
+from typing import List
 
-from fastapi import FastAPI, Request, Form
-from fastapi.staticfiles import StaticFiles
+from anyio import to_thread
+from fastapi import FastAPI, Request, Form, Depends, File, Query, UploadFile, WebSocket
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload
 
-from database import engine, SessionLocal, Base
+from database import engine, read_engine, ReadSessionLocal, POOL_SIZE, get_read_db
 from models import Opportunity, Student, Application, Post, Comment
-from helpers import calculate_incoscore, classify_opportunity
-
-
-def seed_database():
-    """Seed the database with initial sample data."""
-    db = SessionLocal()
-    try:
-        # Check if data already exists
-        if db.query(Opportunity).first() is not None:
-            return
-
-        # Seed Ivy League opportunities with auto-classified domains
-        opportunity_data = [
-            {
-                "title": "AI Research Fellowship",
-                "description": "Join Harvard's cutting-edge AI research lab to work on machine learning and neural networks.",
-                "university": "Harvard",
-                "posted_date": date(2026, 2, 15)
-            },
-            {
-                "title": "Data Science Summer Internship",
-                "description": "Yale's Data Science Institute offers hands-on experience with big data analytics.",
-                "university": "Yale",
-                "posted_date": date(2026, 2, 10)
-            },
-            {
-                "title": "Legal Policy Research Program",
-                "description": "Princeton's law and policy center seeks students for legal research and policy analysis.",
-                "university": "Princeton",
-                "posted_date": date(2026, 2, 8)
-            },
-            {
-                "title": "Biomedical Research Assistant",
-                "description": "Columbia's biomedical center needs research assistants for clinical health studies.",
-                "university": "Columbia",
-                "posted_date": date(2026, 2, 5)
-            },
-            {
-                "title": "Robotics Engineering Fellowship",
-                "description": "Penn's robotics lab offers engineering and hardware development opportunities.",
-                "university": "UPenn",
-                "posted_date": date(2026, 1, 28)
-            },
-            {
-                "title": "Quantum Computing Research",
-                "description": "MIT's quantum computing lab seeks students for quantum algorithm and quantum machine learning research.",
-                "university": "MIT",
-                "posted_date": date(2026, 2, 12)
-            },
-            {
-                "title": "Constitutional Law Clinic",
-                "description": "Stanford Law School invites students to participate in constitutional law litigation and legal advocacy.",
-                "university": "Stanford",
-                "posted_date": date(2026, 2, 1)
-            },
-            {
-                "title": "Neuroscience Research Fellowship",
-                "description": "Brown's neuroscience department offers clinical brain research and cognitive science studies.",
-                "university": "Brown",
-                "posted_date": date(2026, 1, 25)
-            },
-            {
-                "title": "Sustainable Engineering Initiative",
-                "description": "Cornell's engineering school focuses on renewable energy and sustainable infrastructure development.",
-                "university": "Cornell",
-                "posted_date": date(2026, 1, 20)
-            },
-            {
-                "title": "Healthcare Informatics Program",
-                "description": "Dartmouth's medical school offers healthcare data analytics and medical AI research opportunities.",
-                "university": "Dartmouth",
-                "posted_date": date(2026, 1, 15)
-            }
-        ]
-        
-        opportunities = [
-            Opportunity(
-                title=data["title"],
-                description=data["description"],
-                university=data["university"],
-                domain=classify_opportunity(data["description"]),
-                posted_date=data["posted_date"]
-            )
-            for data in opportunity_data
-        ]
-
-        # Seed students with different metrics
-        students = [
-            Student(
-                name="Alice Chen",
-                email="alice@university.edu",
-                domain_interest="AI",
-                skills="Python, TensorFlow, PyTorch, Machine Learning",
-                bio="AI enthusiast passionate about neural networks and deep learning research.",
-                hackathons=5,
-                internships=2,
-                research_papers=1,
-                coding_score=92.5
-            ),
-            Student(
-                name="Bob Martinez",
-                email="bob@university.edu",
-                domain_interest="Law",
-                skills="Legal Research, Policy Analysis, Public Speaking",
-                bio="Aspiring legal scholar interested in tech policy and intellectual property.",
-                hackathons=3,
-                internships=1,
-                research_papers=0,
-                coding_score=85.0
-            ),
-            Student(
-                name="Carol Williams",
-                email="carol@university.edu",
-                domain_interest="Biomedical",
-                skills="R, SPSS, Clinical Research, Data Analysis",
-                bio="Pre-med student focused on biomedical informatics and clinical studies.",
-                hackathons=2,
-                internships=3,
-                research_papers=3,
-                coding_score=88.0
-            ),
-            Student(
-                name="David Park",
-                email="david@university.edu",
-                domain_interest="Engineering",
-                skills="C++, MATLAB, CAD, Robotics, Embedded Systems",
-                bio="Mechanical engineering student with a passion for robotics and automation.",
-                hackathons=6,
-                internships=2,
-                research_papers=2,
-                coding_score=90.0
-            ),
-            Student(
-                name="Elena Rodriguez",
-                email="elena@university.edu",
-                domain_interest="AI",
-                skills="Python, NLP, Computer Vision, Deep Learning",
-                bio="Graduate researcher specializing in natural language processing and AI ethics.",
-                hackathons=4,
-                internships=3,
-                research_papers=5,
-                coding_score=95.0
-            ),
-            Student(
-                name="Frank Thompson",
-                email="frank@university.edu",
-                domain_interest="Biomedical",
-                skills="Biology, Chemistry, Lab Techniques, Medical Research",
-                bio="Pre-med student interested in pharmaceutical research and drug discovery.",
-                hackathons=1,
-                internships=2,
-                research_papers=2,
-                coding_score=78.0
-            ),
-            Student(
-                name="Grace Liu",
-                email="grace@university.edu",
-                domain_interest="Law",
-                skills="Constitutional Law, International Law, Debate, Writing",
-                bio="Law student focused on human rights and international policy.",
-                hackathons=2,
-                internships=4,
-                research_papers=1,
-                coding_score=82.0
-            )
-        ]
-
-        db.add_all(opportunities)
-        db.add_all(students)
-        db.commit()
-    finally:
-        db.close()
+from search import ranked_matches
+from leaderboard import PAGE_SIZE, leaderboard_page, rank_of, ranked_total, top_students
+from stats import stats
+from feed import SORTS as FEED_SORTS, encode_cursor, feed_cursor, has_archived_posts, load_comments, load_feed
+from ingest import KINDS, ingest_upload
+from recommendations import recommender
+from cache import ResponseCacheMiddleware, response_cache
+from writer import write_queue
+from migrations import ensure_schema
+from metrics import MetricsMiddleware, instrument_engines, instrument_templates, metrics
+from broadcast import broadcaster, parse_topics, sse_stream, websocket_session
+from fragments import install_fragment_cache
+from assets import PrecompressedStaticFiles, install_asset_urls, load_manifest
+from autoapply import apply_in_session, auto_apply
+from archive import archiver, load_archived_applications
+from jobs import HANDLERS as JOB_KINDS, job_queue
+from streaming import (STREAM_BATCH_SIZE, STREAM_THRESHOLD, leaderboard_export, ndjson_response,
+                       opportunity_export, stream_busy, stream_slots, stream_template)
+from candidates import MAX_SHORTLIST_SIZE, SHORTLIST_SIZE, shortlist
+from typeahead import MAX_PAGE_SIZE, PAGE_SIZE as LOOKUP_PAGE_SIZE, find_students, student_json
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan - initialize database on startup."""
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
-    # Seed with initial data
-    seed_database()
+    # Handlers are sync and run in the worker thread pool, keeping blocking
+    # SQLite calls off the event loop; one worker per pooled connection.
+    to_thread.current_default_thread_limiter().total_tokens = POOL_SIZE
+    # Bring older databases up to date; a current one only has its stamped
+    # schema version read. Sample data is loaded by `manage.py seed`.
+    ensure_schema(engine)
+    # Cached pages are also dropped after writes made outside this process
+    response_cache.watch(engine.url.database)
+    write_queue.start()
+    # Background jobs, resuming any a previous run left unfinished (see jobs.py)
+    await job_queue.start(engine)
+    # Build the in-memory indexes off the startup path (see typeahead.py,
+    # candidates.py, leaderboard.py and recommendations.py)
+    job_queue.enqueue("warm")
+    # Live updates are pushed from whichever thread commits (see broadcast.py)
+    broadcaster.start()
+    # Moves closed applications and stale posts to the archive tables
+    archiver.start(engine)
     yield
+    # Let queued jobs finish, up to JOB_DRAIN_SECONDS
+    await job_queue.stop()
+    archiver.stop()
+    broadcaster.stop()
+    # Commit whatever writes are still queued
+    write_queue.stop()
 
 
 # Create FastAPI application
@@ -203,292 +72,521 @@ app = FastAPI(
 # Configure Jinja2 templates
 templates = Jinja2Templates(directory="templates")
 
-# Mount static files directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# {% cache %} fragments and compiled templates kept on disk (see fragments.py)
+install_fragment_cache(templates.env)
+
+# Per-route latency, SQL and template timings, served at /metrics
+instrument_templates(templates.env)
+instrument_engines(engine, read_engine)
+
+# Static files. After `manage.py build-static`, pages link content-hashed
+# copies, served precompressed and cached as immutable (see assets.py)
+asset_manifest = load_manifest()
+install_asset_urls(templates.env, asset_manifest)
+app.mount("/static", PrecompressedStaticFiles(directory="static", manifest=asset_manifest), name="static")
+
+# Rendered pages are cached until the next committed write by anyone (see cache.py)
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+# Outermost, so responses served from the cache are timed too
+app.add_middleware(MetricsMiddleware, routes=app.router.routes)
 
 
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request, student_id: int = None, search: str = None, domain: str = None):
+def home(
+    request: Request,
+    student_id: int = None,
+    search: str = None,
+    domain: str = None,
+    sort: str = None,
+    db: Session = Depends(get_read_db)
+):
     """Home page displaying opportunities and students with optional filtering."""
-    db = SessionLocal()
-    try:
-        students = db.query(Student).all()
-        selected_student = None
-        
-        # Base query
-        query = db.query(Opportunity)
-        
-        # Filter by student's domain interest
-        if student_id:
-            selected_student = db.query(Student).filter(Student.id == student_id).first()
-            if selected_student:
-                query = query.filter(Opportunity.domain == selected_student.domain_interest)
-        
-        # Filter by domain
-        if domain:
-            query = query.filter(Opportunity.domain == domain)
-        
-        # Search by title or description
-        if search:
-            query = query.filter(
-                (Opportunity.title.ilike(f"%{search}%")) | 
-                (Opportunity.description.ilike(f"%{search}%"))
-            )
-        
-        opportunities = query.order_by(Opportunity.posted_date.desc()).all()
-        
-        # Get all domains for filter dropdown
-        all_domains = [d[0] for d in db.query(Opportunity.domain).distinct().all()]
-        
-        # Recommendations (if student selected, show matching domain opportunities not yet applied)
-        recommendations = []
+    selected_student = None
+    
+    # Base query
+    query = db.query(Opportunity)
+    
+    # Filter by student's domain interest
+    if student_id:
+        selected_student = db.query(Student).filter(Student.id == student_id).first()
         if selected_student:
-            applied_opp_ids = [a.opportunity_id for a in db.query(Application).filter(
-                Application.student_id == selected_student.id
-            ).all()]
-            recommendations = db.query(Opportunity).filter(
-                Opportunity.domain == selected_student.domain_interest,
-                ~Opportunity.id.in_(applied_opp_ids) if applied_opp_ids else True
-            ).limit(3).all()
-        
-        students_with_scores = [
-            {"student": s, "incoscore": calculate_incoscore(s)} for s in students
-        ]
-        
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "opportunities": opportunities,
-                "students": students_with_scores,
-                "selected_student": selected_student,
-                "all_domains": all_domains,
-                "current_domain": domain,
-                "search_query": search or "",
-                "recommendations": recommendations
-            }
-        )
-    finally:
+            query = query.filter(Opportunity.domain == selected_student.domain_interest)
+    
+    # Filter by domain
+    if domain:
+        query = query.filter(Opportunity.domain == domain)
+    
+    # Full-text search over title, description and university, best matches first
+    matches = ranked_matches(search) if search else None
+    if matches is not None:
+        query = query.join(matches, matches.c.opportunity_id == Opportunity.id)
+    if sort == "applied":
+        # Most applied first, off the application_count indexes
+        query = query.order_by(Opportunity.application_count.desc(), Opportunity.id.desc())
+    elif matches is not None:
+        query = query.order_by(matches.c.rank, Opportunity.posted_date.desc())
+    else:
+        query = query.order_by(Opportunity.posted_date.desc())
+
+    # Short listings render in one piece (and are cached); longer ones are
+    # counted and streamed from a session that stays open until the last
+    # row is sent (see streaming.py)
+    opportunities = query.limit(STREAM_THRESHOLD + 1).all()
+    opportunity_count = len(opportunities)
+    streaming = opportunity_count > STREAM_THRESHOLD
+    if streaming:
+        opportunity_count = query.order_by(None).count()
+
+    # Recommendations from skill/keyword overlap, domain and recency, cached
+    # per student until they apply or new opportunities arrive
+    recommendations = []
+    if selected_student:
+        recommendations = recommender.recommend(db, selected_student, limit=3)
+
+    # The student picker looks students up as you type (/api/students), so
+    # only the top of the leaderboard is loaded here
+    students_with_scores = [
+        {"student": s, "incoscore": s.incoscore} for s in top_students(db, 9)
+    ]
+
+    stream_db = None
+    if streaming:
+        # Refused before any connection is opened for the stream
+        if not stream_slots.acquire(blocking=False):
+            return stream_busy()
+        # The request's connection goes back to the pool before the stream
+        # takes one, so a request never holds two while it waits
         db.close()
+        stream_db = ReadSessionLocal()
+        opportunities = query.with_session(stream_db).yield_per(STREAM_BATCH_SIZE)
+
+    # Domains for the filter dropdown, only read if the cached options are stale
+    all_domains = (d for (d,) in (stream_db or db).query(Opportunity.domain).distinct())
+
+    context = {
+        "request": request,
+        "opportunities": opportunities,
+        "opportunity_count": opportunity_count,
+        "students": students_with_scores,
+        "selected_student": selected_student,
+        "all_domains": all_domains,
+        "current_domain": domain,
+        "search_query": search or "",
+        "sort": sort,
+        "recommendations": recommendations
+    }
+    if stream_db is not None:
+        return stream_template(templates, "index.html", context, stream_db, slot_held=True)
+    return templates.TemplateResponse("index.html", context)
 
 
 @app.get("/leaderboard", response_class=HTMLResponse)
-async def leaderboard(request: Request):
+def leaderboard(request: Request, after_score: float = None, after_id: int = None, db: Session = Depends(get_read_db)):
     """Leaderboard page showing students ranked by InCoScore."""
-    db = SessionLocal()
+    # One page in (score, id) order, continuing after the previous page
+    students, has_more = leaderboard_page(db, after_score, after_id)
+    
+    # Rank the first row once, then count down the page
+    first_rank = rank_of(db, students[0]) if students else 1
+    ranked_students = [
+        {"student": s, "incoscore": s.incoscore, "rank": rank}
+        for rank, s in enumerate(students, start=first_rank)
+    ]
+    
+    next_page = None
+    if has_more:
+        last = students[-1]
+        next_page = f"/leaderboard?after_score={last.incoscore}&after_id={last.id}"
+    
+    return templates.TemplateResponse(
+        "leaderboard.html",
+        {
+            "request": request,
+            "ranked_students": ranked_students,
+            "next_page": next_page,
+            "page_size": PAGE_SIZE,
+            "total_students": ranked_total(db)
+        }
+    )
+
+
+@app.get("/api/leaderboard/preview")
+def leaderboard_preview(weights: str, k: int = 10, db: Session = Depends(get_read_db)):
+    """Top-k under an alternate weighting ("2,3,4,0.1"), next to the live ranking."""
+    # Imported on first use, keeping numpy (~0.1s) off every worker start
+    from scoring import compare_weightings, parse_weights
+
     try:
-        students = db.query(Student).all()
-        
-        # Calculate scores and sort by descending score
-        ranked_students = sorted(
-            [{"student": s, "incoscore": calculate_incoscore(s)} for s in students],
-            key=lambda x: x["incoscore"],
-            reverse=True
-        )
-        
-        # Add rank numbers
-        for i, item in enumerate(ranked_students, start=1):
-            item["rank"] = i
-        
-        return templates.TemplateResponse(
-            "leaderboard.html",
-            {
-                "request": request,
-                "ranked_students": ranked_students
-            }
-        )
-    finally:
-        db.close()
+        vector = parse_weights(weights)
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    return JSONResponse(compare_weightings(db, vector, k=max(1, min(k, 100))))
+
+
+@app.get("/api/students")
+def student_lookup(q: str = "", limit: int = LOOKUP_PAGE_SIZE, cursor: str = None,
+                   db: Session = Depends(get_read_db)):
+    """Students whose name matches `q` word by word, a page at a time, for the student pickers."""
+    try:
+        students, next_cursor = find_students(db, q, max(1, min(limit, MAX_PAGE_SIZE)), cursor)
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    return JSONResponse({
+        "students": [student_json(s) for s in students],
+        "next_cursor": next_cursor
+    })
 
 
 # ============== STUDENT PROFILE ==============
 
 @app.get("/student/{student_id}", response_class=HTMLResponse)
-async def student_profile(request: Request, student_id: int):
+def student_profile(request: Request, student_id: int, archive: bool = False, archive_cursor: str = None,
+                    db: Session = Depends(get_read_db)):
     """Student profile page with details and InCoScore."""
-    db = SessionLocal()
-    try:
-        student = db.query(Student).filter(Student.id == student_id).first()
-        if not student:
-            return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
-        
-        incoscore = calculate_incoscore(student)
-        applications = db.query(Application).filter(Application.student_id == student_id).all()
-        
-        return templates.TemplateResponse(
-            "profile.html",
-            {
-                "request": request,
-                "student": student,
-                "incoscore": incoscore,
-                "applications": applications
-            }
-        )
-    finally:
-        db.close()
+    student = db.query(Student).filter(Student.id == student_id).first()
+    if not student:
+        return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
+    
+    incoscore = student.incoscore
+    rank = rank_of(db, student)
+    applications = db.query(Application).filter(Application.student_id == student_id).all()
+    # Closed applications past retention live in the archive (see archive.py);
+    # they are listed a page at a time when asked for
+    archived_count = student.application_count - len(applications)
+    archived, next_archive_cursor = [], None
+    if archive and archived_count > 0:
+        archived, next_archive_cursor = load_archived_applications(db, student_id, archive_cursor)
+    
+    return templates.TemplateResponse(
+        "profile.html",
+        {
+            "request": request,
+            "student": student,
+            "incoscore": incoscore,
+            "rank": rank,
+            "total_students": ranked_total(db),
+            "applications": applications,
+            "archived_count": archived_count,
+            "archived_applications": archived,
+            "show_archive": archive,
+            "next_archive_cursor": next_archive_cursor
+        }
+    )
 
 
 # ============== OPPORTUNITY DETAIL ==============
 
 @app.get("/opportunity/{opp_id}", response_class=HTMLResponse)
-async def opportunity_detail(request: Request, opp_id: int):
+def opportunity_detail(request: Request, opp_id: int, db: Session = Depends(get_read_db)):
     """Opportunity detail page."""
-    db = SessionLocal()
-    try:
-        opportunity = db.query(Opportunity).filter(Opportunity.id == opp_id).first()
-        if not opportunity:
-            return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
-        
-        students = db.query(Student).all()
-        
-        return templates.TemplateResponse(
-            "opportunity.html",
-            {
-                "request": request,
-                "opportunity": opportunity,
-                "students": students
-            }
-        )
-    finally:
-        db.close()
+    opportunity = db.query(Opportunity).filter(Opportunity.id == opp_id).first()
+    if not opportunity:
+        return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
+    
+    # Best-fit students in the opportunity's domain, from the in-memory lists
+    candidates = shortlist(db, opportunity)
+    
+    return templates.TemplateResponse(
+        "opportunity.html",
+        {
+            "request": request,
+            "opportunity": opportunity,
+            "candidates": candidates
+        }
+    )
+
+
+@app.get("/api/opportunity/{opp_id}/candidates")
+def opportunity_candidates(opp_id: int, k: int = SHORTLIST_SIZE, db: Session = Depends(get_read_db)):
+    """Top-k students for an opportunity: InCoScore within its domain, then skill overlap."""
+    opportunity = db.query(Opportunity).filter(Opportunity.id == opp_id).first()
+    if not opportunity:
+        return JSONResponse({"error": "opportunity not found"}, status_code=404)
+    return JSONResponse({
+        "opportunity_id": opp_id,
+        "domain": opportunity.domain,
+        "candidates": [
+            {"id": student.id, "name": student.name, "incoscore": candidate.incoscore,
+             "matched_skills": list(candidate.matched)}
+            for student, candidate in shortlist(db, opportunity, max(1, min(k, MAX_SHORTLIST_SIZE)))
+        ]
+    })
 
 
 # ============== AUTO-APPLICATION SYSTEM ==============
 
 @app.post("/apply/{opp_id}")
-async def apply_to_opportunity(opp_id: int, student_id: int = Form(...)):
+def apply_to_opportunity(opp_id: int, student_id: int = Form(...)):
     """Submit application to an opportunity."""
-    db = SessionLocal()
+    def apply(db):
+        # INSERT ... ON CONFLICT DO NOTHING: applying twice is a no-op, even
+        # when both requests race (see autoapply.py)
+        return apply_in_session(
+            db, student_ids=[student_id], opportunity_ids=[opp_id], match_interest=False
+        ).created
+    
+    # Committed together with other concurrent writes (see writer.py)
+    write_queue.run(apply)
+    return RedirectResponse(url=f"/student/{student_id}?applied=1", status_code=303)
+
+
+@app.post("/auto-apply")
+def bulk_auto_apply(
+    student_id: List[int] = Form(None),
+    cohort_domain: str = Form(None),
+    min_incoscore: float = Form(None),
+    domain: str = Form(None),
+    posted_within_days: int = Form(None),
+    keyword: str = Form(None)
+):
+    """
+    Apply a student or a cohort to every matching opportunity in one
+    transaction; returns created and skipped counts.
+    """
     try:
-        # Check if already applied
-        existing = db.query(Application).filter(
-            Application.student_id == student_id,
-            Application.opportunity_id == opp_id
-        ).first()
-        
-        if not existing:
-            application = Application(
-                student_id=student_id,
-                opportunity_id=opp_id,
-                status="submitted"
-            )
-            db.add(application)
-            db.commit()
-        
-        return RedirectResponse(url=f"/student/{student_id}?applied=1", status_code=303)
-    finally:
-        db.close()
+        report = auto_apply(
+            engine, student_ids=student_id, cohort_domain=cohort_domain or None,
+            min_incoscore=min_incoscore, domain=domain or None,
+            posted_within_days=posted_within_days, keyword=keyword or None
+        )
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    return JSONResponse(report.as_dict())
 
 
 # ============== COMMUNITY PLATFORM ==============
 
 @app.get("/community", response_class=HTMLResponse)
-async def community(request: Request):
+def community(request: Request, cursor: str = None, sort: str = "newest", archive: bool = False,
+              db: Session = Depends(get_read_db)):
     """Academic community - posts and discussions."""
-    db = SessionLocal()
-    try:
-        posts = db.query(Post).order_by(Post.created_at.desc()).all()
-        students = db.query(Student).all()
-        
-        return templates.TemplateResponse(
-            "community.html",
+    if sort not in FEED_SORTS:
+        sort = "newest"
+    # One page of posts with authors and their first comments preloaded;
+    # archived posts only when asked for
+    feed = load_feed(db, cursor, sort=sort, include_archive=archive)
+    # At the end of the live feed, offer to continue into the archive
+    more_in_archive = not archive and feed.next_cursor is None and has_archived_posts(db)
+    
+    return templates.TemplateResponse(
+        "community.html",
+        {
+            "request": request,
+            "feed": feed,
+            "posts": feed.posts,
+            "sort": sort,
+            "archive": archive,
+            "more_in_archive": more_in_archive,
+            "feed_cursor": feed_cursor,
+            "encode_cursor": encode_cursor
+        }
+    )
+
+
+@app.get("/community/post/{post_id}/comments")
+def post_comments(post_id: int, cursor: str = None, archived: bool = False,
+                  db: Session = Depends(get_read_db)):
+    """Next batch of comments on a post, for the feed's "load more" button."""
+    comments, next_cursor = load_comments(db, post_id, cursor, archived=archived)
+    return JSONResponse({
+        "comments": [
             {
-                "request": request,
-                "posts": posts,
-                "students": students
+                "id": c.id,
+                "author_id": c.author.id,
+                "author_name": c.author.name,
+                "content": c.content,
+                "created_at": c.created_at.strftime('%b %d, %H:%M')
             }
-        )
-    finally:
-        db.close()
+            for c in comments
+        ],
+        "next_cursor": next_cursor
+    })
 
 
 @app.post("/community/post")
-async def create_post(
+def create_post(
     title: str = Form(...),
     content: str = Form(...),
     domain: str = Form(None),
     author_id: int = Form(...)
 ):
     """Create a new community post."""
-    db = SessionLocal()
-    try:
-        post = Post(
-            author_id=author_id,
-            title=title,
-            content=content,
-            domain=domain if domain else None
-        )
-        db.add(post)
-        db.commit()
-        return RedirectResponse(url="/community", status_code=303)
-    finally:
-        db.close()
+    write_queue.run(lambda db: db.add(Post(
+        author_id=author_id,
+        title=title,
+        content=content,
+        domain=domain if domain else None
+    )))
+    return RedirectResponse(url="/community", status_code=303)
 
 
 @app.post("/community/comment/{post_id}")
-async def add_comment(
+def add_comment(
     post_id: int,
     content: str = Form(...),
     author_id: int = Form(...)
 ):
     """Add comment to a post."""
-    db = SessionLocal()
+    write_queue.run(lambda db: db.add(Comment(
+        post_id=post_id,
+        author_id=author_id,
+        content=content
+    )))
+    return RedirectResponse(url="/community", status_code=303)
+
+
+# ============== INGESTION ==============
+
+@app.post("/ingest/{kind}")
+def ingest_feed(kind: str, file: UploadFile = File(...), format: str = None):
+    """
+    Stream an uploaded JSONL or CSV feed of opportunities or students into
+    the database. Opportunities without a domain are classified afterwards
+    by a background job, whose id is returned as `job_id`.
+    """
+    if kind not in KINDS:
+        return JSONResponse({"error": f"unknown kind {kind!r}"}, status_code=404)
+    if format not in (None, "jsonl", "csv"):
+        return JSONResponse({"error": f"unknown format {format!r}"}, status_code=400)
+    # The upload is spooled to disk, so it is read back one chunk at a time
+    report = ingest_upload(engine, kind, file.file, filename=file.filename or "", fmt=format,
+                           classify=False)
+    result = report.as_dict()
+    if report.unclassified:
+        result["job_id"] = job_queue.enqueue("reclassify", {"ids": report.unclassified})
+    return JSONResponse(result)
+
+
+# ============== LIVE UPDATES ==============
+
+@app.get("/events")
+async def live_events(topic: List[str] = Query(...)):
+    """Server-sent events for the given topics, e.g. ?topic=domain:AI&topic=post:3."""
     try:
-        comment = Comment(
-            post_id=post_id,
-            author_id=author_id,
-            content=content
-        )
-        db.add(comment)
-        db.commit()
-        return RedirectResponse(url="/community", status_code=303)
-    finally:
-        db.close()
+        topics = parse_topics(topic)
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    if broadcaster.full:
+        return JSONResponse({"error": "too many subscribers"}, status_code=503)
+    return StreamingResponse(
+        sse_stream(topics),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/ws")
+async def live_socket(websocket: WebSocket):
+    """The same events over a WebSocket, with topics changeable while connected."""
+    await websocket_session(websocket)
+
+
+@app.get("/events/stats")
+def live_event_stats():
+    """Subscriber and delivery counters for the live update broadcaster."""
+    return JSONResponse(broadcaster.stats())
 
 
 # ============== DASHBOARD ==============
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
+def dashboard(request: Request, db: Session = Depends(get_read_db)):
     """Dashboard with analytics and stats."""
-    db = SessionLocal()
-    try:
-        # Stats
-        total_opportunities = db.query(Opportunity).count()
-        total_students = db.query(Student).count()
-        total_applications = db.query(Application).count()
-        total_posts = db.query(Post).count()
-        
-        # Domain distribution
-        domains = db.query(Opportunity.domain).distinct().all()
-        domain_stats = []
-        for (domain,) in domains:
-            count = db.query(Opportunity).filter(Opportunity.domain == domain).count()
-            domain_stats.append({"domain": domain, "count": count})
-        
-        # Recent applications
-        recent_apps = db.query(Application).order_by(Application.applied_at.desc()).limit(5).all()
-        
-        # Top students by InCoScore
-        students = db.query(Student).all()
-        top_students = sorted(
-            [{"student": s, "incoscore": calculate_incoscore(s)} for s in students],
-            key=lambda x: x["incoscore"],
-            reverse=True
-        )[:3]
-        
-        return templates.TemplateResponse(
-            "dashboard.html",
-            {
-                "request": request,
-                "total_opportunities": total_opportunities,
-                "total_students": total_students,
-                "total_applications": total_applications,
-                "total_posts": total_posts,
-                "domain_stats": domain_stats,
-                "recent_apps": recent_apps,
-                "top_students": top_students
-            }
-        )
-    finally:
-        db.close()
+    # Counters from the in-memory snapshot (one GROUP BY pass on first use)
+    snapshot = stats.get(db)
+    
+    # Domain distribution, largest first
+    domain_stats = [
+        {"domain": domain, "count": count}
+        for domain, count in sorted(snapshot["domains"].items(), key=lambda kv: -kv[1])
+    ]
+    
+    # Recent applications, with student and opportunity in the same query
+    recent_apps = (
+        db.query(Application)
+        .options(joinedload(Application.student), joinedload(Application.opportunity))
+        .order_by(Application.applied_at.desc())
+        .limit(5)
+        .all()
+    )
+    
+    # Top students by InCoScore, straight off the score index
+    top = [{"student": s, "incoscore": s.incoscore} for s in top_students(db, 3)]
+    
+    return templates.TemplateResponse(
+        "dashboard.html",
+        {
+            "request": request,
+            "total_opportunities": snapshot["opportunities"],
+            "total_students": snapshot["students"],
+            "total_applications": snapshot["applications"],
+            "total_posts": snapshot["posts"],
+            "domain_stats": domain_stats,
+            "stats_age": int(snapshot["age_seconds"]),
+            "stats_updates": snapshot["updates_since"],
+            "recent_apps": recent_apps,
+            "top_students": top
+        }
+    )
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Response cache counters, for sizing CACHE_SIZE and CACHE_SECONDS."""
+    return JSONResponse(response_cache.stats())
+
+
+@app.get("/archive/stats")
+def archive_stats():
+    """Archival scheduler state and the last run's report."""
+    return JSONResponse(archiver.stats())
+
+
+# ============== EXPORTS ==============
+
+@app.get("/export/opportunities.ndjson")
+def export_opportunities(domain: str = None):
+    """Every opportunity (optionally one domain) as newline-delimited JSON, streamed."""
+    return ndjson_response(read_engine, opportunity_export(domain))
+
+
+@app.get("/export/leaderboard.ndjson")
+def export_leaderboard():
+    """Every student in leaderboard order, with rank, as newline-delimited JSON, streamed."""
+    return ndjson_response(read_engine, leaderboard_export(), rank=True)
+
+
+# ============== BACKGROUND JOBS ==============
+
+@app.post("/jobs/{kind}")
+def enqueue_job(kind: str, opportunity_id: List[int] = Form(None)):
+    """
+    Queue a maintenance job (reclassify, scores, recommendations, recount,
+    warm) and return its id at once; poll /jobs/{id} for the outcome.
+    """
+    if kind not in JOB_KINDS:
+        return JSONResponse({"error": f"unknown kind {kind!r}"}, status_code=404)
+    # reclassify can be limited to some opportunities
+    job_id = job_queue.enqueue(kind, {"ids": opportunity_id} if opportunity_id else None)
+    return JSONResponse({"id": job_id, "status": "queued"}, status_code=202)
+
+
+@app.get("/jobs/stats")
+def job_stats():
+    """Queue depth, outcome counters and wait and run latency percentiles."""
+    return JSONResponse(job_queue.stats())
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: int):
+    """A job's status, attempts, last error and result."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    return JSONResponse(job)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Request, SQL and template metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.exposition(), media_type="text/plain; version=0.0.4")
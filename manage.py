@@ -0,0 +1,194 @@
+"""
+Command-line maintenance tasks for the Ivy Intel database.
+
+    python manage.py migrate
+    python manage.py seed
+    python manage.py build-static
+    python manage.py ingest opportunities feed.jsonl
+    python manage.py ingest opportunities feed.jsonl --defer-classify
+    python manage.py ingest students students.csv --chunk-size 10000 --workers 4
+    python manage.py auto-apply --cohort-domain AI --posted-within-days 30 --keyword research
+    python manage.py recount --dry-run
+    python manage.py archive --applications-days 90 --vacuum
+
+Uses the same DATABASE_URL as the app.
+"""
+import argparse
+import os
+import sys
+
+from database import engine
+from migrations import MIGRATIONS, applied_versions, migrate
+
+
+def cmd_migrate(args) -> int:
+    if args.status:
+        done = applied_versions(engine)
+        for step in sorted(MIGRATIONS, key=lambda m: m.version):
+            print(f"  [{'x' if step.version in done else ' '}] {step.version:>3} {step.name}")
+        return 0
+    applied = migrate(engine)
+    for step in applied:
+        print(f"applied {step.version} {step.name}")
+    if not applied:
+        print("database is up to date")
+    return 0
+
+
+def cmd_seed(args) -> int:
+    from seed import seed_database
+
+    migrate(engine)
+    if seed_database():
+        print("seeded sample opportunities and students")
+    else:
+        print("database already has data; nothing seeded")
+    return 0
+
+
+def cmd_build_static(args) -> int:
+    from assets import STATIC_DIR, brotli, build_static
+
+    source = args.source or STATIC_DIR
+    for original, hashed in sorted(build_static(source).items()):
+        sizes = [f"{os.path.getsize(os.path.join(source, hashed)):,} B"]
+        for suffix in (".gz", ".br"):
+            variant = os.path.join(source, hashed + suffix)
+            if os.path.exists(variant):
+                sizes.append(f"{suffix[1:]} {os.path.getsize(variant):,} B")
+        print(f"  {original} -> {hashed} ({', '.join(sizes)})")
+    if brotli is None:
+        print("brotli is not installed; built gzip variants only", file=sys.stderr)
+    return 0
+
+
+def cmd_ingest(args) -> int:
+    from ingest import CHUNK_SIZE, ingest_file
+
+    def progress(report):
+        print(f"  chunk {report.chunks}: {report.read:,} read, {report.inserted:,} inserted "
+              f"({report.rate:,.0f} rows/s)", file=sys.stderr)
+
+    migrate(engine)
+    report = ingest_file(
+        engine, args.kind, args.path, fmt=args.format,
+        chunk_size=args.chunk_size or CHUNK_SIZE, workers=args.workers,
+        progress=None if args.quiet else progress, classify=not args.defer_classify
+    )
+    print(report.summary())
+    if report.unclassified:
+        from jobs import job_queue
+
+        job_queue.attach(engine)
+        job_id = job_queue.enqueue("reclassify", {"ids": report.unclassified})
+        print(f"queued reclassify job {job_id} for {len(report.unclassified):,} opportunities "
+              f"(run by the server; GET /jobs/{job_id})")
+    return 0
+
+
+def cmd_auto_apply(args) -> int:
+    from autoapply import auto_apply
+
+    migrate(engine)
+    try:
+        report = auto_apply(
+            engine, student_ids=args.student or None, cohort_domain=args.cohort_domain,
+            min_incoscore=args.min_incoscore, domain=args.domain, match_interest=not args.any_domain,
+            posted_within_days=args.posted_within_days, keyword=args.keyword
+        )
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    print(report.summary())
+    return 0
+
+
+def cmd_recount(args) -> int:
+    from counters import recount
+
+    migrate(engine)
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            fixed = recount(conn)
+            if args.dry_run:
+                transaction.rollback()
+    for name, rows in fixed.items():
+        print(f"  {name}: {rows:,} {'wrong' if args.dry_run else 'corrected'}")
+    return 1 if args.dry_run and any(fixed.values()) else 0
+
+
+def cmd_archive(args) -> int:
+    from archive import APPLICATION_RETENTION_DAYS, BATCH_SIZE, POST_RETENTION_DAYS, compact, run_archival
+
+    migrate(engine)
+    report = run_archival(
+        engine, application_days=args.applications_days or APPLICATION_RETENTION_DAYS,
+        post_days=args.posts_days or POST_RETENTION_DAYS, batch_size=args.batch_size or BATCH_SIZE
+    )
+    print(report.summary())
+    if args.vacuum:
+        compact(engine)
+        print("vacuumed; freed pages are now returned incrementally")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="create tables and apply pending migrations")
+    migrate_parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    migrate_parser.set_defaults(handler=cmd_migrate)
+
+    seed = commands.add_parser("seed", help="load the sample opportunities and students into an empty database")
+    seed.set_defaults(handler=cmd_seed)
+
+    build = commands.add_parser("build-static", help="write content-hashed, precompressed copies of static assets")
+    build.add_argument("--source", help="static directory (default: static)")
+    build.set_defaults(handler=cmd_build_static)
+
+    ingest = commands.add_parser("ingest", help="stream a JSONL or CSV feed into the database")
+    ingest.add_argument("kind", choices=["opportunities", "students"])
+    ingest.add_argument("path")
+    ingest.add_argument("--format", choices=["jsonl", "csv"],
+                        help="file format (default: from the file extension)")
+    ingest.add_argument("--chunk-size", type=int, help="rows per transaction")
+    ingest.add_argument("--workers", type=int,
+                        help="classifier processes (default: one per CPU; 1 classifies inline)")
+    ingest.add_argument("--defer-classify", action="store_true",
+                        help="file unclassified opportunities under the default domain and queue "
+                             "a reclassify job for the running server instead")
+    ingest.add_argument("--quiet", action="store_true", help="only print the final summary")
+    ingest.set_defaults(handler=cmd_ingest)
+
+    auto = commands.add_parser("auto-apply", help="apply students to every matching opportunity")
+    auto.add_argument("--student", type=int, action="append", help="student id (repeatable)")
+    auto.add_argument("--cohort-domain", help="every student interested in this domain")
+    auto.add_argument("--min-incoscore", type=float, help="only students with at least this InCoScore")
+    auto.add_argument("--domain", help="opportunity domain (default: each student's own interest)")
+    auto.add_argument("--any-domain", action="store_true", help="do not restrict opportunities by domain")
+    auto.add_argument("--posted-within-days", type=int, help="only opportunities posted this recently")
+    auto.add_argument("--keyword", help="only opportunities matching this full-text search")
+    auto.set_defaults(handler=cmd_auto_apply)
+
+    recount_parser = commands.add_parser("recount", help="recompute the comment and application counters")
+    recount_parser.add_argument("--dry-run", action="store_true",
+                                help="report drifted counters without fixing them (exit 1 if any)")
+    recount_parser.set_defaults(handler=cmd_recount)
+
+    archive = commands.add_parser("archive", help="move closed applications and stale posts to the archive tables")
+    archive.add_argument("--applications-days", type=int,
+                         help="archive accepted/rejected applications older than this (default: 180)")
+    archive.add_argument("--posts-days", type=int,
+                         help="archive posts with no activity for this long (default: 365)")
+    archive.add_argument("--batch-size", type=int, help="rows moved per transaction")
+    archive.add_argument("--vacuum", action="store_true",
+                         help="then run a full VACUUM, switching to incremental auto-vacuum (blocks the database)")
+    archive.set_defaults(handler=cmd_archive)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+import jinja2
+from sqlalchemy import event
+from starlette.routing import Match
+
+# Share of requests whose SQL and template time is measured (0 to 1). Route
+# latency is recorded for every request regardless; with sampling at 0 the
+# engine hooks are not installed at all.
+SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", "1"))
+# Statements slower than this, in sampled requests, are kept as samples
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_MS", "100")) / 1000
+SLOW_QUERY_SAMPLES = 50
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+class Histogram:
+    """Prometheus-style histogram: per-bucket counts plus sum and count."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            total += n
+            yield bound, total
+
+
+class RequestStats:
+    """SQL and template time of one sampled request, filled in by the hooks."""
+
+    __slots__ = ("scope", "queries", "query_seconds", "render_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Metrics:
+    """
+    Process-wide request, SQL and template metrics.
+
+    Everything is kept as plain counters and histograms under one lock and
+    rendered in the Prometheus text format by `exposition()`. Label values
+    are route templates ("/student/{student_id}") and template names, so
+    the number of series stays bounded.
+    """
+
+    def __init__(self, sample_rate: float = SAMPLE_RATE, slow_query_seconds: float = SLOW_QUERY_SECONDS):
+        self.sample_rate = sample_rate
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.query_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self.render_seconds: Dict[str, Histogram] = {}
+        # (route, statement) -> seconds, most recent last
+        self.slow_queries: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.slow_query_total = 0
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float,
+                        stats: Optional[RequestStats]) -> None:
+        key = (method, route)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            self.responses[key + (status,)] = self.responses.get(key + (status,), 0) + 1
+            if stats is not None:
+                if key not in self.queries:
+                    self.queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+                    self.query_seconds[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key].observe(stats.queries)
+                self.query_seconds[key].observe(stats.query_seconds)
+
+    def observe_render(self, template: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.render_seconds.get(template)
+            if histogram is None:
+                histogram = self.render_seconds[template] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_slow_query(self, route: str, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.slow_query_total += 1
+            key = (route, " ".join(statement.split())[:500])
+            self.slow_queries.pop(key, None)
+            self.slow_queries[key] = seconds
+            if len(self.slow_queries) > SLOW_QUERY_SAMPLES:
+                self.slow_queries.popitem(last=False)
+
+    def exposition(self) -> str:
+        with self._lock:
+            lines = []
+            _histograms(lines, "ivy_http_request_duration_seconds", "Request latency by route.",
+                        ("method", "route"), self.latency)
+            _header(lines, "ivy_http_responses_total", "Responses by route and status.", "counter")
+            for (method, route, status), n in sorted(self.responses.items()):
+                lines.append(f"ivy_http_responses_total{_labels(method=method, route=route, status=status)} {n}")
+            _histograms(lines, "ivy_db_queries_per_request", "SQL statements per sampled request.",
+                        ("method", "route"), self.queries)
+            _histograms(lines, "ivy_db_seconds_per_request", "Time in SQL per sampled request.",
+                        ("method", "route"), self.query_seconds)
+            _histograms(lines, "ivy_template_render_seconds",
+                        "Template render time, excluding SQL run while rendering.",
+                        ("template",), {(name,): h for name, h in self.render_seconds.items()})
+            _header(lines, "ivy_slow_queries_total", "Statements slower than the slow-query threshold.", "counter")
+            lines.append(f"ivy_slow_queries_total {self.slow_query_total}")
+            _header(lines, "ivy_slow_query_seconds", "Latest duration of recent slow statements.", "gauge")
+            for (route, statement), seconds in self.slow_queries.items():
+                lines.append(f"ivy_slow_query_seconds{_labels(route=route, statement=statement)} {seconds:.6f}")
+            _header(lines, "ivy_metrics_sample_rate", "Share of requests with SQL and template timing.", "gauge")
+            lines.append(f"ivy_metrics_sample_rate {self.sample_rate}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _header(lines, name: str, help_text: str, kind: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histograms(lines, name: str, help_text: str, label_names, histograms: dict) -> None:
+    _header(lines, name, help_text, "histogram")
+    for key, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        for bound, total in histogram.cumulative():
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{name}_bucket{_labels(**labels, le=le)} {total}")
+        lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+metrics = Metrics()
+
+
+def route_label(scope, routes=()) -> str:
+    """Route template for the request, so /student/1 and /student/2 share a series."""
+    route = scope.get("route")
+    if route is None:
+        # Answered before routing (e.g. from the response cache)
+        for candidate in routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request and record it under its route template.
+
+    A sampled request also gets a RequestStats in a context variable, which
+    the engine and template hooks below add to from the handler's worker
+    thread; its totals go out as a Server-Timing header and into the
+    per-route query histograms. Add it last so it is outermost and also
+    times responses served from the cache.
+    """
+
+    def __init__(self, app, routes=(), registry: Metrics = metrics):
+        self.app = app
+        self.routes = routes
+        self.metrics = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope) if self.metrics.sampled() else None
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stats is not None:
+                    timing = (f"db;dur={stats.query_seconds * 1000:.1f};desc=\"{stats.queries} queries\", "
+                              f"render;dur={stats.render_seconds * 1000:.1f}")
+                    message = {**message, "headers": list(message.get("headers", []))
+                               + [(b"server-timing", timing.encode())]}
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self.metrics.observe_request(
+                scope["method"], route_label(scope, self.routes), status,
+                time.perf_counter() - started, stats
+            )
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is None or started is None:
+        return
+    seconds = time.perf_counter() - started
+    stats.queries += 1
+    stats.query_seconds += seconds
+    if seconds >= metrics.slow_query_seconds:
+        metrics.observe_slow_query(route_label(stats.scope), statement, seconds)
+
+
+def instrument_engines(*engines) -> None:
+    """Count and time statements run on behalf of sampled requests."""
+    if metrics.sample_rate <= 0:
+        return
+    for target in set(engines):
+        event.listen(target, "before_cursor_execute", _before_execute)
+        event.listen(target, "after_cursor_execute", _after_execute)
+
+
+class TimedTemplate(jinja2.Template):
+    """Template that reports its render time for sampled requests."""
+
+    def render(self, *args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return super().render(*args, **kwargs)
+        query_seconds = stats.query_seconds
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            # Lazy loads run while rendering; count them as SQL, not rendering
+            seconds = time.perf_counter() - started - (stats.query_seconds - query_seconds)
+            stats.render_seconds += seconds
+            metrics.observe_render(self.name or "<string>", seconds)
+
+    def generate(self, *args, **kwargs):
+        # Streamed pages (see streaming.py) render between sends; only the
+        # time spent producing output counts
+        stats = _current.get()
+        pieces = super().generate(*args, **kwargs)
+        if stats is None:
+            yield from pieces
+            return
+        seconds = 0.0
+        try:
+            while True:
+                query_seconds = stats.query_seconds
+                started = time.perf_counter()
+                try:
+                    piece = next(pieces)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter() - started - (stats.query_seconds - query_seconds)
+                yield piece
+        finally:
+            stats.render_seconds += seconds
+            metrics.observe_render(self.name or "<string>", seconds)
+
+
+def instrument_templates(env: jinja2.Environment) -> None:
+    env.template_class = TimedTemplate
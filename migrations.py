@@ -0,0 +1,297 @@
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from changes import create_change_log_triggers
+from counters import COUNTERS, create_counter_triggers, drop_counter_triggers, recount
+from database import Base
+from models import CLOSED_APPLICATION_SQL, INCOSCORE_SQL, Application, Comment, Post
+from search import create_search_index
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable
+
+
+# `create_all` only creates tables that are missing, so columns and indexes
+# added to the models later never reach a database created before them.
+# Each migration runs once, in its own transaction, and is recorded in
+# `schema_migrations`. Migrations must be idempotent (IF NOT EXISTS and the
+# like): on a fresh database `create_all` has already built everything and
+# they are only recorded. Append new ones with the next version number.
+#
+# The latest applied version is also stamped in the database header (PRAGMA
+# user_version), and startup skips `create_all` and the migration table
+# when the stamp is current (see ensure_schema). Any schema change, new
+# tables included, therefore needs a migration to reach existing databases.
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append(Migration(version, name, fn))
+        return fn
+    return register
+
+
+def _create_indexes(conn, *statements: str) -> None:
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+@migration(1, "students_incoscore_column")
+def _incoscore_column(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("students")}
+    if "incoscore" not in columns:
+        conn.execute(text(
+            f"ALTER TABLE students ADD COLUMN incoscore FLOAT "
+            f"GENERATED ALWAYS AS ({INCOSCORE_SQL}) VIRTUAL"
+        ))
+    _create_indexes(
+        conn, "CREATE INDEX IF NOT EXISTS ix_students_incoscore_id ON students (incoscore DESC, id)"
+    )
+
+
+@migration(2, "opportunities_fts")
+def _opportunities_fts(conn):
+    create_search_index(conn)
+
+
+@migration(3, "applications_applied_at_index")
+def _applied_at_index(conn):
+    _create_indexes(
+        conn, "CREATE INDEX IF NOT EXISTS ix_applications_applied_at ON applications (applied_at)"
+    )
+
+
+@migration(4, "ingest_lookup_indexes")
+def _ingest_lookup_indexes(conn):
+    _create_indexes(
+        conn,
+        "CREATE INDEX IF NOT EXISTS ix_opportunities_title_university ON opportunities (title, university)",
+        "CREATE INDEX IF NOT EXISTS ix_students_email ON students (email)",
+    )
+
+
+@migration(5, "hot_path_indexes")
+def _hot_path_indexes(conn):
+    _create_indexes(
+        conn,
+        "CREATE INDEX IF NOT EXISTS ix_opportunities_domain_posted_date ON opportunities (domain, posted_date)",
+        "CREATE INDEX IF NOT EXISTS ix_opportunities_posted_date ON opportunities (posted_date)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_created_at_id ON posts (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_comments_post_id_created_at_id ON comments (post_id, created_at, id)",
+    )
+
+
+@migration(6, "unique_applications")
+def _unique_applications(conn):
+    # Keep the first of any duplicate applications so the index can be built
+    conn.execute(text(
+        "DELETE FROM applications WHERE id NOT IN ("
+        "SELECT min(id) FROM applications GROUP BY student_id, opportunity_id)"
+    ))
+    _create_indexes(
+        conn,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_applications_student_opportunity "
+        "ON applications (student_id, opportunity_id)",
+    )
+
+
+@migration(7, "counter_columns")
+def _counter_columns(conn):
+    for counter in COUNTERS:
+        columns = {c["name"] for c in inspect(conn).get_columns(counter.table)}
+        if counter.column not in columns:
+            conn.execute(text(
+                f"ALTER TABLE {counter.table} ADD COLUMN {counter.column} INTEGER NOT NULL DEFAULT 0"
+            ))
+    _create_indexes(
+        conn,
+        "CREATE INDEX IF NOT EXISTS ix_opportunities_application_count_id "
+        "ON opportunities (application_count, id)",
+        "CREATE INDEX IF NOT EXISTS ix_opportunities_domain_application_count_id "
+        "ON opportunities (domain, application_count, id)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_comment_count_id ON posts (comment_count, id)",
+    )
+    create_counter_triggers(conn)
+    # The full-text sync trigger used to fire on any UPDATE, so every
+    # counter bump re-indexed the opportunity; recreate it limited to the
+    # indexed columns
+    conn.execute(text("DROP TRIGGER IF EXISTS opportunities_fts_au"))
+    create_search_index(conn)
+    # Rows written before the triggers existed
+    recount(conn)
+
+
+@migration(8, "archive_tables")
+def _archive_tables(conn):
+    # create_all has made the *_archive tables; the counter triggers are
+    # recreated so rows moved there are not counted as deleted
+    drop_counter_triggers(conn)
+    create_counter_triggers(conn)
+    _create_indexes(
+        conn,
+        f"CREATE INDEX IF NOT EXISTS ix_applications_closed_applied_at ON applications (applied_at) "
+        f"WHERE {CLOSED_APPLICATION_SQL}",
+    )
+
+
+# Hot tables whose rows move to an archive table under the same id, with
+# the archive table each one moves to
+_ARCHIVED_TABLES = [
+    (Application.__table__, "applications_archive"),
+    (Post.__table__, "posts_archive"),
+    (Comment.__table__, "comments_archive"),
+]
+
+
+def _rebuild_with_autoincrement(conn, table) -> None:
+    """Recreate `table` from its model, which declares AUTOINCREMENT, keeping every row."""
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+    ).scalar()
+    if "AUTOINCREMENT" in sql.upper():
+        return
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    columns = ", ".join(c.name for c in table.columns if c.name in existing)
+    rebuilt = f"{table.name}_rebuild"
+    create = str(CreateTable(table).compile(dialect=conn.dialect))
+    conn.execute(text(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {rebuilt} ", 1)))
+    conn.execute(text(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table.name}"))
+    # SQLite's documented rebuild: drop the old table and rename the new one
+    # into place, so foreign keys naming it keep pointing at it
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _renumber_archived(conn, table: str, archive: str) -> None:
+    """
+    Give archived rows whose id was handed out again to a live row fresh
+    ids above both tables, then start the table's sequence after all of them.
+    """
+    top = conn.execute(text(
+        f"SELECT max(coalesce((SELECT max(id) FROM {table}), 0), "
+        f"coalesce((SELECT max(id) FROM {archive}), 0))"
+    )).scalar()
+    conn.execute(text("DROP TABLE IF EXISTS temp.renumbered"))
+    conn.execute(text(
+        f"CREATE TEMP TABLE renumbered AS SELECT id AS old_id, {top} + row_number() OVER (ORDER BY id) AS new_id "
+        f"FROM {archive} WHERE id IN (SELECT id FROM {table})"
+    ))
+    renumber = "(SELECT new_id FROM renumbered WHERE old_id = {0})"
+    if archive == "posts_archive":
+        conn.execute(text(
+            f"UPDATE comments_archive SET post_id = {renumber.format('post_id')} "
+            f"WHERE post_id IN (SELECT old_id FROM renumbered)"
+        ))
+    conn.execute(text(
+        f"UPDATE {archive} SET id = {renumber.format('id')} WHERE id IN (SELECT old_id FROM renumbered)"
+    ))
+    top += conn.execute(text("SELECT count(*) FROM renumbered")).scalar()
+    conn.execute(text("DROP TABLE temp.renumbered"))
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table})
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table, "seq": top})
+
+
+@migration(9, "autoincrement_ids")
+def _autoincrement_ids(conn):
+    # Archived rows keep their id. Without AUTOINCREMENT SQLite hands the
+    # highest deleted id to the next insert, so a new row could share an id
+    # with an archived one, and archiving it then fails on the archive's
+    # primary key.
+    drop_counter_triggers(conn)
+    for table, archive in _ARCHIVED_TABLES:
+        _rebuild_with_autoincrement(conn, table)
+        _renumber_archived(conn, table.name, archive)
+    create_counter_triggers(conn)
+
+
+@migration(10, "recount_after_id_reuse")
+def _recount_after_id_reuse(conn):
+    # Before migration 9 a live row could share its id with an archived one,
+    # and the delete triggers took its deletion for an archive move and kept
+    # counting it. Recreate them (now also matching the parent) and repair
+    # the counts.
+    drop_counter_triggers(conn)
+    create_counter_triggers(conn)
+    recount(conn)
+
+
+@migration(11, "change_log")
+def _change_log(conn):
+    # create_all has made change_log; these triggers fill it
+    create_change_log_triggers(conn)
+
+
+@migration(12, "job_leases")
+def _job_leases(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("jobs")}
+    if "owner" not in columns:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN owner VARCHAR(100)"))
+    if "heartbeat_at" not in columns:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN heartbeat_at DATETIME"))
+
+
+def _ensure_table(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at DATETIME NOT NULL)"
+        ))
+
+
+def applied_versions(engine) -> set:
+    _ensure_table(engine)
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def pending(engine) -> List[Migration]:
+    done = applied_versions(engine)
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if m.version not in done]
+
+
+def latest_version() -> int:
+    return max(m.version for m in MIGRATIONS)
+
+
+def schema_version(engine) -> int:
+    """The version stamped by the last migrate(), 0 if never stamped."""
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(engine) -> List[Migration]:
+    """Create missing tables, then apply pending migrations in order. Returns those applied."""
+    Base.metadata.create_all(bind=engine)
+    applied = []
+    for step in pending(engine):
+        with engine.begin() as conn:
+            step.apply(conn)
+            conn.execute(
+                text("INSERT OR IGNORE INTO schema_migrations (version, name, applied_at) "
+                     "VALUES (:version, :name, :applied_at)"),
+                {"version": step.version, "name": step.name, "applied_at": datetime.utcnow()}
+            )
+        applied.append(step)
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {latest_version()}"))
+    return applied
+
+
+def ensure_schema(engine) -> List[Migration]:
+    """
+    migrate() unless the database is already stamped with the latest
+    version, in which case this is a single PRAGMA read instead of
+    reflecting every table. Used at app startup.
+    """
+    if schema_version(engine) == latest_version():
+        return []
+    return migrate(engine)
@@ -1,8 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Date, DateTime, ForeignKey, Computed, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
 
+# SQL twin of helpers.calculate_incoscore; keep the two formulas identical.
+INCOSCORE_SQL = (
+    "round(coalesce(hackathons, 0) * 2 + coalesce(internships, 0) * 3 + "
+    "coalesce(research_papers, 0) * 4 + coalesce(coding_score, 0) * 0.1, 2)"
+)
+
+# Applications that are decided and may be archived (see archive.py). Queries
+# must use this literal text for SQLite to use the partial index below.
+CLOSED_APPLICATION_SQL = "status IN ('accepted', 'rejected')"
+
 
 class Opportunity(Base):
     __tablename__ = "opportunities"
@@ -13,16 +23,29 @@ class Opportunity(Base):
     university = Column(String(100), nullable=False)
     domain = Column(String(100), nullable=False)
     posted_date = Column(Date, nullable=False)
+    # Kept by triggers (see counters.py)
+    application_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     applications = relationship("Application", back_populates="opportunity")
 
+    __table_args__ = (
+        # Duplicate check for bulk ingestion (see ingest.py)
+        Index("ix_opportunities_title_university", title, university),
+        # Home listing, newest first, with and without a domain filter
+        Index("ix_opportunities_domain_posted_date", domain, posted_date),
+        Index("ix_opportunities_posted_date", posted_date),
+        # "Most applied" listing, with and without a domain filter
+        Index("ix_opportunities_application_count_id", application_count, id),
+        Index("ix_opportunities_domain_application_count_id", domain, application_count, id),
+    )
+
 
 class Student(Base):
     __tablename__ = "students"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
-    email = Column(String(255), nullable=True)
+    email = Column(String(255), nullable=True, index=True)
     domain_interest = Column(String(100), nullable=False)
     skills = Column(Text, nullable=True)  # Comma-separated skills
     bio = Column(Text, nullable=True)
@@ -31,11 +54,21 @@ class Student(Base):
     internships = Column(Integer, default=0)
     research_papers = Column(Integer, default=0)
     coding_score = Column(Float, default=0.0)
+    # InCoScore as a generated column: SQLite recomputes it on every write and
+    # stores it in ix_students_incoscore_id, so ranking never touches Python
+    incoscore = Column(Float, Computed(INCOSCORE_SQL, persisted=False))
+    # Kept by triggers (see counters.py)
+    application_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     applications = relationship("Application", back_populates="student")
     posts = relationship("Post", back_populates="author")
     comments = relationship("Comment", back_populates="author")
 
+    __table_args__ = (
+        # Leaderboard order: highest score first, earliest student first on ties
+        Index("ix_students_incoscore_id", incoscore.desc(), id),
+    )
+
 
 class Application(Base):
     __tablename__ = "applications"
@@ -44,11 +77,22 @@ class Application(Base):
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
     opportunity_id = Column(Integer, ForeignKey("opportunities.id"), nullable=False)
     status = Column(String(50), default="submitted")  # submitted, under_review, accepted, rejected
-    applied_at = Column(DateTime, default=datetime.utcnow)
+    applied_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     student = relationship("Student", back_populates="applications")
     opportunity = relationship("Opportunity", back_populates="applications")
 
+    __table_args__ = (
+        # One application per student and opportunity; also serves lookups
+        # by student_id alone
+        Index("uq_applications_student_opportunity", student_id, opportunity_id, unique=True),
+        # Closed applications by age, for archival (see archive.py)
+        Index("ix_applications_closed_applied_at", applied_at,
+              sqlite_where=text(CLOSED_APPLICATION_SQL)),
+        # Ids are never reused; archived rows keep theirs (see archive.py)
+        {"sqlite_autoincrement": True},
+    )
+
 
 class Post(Base):
     __tablename__ = "posts"
@@ -59,10 +103,20 @@ class Post(Base):
     content = Column(Text, nullable=False)
     domain = Column(String(100), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Kept by triggers (see counters.py)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     author = relationship("Student", back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Feed order (see feed.py)
+        Index("ix_posts_created_at_id", created_at, id),
+        # "Most discussed" order
+        Index("ix_posts_comment_count_id", comment_count, id),
+        {"sqlite_autoincrement": True},
+    )
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -75,3 +129,111 @@ class Comment(Base):
     
     post = relationship("Post", back_populates="comments")
     author = relationship("Student", back_populates="comments")
+
+    __table_args__ = (
+        # A post's comments in display order (see feed.py)
+        Index("ix_comments_post_id_created_at_id", post_id, created_at, id),
+        {"sqlite_autoincrement": True},
+    )
+
+
+# Archive tables (see archive.py). Rows keep their original id and columns and
+# gain archived_at; the hot tables above hold only what is still live. Those
+# use AUTOINCREMENT, so an id once archived is never handed out again.
+
+class ArchivedApplication(Base):
+    __tablename__ = "applications_archive"
+
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    opportunity_id = Column(Integer, ForeignKey("opportunities.id"), nullable=False)
+    status = Column(String(50))
+    applied_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False)
+
+    student = relationship("Student")
+    opportunity = relationship("Opportunity")
+
+    __table_args__ = (
+        # A student's archived applications; also "already applied" checks
+        Index("ix_applications_archive_student_opportunity", student_id, opportunity_id),
+    )
+
+
+class ArchivedPost(Base):
+    __tablename__ = "posts_archive"
+
+    id = Column(Integer, primary_key=True)
+    author_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    title = Column(String(255), nullable=False)
+    content = Column(Text, nullable=False)
+    domain = Column(String(100), nullable=True)
+    created_at = Column(DateTime)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    archived_at = Column(DateTime, nullable=False)
+
+    author = relationship("Student")
+
+    __table_args__ = (
+        Index("ix_posts_archive_created_at_id", created_at, id),
+        Index("ix_posts_archive_comment_count_id", comment_count, id),
+    )
+
+
+class ArchivedComment(Base):
+    __tablename__ = "comments_archive"
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts_archive.id"), nullable=False)
+    author_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False)
+
+    author = relationship("Student")
+
+    __table_args__ = (
+        Index("ix_comments_archive_post_id_created_at_id", post_id, created_at, id),
+    )
+
+
+class Job(Base):
+    """A background job (see jobs.py). Written through Core, not sessions."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=True)  # JSON
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # JSON
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Process holding the job ("host:pid:tag"); NULL once it may run anywhere
+    owner = Column(String(100), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # renewed by the owner every poll
+
+    __table_args__ = (
+        # Unfinished jobs to resume on startup; duplicate checks on enqueue
+        Index("ix_jobs_status_kind_payload", status, kind, payload),
+        # History pruning
+        Index("ix_jobs_finished_at", finished_at),
+    )
+
+
+class ChangeLog(Base):
+    """Ids of changed student and opportunity rows, appended by triggers (see changes.py)."""
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Positions in the log must never be handed out twice
+        {"sqlite_autoincrement": True},
+    )
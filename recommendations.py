@@ -0,0 +1,254 @@
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from changes import LogFollower
+from classifier import split_words
+from models import Application, ArchivedApplication, Opportunity, Student
+
+# Tuning for Recommender.recommend
+TOP_N = 10
+RECENT_PER_DOMAIN = 100
+DOMAIN_BONUS = 2.0
+RECENCY_WEIGHT = 1.0
+HALF_LIFE_DAYS = 30
+# Tokens found in more than this share of opportunities are not used to find
+# candidates (they would pull in most of the table for almost no signal)
+MAX_TOKEN_SHARE = 0.5
+CACHE_SIZE = 10_000
+# Applications made by other processes are not in the change log, so this
+# bounds how long a result can still list an opportunity already applied to
+CACHE_SECONDS = 300
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or our "
+    "s the their this to with who will".split()
+)
+
+# What the home page renders for a recommendation. Cached per student, so a
+# page view needs only the change log check once the entry exists.
+Recommendation = namedtuple(
+    "Recommendation", "id title university domain posted_date description score matched"
+)
+
+
+def tokenize(text: Optional[str]) -> set:
+    """Lowercased word tokens of `text`, minus stopwords and single characters."""
+    if not text:
+        return set()
+    return {
+        token for token in split_words(text)
+        if len(token) > 1 and token not in STOPWORDS
+    }
+
+
+def student_tokens(student: Student) -> set:
+    """Skills are the main signal; the bio adds context words."""
+    return tokenize(student.skills) | tokenize(student.bio)
+
+
+def _index_rows(rows, postings: dict, recent: dict, meta: dict) -> None:
+    touched = set()
+    for oid, title, description, domain, posted_date in rows:
+        meta[oid] = (domain, posted_date.toordinal())
+        for token in tokenize(title) | tokenize(description):
+            postings.setdefault(token, set()).add(oid)
+        recent.setdefault(domain, []).append((posted_date.toordinal(), oid))
+        touched.add(domain)
+    for domain in touched:
+        recent[domain] = heapq.nlargest(RECENT_PER_DOMAIN, recent[domain])
+
+
+class Recommender(LogFollower):
+    """
+    In-memory indexes over opportunities plus a per-student result cache.
+
+    `_postings` maps each title/description token to the ids containing it,
+    and `_recent` keeps the RECENT_PER_DOMAIN newest ids of each domain.
+    A student's candidates are the postings of their skill tokens plus the
+    newest opportunities in their domain; each is scored by the IDF-weighted
+    token overlap, a bonus for the student's domain and an exponential
+    recency decay. Results are cached per student and dropped when that
+    student applies or edits their profile; new or changed opportunities
+    clear the whole cache since they can outrank anyone's current picks.
+
+    Opportunity and profile changes are read from the change log (see
+    changes.py) before each recommendation, whichever process made them.
+    """
+
+    tables = ("opportunities", "students")
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._postings: Dict[str, set] = {}
+        self._recent: Dict[str, list] = {}
+        self._meta: Dict[int, tuple] = {}  # id -> (domain, posted ordinal)
+        self._cache: "OrderedDict[int, tuple]" = OrderedDict()
+        # Bumped whenever cached results may have gone stale, so a result
+        # computed concurrently with an invalidation is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ---- index maintenance ----
+
+    def _load(self, db) -> None:
+        postings, recent, meta = {}, {}, {}
+        rows = db.execute(
+            select(Opportunity.id, Opportunity.title, Opportunity.description,
+                   Opportunity.domain, Opportunity.posted_date)
+            .execution_options(yield_per=5000)
+        )
+        for chunk in rows.partitions():
+            _index_rows(chunk, postings, recent, meta)
+        with self._lock:
+            self._postings, self._recent, self._meta = postings, recent, meta
+            self._clear()
+
+    def _replay(self, db, table: str, ids) -> None:
+        if table == "students":
+            self.forget(ids)
+            return
+        rows = db.connection().execute(
+            select(Opportunity.id, Opportunity.title, Opportunity.description,
+                   Opportunity.domain, Opportunity.posted_date)
+            .where(Opportunity.id.in_(ids))
+        ).all()
+        with self._lock:
+            # Changed rows are indexed afresh; deleted ones just go
+            self._remove({oid for oid in ids if oid in self._meta})
+            _index_rows(rows, self._postings, self._recent, self._meta)
+            self._clear()
+
+    def _remove(self, ids: set) -> None:
+        if not ids:
+            return
+        for oid in ids:
+            del self._meta[oid]
+        for postings in self._postings.values():
+            postings -= ids
+        for domain, recent in self._recent.items():
+            self._recent[domain] = [entry for entry in recent if entry[1] not in ids]
+
+    def forget(self, student_ids: Iterable[int]) -> None:
+        """Drop cached results for these students."""
+        with self._lock:
+            for sid in student_ids:
+                self._cache.pop(sid, None)
+            self._generation += 1
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        self._cache.clear()
+        self._generation += 1
+
+    # ---- queries ----
+
+    def _score(self, tokens: set, domain: str, exclude: set, limit: int):
+        today = date.today().toordinal()
+        total = max(1, len(self._meta))
+        scores: Dict[int, float] = {}
+        matched: Dict[int, list] = {}
+        for token in tokens:
+            postings = self._postings.get(token)
+            if not postings or len(postings) > MAX_TOKEN_SHARE * total:
+                continue
+            weight = math.log(1 + total / len(postings))
+            for oid in postings:
+                scores[oid] = scores.get(oid, 0.0) + weight
+                matched.setdefault(oid, []).append(token)
+        for _, oid in self._recent.get(domain, ()):
+            scores.setdefault(oid, 0.0)
+
+        ranked = []
+        for oid, overlap in scores.items():
+            if oid in exclude:
+                continue
+            opp_domain, posted = self._meta[oid]
+            age = max(0, today - posted)
+            score = (overlap + (DOMAIN_BONUS if opp_domain == domain else 0.0)
+                     + RECENCY_WEIGHT * 0.5 ** (age / HALF_LIFE_DAYS))
+            # Newer, then lower id, wins ties
+            ranked.append((score, posted, -oid))
+        best = heapq.nlargest(limit, ranked)
+        return [(-neg_id, score, sorted(matched.get(-neg_id, ()))) for score, _, neg_id in best]
+
+    def recommend(self, db, student: Student, limit: int = 3) -> List[Recommendation]:
+        """Up to `limit` opportunities for `student`, excluding ones they applied to."""
+        self.ensure_current(db)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(student.id)
+            if entry is not None and now - entry[0] < CACHE_SECONDS:
+                self._cache.move_to_end(student.id)
+                self.hits += 1
+                return list(entry[1][:limit])
+            self.misses += 1
+            generation = self._generation
+
+        applied = set(db.execute(
+            select(Application.opportunity_id).where(Application.student_id == student.id)
+            .union_all(select(ArchivedApplication.opportunity_id)
+                       .where(ArchivedApplication.student_id == student.id))
+        ).scalars())
+        with self._lock:
+            picks = self._score(student_tokens(student), student.domain_interest, applied,
+                                max(limit, TOP_N))
+        rows = {}
+        if picks:
+            rows = {row.id: row for row in db.execute(
+                select(Opportunity.id, Opportunity.title, Opportunity.university,
+                       Opportunity.domain, Opportunity.posted_date, Opportunity.description)
+                .where(Opportunity.id.in_([oid for oid, _, _ in picks]))
+            )}
+        results = tuple(
+            Recommendation(
+                oid, rows[oid].title, rows[oid].university, rows[oid].domain,
+                rows[oid].posted_date, (rows[oid].description or "")[:100],
+                round(score, 3), tuple(tokens)
+            )
+            for oid, score, tokens in picks if oid in rows
+        )
+        with self._lock:
+            if generation == self._generation:
+                self._cache[student.id] = (now, results)
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return list(results[:limit])
+
+
+recommender = Recommender()
+
+
+# A student's cached results are dropped once their new or withdrawn
+# application commits. Applications written elsewhere age out of the cache.
+
+@event.listens_for(Session, "after_flush")
+def _collect_recommendation_changes(session, flush_context):
+    students = session.info.setdefault("recommendation_students", set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Application):
+            students.add(obj.student_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_recommendation_changes(session):
+    students = session.info.pop("recommendation_students", None)
+    if students:
+        recommender.forget(students)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_recommendation_changes(session):
+    session.info.pop("recommendation_students", None)
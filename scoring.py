@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+
+from helpers import INCOSCORE_WEIGHTS
+from models import Student
+
+METRICS = tuple(INCOSCORE_WEIGHTS)
+DEFAULT_WEIGHTS = np.array([INCOSCORE_WEIGHTS[m] for m in METRICS], dtype=np.float64)
+
+# Loaded metric matrices are reused for this long before being re-read
+CACHE_SECONDS = 60
+
+
+def weight_vector(weights: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Weights in METRICS order; None means the production InCoScore weights."""
+    if weights is None:
+        return DEFAULT_WEIGHTS
+    if isinstance(weights, dict):
+        weights = [weights.get(m, 0.0) for m in METRICS]
+    vector = np.asarray(weights, dtype=np.float64)
+    if vector.shape != (len(METRICS),):
+        raise ValueError(f"expected {len(METRICS)} weights ({', '.join(METRICS)})")
+    return vector
+
+
+def parse_weights(raw: str) -> np.ndarray:
+    """Parse "2,3,4,0.1" (METRICS order) into a weight vector."""
+    try:
+        return weight_vector([float(part) for part in raw.split(",")])
+    except ValueError as exc:
+        raise ValueError(f"invalid weights {raw!r}: {exc}") from None
+
+
+class StudentMetrics:
+    """
+    The four InCoScore metric columns for every student as NumPy arrays.
+
+    `ids` is an int64 vector and `values` an (n, 4) float64 matrix in
+    METRICS order, so scoring any weighting is one matrix-vector product
+    and needs no ORM objects.
+    """
+
+    def __init__(self, ids: np.ndarray, values: np.ndarray):
+        self.ids = ids
+        self.values = values
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, db, chunk_size: int = 50_000) -> "StudentMetrics":
+        """Read the metric columns straight into preallocated arrays, chunk by chunk."""
+        total = db.execute(select(func.count()).select_from(Student)).scalar_one()
+        ids = np.empty(total, dtype=np.int64)
+        values = np.empty((total, len(METRICS)), dtype=np.float64)
+        columns = [func.coalesce(getattr(Student, m), 0) for m in METRICS]
+        result = db.execute(
+            select(Student.id, *columns).order_by(Student.id).execution_options(yield_per=chunk_size)
+        )
+        filled = 0
+        for rows in result.partitions():
+            block = np.array(rows, dtype=np.float64)
+            end = min(filled + len(block), total)
+            block = block[:end - filled]
+            ids[filled:end] = block[:, 0]
+            values[filled:end] = block[:, 1:]
+            filled = end
+        return cls(ids[:filled], values[:filled])
+
+    def scores(self, weights=None) -> np.ndarray:
+        return np.round(self.values @ weight_vector(weights), 2)
+
+    def top_k(self, k: int, weights=None) -> List[Tuple[int, float]]:
+        """(student_id, score) for the k best students, ties broken by lower id."""
+        return top_k(self.ids, self.scores(weights), k)
+
+
+def top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """
+    The k highest scores without sorting the whole array.
+
+    argpartition finds the k-th best score in O(n); every score at or above
+    it (ties included) is then sorted, which keeps the result identical to
+    a full sort by (score desc, id asc).
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return []
+    if k < n:
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((ids[candidates], -scores[candidates]))[:k]
+    chosen = candidates[order]
+    return [(int(i), float(s)) for i, s in zip(ids[chosen], scores[chosen])]
+
+
+_cache_lock = threading.Lock()
+_cached: Optional[StudentMetrics] = None
+
+
+def cached_metrics(db, max_age: float = CACHE_SECONDS) -> StudentMetrics:
+    """Shared StudentMetrics, reloaded once it is older than `max_age` seconds."""
+    global _cached
+    with _cache_lock:
+        if _cached is None or time.time() - _cached.loaded_at > max_age:
+            _cached = StudentMetrics.load(db)
+        return _cached
+
+
+def compare_weightings(db, weights, k: int = 10) -> Dict:
+    """
+    Top-k under alternate `weights` next to the production ranking.
+
+    Used to A/B a new weighting before changing INCOSCORE_WEIGHTS: reports
+    both top-k lists and how many students they share.
+    """
+    metrics = cached_metrics(db)
+    current = metrics.top_k(k)
+    candidate = metrics.top_k(k, weights)
+    shared = {sid for sid, _ in current} & {sid for sid, _ in candidate}
+    return {
+        "weights": dict(zip(METRICS, weight_vector(weights).tolist())),
+        "students": len(metrics),
+        "current": [{"student_id": sid, "score": score} for sid, score in current],
+        "candidate": [{"student_id": sid, "score": score} for sid, score in candidate],
+        "overlap": len(shared),
+    }
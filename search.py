@@ -0,0 +1,100 @@
+import re
+from typing import Optional
+
+from sqlalchemy import Float, Integer, text
+
+FTS_TABLE = "opportunities_fts"
+
+# bm25() column weights, in the same order as the FTS columns below.
+# A hit in the title counts for more than one buried in the description.
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, university,
+        content='opportunities', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS opportunities_fts_ai AFTER INSERT ON opportunities BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, university)
+        VALUES (new.id, new.title, new.description, new.university);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS opportunities_fts_ad AFTER DELETE ON opportunities BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, university)
+        VALUES ('delete', old.id, old.title, old.description, old.university);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS opportunities_fts_au
+    AFTER UPDATE OF title, description, university ON opportunities BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, university)
+        VALUES ('delete', old.id, old.title, old.description, old.university);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, university)
+        VALUES (new.id, new.title, new.description, new.university);
+    END
+    """,
+]
+
+
+def create_search_index(conn) -> None:
+    """
+    Create the FTS5 shadow index over opportunities and its sync triggers.
+
+    The index is an external-content table, so it stores only the inverted
+    index; the triggers keep it in step with every INSERT, UPDATE and DELETE
+    on `opportunities`, including raw SQL writes that bypass the ORM.
+    Rows that existed before the index was created are indexed on first run.
+    Runs on the caller's connection, inside its transaction.
+    """
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first() is not None
+    for statement in _SCHEMA:
+        conn.execute(text(statement))
+    if not exists:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_expression(search: str) -> Optional[str]:
+    """
+    Turn free-form user input into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term (`"mach"*`), and all terms must
+    match. Quoting keeps FTS5 query syntax in the input from being
+    interpreted. Returns None when the input has no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def ranked_matches(search: str):
+    """
+    Subquery of (opportunity_id, rank) for opportunities matching `search`.
+
+    Lower rank is better, so callers join against it and order by
+    `rank` ascending. Returns None when the input has no searchable words.
+    """
+    match = build_match_expression(search)
+    if match is None:
+        return None
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    return (
+        text(
+            f"SELECT rowid AS opportunity_id, bm25({FTS_TABLE}, {weights}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        )
+        .bindparams(match=match)
+        .columns(opportunity_id=Integer, rank=Float)
+        .subquery("search_matches")
+    )
@@ -0,0 +1,177 @@
+from datetime import date
+
+from database import SessionLocal
+from helpers import classify_opportunity
+from models import Opportunity, Student
+
+
+def seed_database() -> bool:
+    """Seed an empty database with sample data. Returns False if it had data."""
+    db = SessionLocal()
+    try:
+        # Check if data already exists
+        if db.query(Opportunity).first() is not None:
+            return False
+
+        # Seed Ivy League opportunities with auto-classified domains
+        opportunity_data = [
+            {
+                "title": "AI Research Fellowship",
+                "description": "Join Harvard's cutting-edge AI research lab to work on machine learning and neural networks.",
+                "university": "Harvard",
+                "posted_date": date(2026, 2, 15)
+            },
+            {
+                "title": "Data Science Summer Internship",
+                "description": "Yale's Data Science Institute offers hands-on experience with big data analytics.",
+                "university": "Yale",
+                "posted_date": date(2026, 2, 10)
+            },
+            {
+                "title": "Legal Policy Research Program",
+                "description": "Princeton's law and policy center seeks students for legal research and policy analysis.",
+                "university": "Princeton",
+                "posted_date": date(2026, 2, 8)
+            },
+            {
+                "title": "Biomedical Research Assistant",
+                "description": "Columbia's biomedical center needs research assistants for clinical health studies.",
+                "university": "Columbia",
+                "posted_date": date(2026, 2, 5)
+            },
+            {
+                "title": "Robotics Engineering Fellowship",
+                "description": "Penn's robotics lab offers engineering and hardware development opportunities.",
+                "university": "UPenn",
+                "posted_date": date(2026, 1, 28)
+            },
+            {
+                "title": "Quantum Computing Research",
+                "description": "MIT's quantum computing lab seeks students for quantum algorithm and quantum machine learning research.",
+                "university": "MIT",
+                "posted_date": date(2026, 2, 12)
+            },
+            {
+                "title": "Constitutional Law Clinic",
+                "description": "Stanford Law School invites students to participate in constitutional law litigation and legal advocacy.",
+                "university": "Stanford",
+                "posted_date": date(2026, 2, 1)
+            },
+            {
+                "title": "Neuroscience Research Fellowship",
+                "description": "Brown's neuroscience department offers clinical brain research and cognitive science studies.",
+                "university": "Brown",
+                "posted_date": date(2026, 1, 25)
+            },
+            {
+                "title": "Sustainable Engineering Initiative",
+                "description": "Cornell's engineering school focuses on renewable energy and sustainable infrastructure development.",
+                "university": "Cornell",
+                "posted_date": date(2026, 1, 20)
+            },
+            {
+                "title": "Healthcare Informatics Program",
+                "description": "Dartmouth's medical school offers healthcare data analytics and medical AI research opportunities.",
+                "university": "Dartmouth",
+                "posted_date": date(2026, 1, 15)
+            }
+        ]
+        
+        opportunities = [
+            Opportunity(
+                title=data["title"],
+                description=data["description"],
+                university=data["university"],
+                domain=classify_opportunity(data["description"]),
+                posted_date=data["posted_date"]
+            )
+            for data in opportunity_data
+        ]
+
+        # Seed students with different metrics
+        students = [
+            Student(
+                name="Alice Chen",
+                email="alice@university.edu",
+                domain_interest="AI",
+                skills="Python, TensorFlow, PyTorch, Machine Learning",
+                bio="AI enthusiast passionate about neural networks and deep learning research.",
+                hackathons=5,
+                internships=2,
+                research_papers=1,
+                coding_score=92.5
+            ),
+            Student(
+                name="Bob Martinez",
+                email="bob@university.edu",
+                domain_interest="Law",
+                skills="Legal Research, Policy Analysis, Public Speaking",
+                bio="Aspiring legal scholar interested in tech policy and intellectual property.",
+                hackathons=3,
+                internships=1,
+                research_papers=0,
+                coding_score=85.0
+            ),
+            Student(
+                name="Carol Williams",
+                email="carol@university.edu",
+                domain_interest="Biomedical",
+                skills="R, SPSS, Clinical Research, Data Analysis",
+                bio="Pre-med student focused on biomedical informatics and clinical studies.",
+                hackathons=2,
+                internships=3,
+                research_papers=3,
+                coding_score=88.0
+            ),
+            Student(
+                name="David Park",
+                email="david@university.edu",
+                domain_interest="Engineering",
+                skills="C++, MATLAB, CAD, Robotics, Embedded Systems",
+                bio="Mechanical engineering student with a passion for robotics and automation.",
+                hackathons=6,
+                internships=2,
+                research_papers=2,
+                coding_score=90.0
+            ),
+            Student(
+                name="Elena Rodriguez",
+                email="elena@university.edu",
+                domain_interest="AI",
+                skills="Python, NLP, Computer Vision, Deep Learning",
+                bio="Graduate researcher specializing in natural language processing and AI ethics.",
+                hackathons=4,
+                internships=3,
+                research_papers=5,
+                coding_score=95.0
+            ),
+            Student(
+                name="Frank Thompson",
+                email="frank@university.edu",
+                domain_interest="Biomedical",
+                skills="Biology, Chemistry, Lab Techniques, Medical Research",
+                bio="Pre-med student interested in pharmaceutical research and drug discovery.",
+                hackathons=1,
+                internships=2,
+                research_papers=2,
+                coding_score=78.0
+            ),
+            Student(
+                name="Grace Liu",
+                email="grace@university.edu",
+                domain_interest="Law",
+                skills="Constitutional Law, International Law, Debate, Writing",
+                bio="Law student focused on human rights and international policy.",
+                hackathons=2,
+                internships=4,
+                research_papers=1,
+                coding_score=82.0
+            )
+        ]
+
+        db.add_all(opportunities)
+        db.add_all(students)
+        db.commit()
+        return True
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+import threading
+import time
+
+from sqlalchemy import event, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Opportunity, Student, Application, Post, ArchivedApplication, ArchivedPost
+
+# Full recount interval. Between recounts the snapshot is kept current by
+# incremental updates; the recount corrects drift from writes made by other
+# processes (e.g. a CLI import).
+MAX_AGE_SECONDS = 600
+
+_COUNTED = {
+    Opportunity: "opportunities",
+    Student: "students",
+    Application: "applications",
+    Post: "posts",
+}
+
+
+def count_all(db) -> dict:
+    """
+    Every dashboard counter in one statement.
+
+    Opportunities are grouped by domain (their total is the sum of the
+    groups); the other tables contribute one row each. Applications and
+    posts include those moved to the archive (see archive.py).
+    """
+    query = union_all(
+        select(literal("opportunities"), Opportunity.domain, func.count()).group_by(Opportunity.domain),
+        select(literal("students"), null(), func.count()).select_from(Student),
+        select(literal("applications"), null(), func.count()).select_from(Application),
+        select(literal("posts"), null(), func.count()).select_from(Post),
+        select(literal("applications"), null(), func.count()).select_from(ArchivedApplication),
+        select(literal("posts"), null(), func.count()).select_from(ArchivedPost),
+    )
+    counts = {name: 0 for name in _COUNTED.values()}
+    domains = {}
+    for name, domain, n in db.execute(query):
+        counts[name] += n
+        if domain is not None:
+            domains[domain] = n
+    counts["domains"] = domains
+    return counts
+
+
+class StatsSnapshot:
+    """
+    In-memory copy of the dashboard counters.
+
+    Reading it costs nothing; commits that add opportunities, students,
+    applications or posts bump it in place. Once it is older than
+    MAX_AGE_SECONDS a full recount runs in a background thread while the
+    current numbers keep being served.
+    """
+
+    def __init__(self, max_age: float = MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._counts = None
+        self._computed_at = 0.0
+        self._updates_since = 0
+        self._refreshing = False
+
+    def refresh(self, db) -> None:
+        counts = count_all(db)
+        with self._lock:
+            self._counts = counts
+            self._computed_at = time.time()
+            self._updates_since = 0
+
+    def _refresh_in_background(self) -> None:
+        db = SessionLocal()
+        try:
+            self.refresh(db)
+        finally:
+            with self._lock:
+                self._refreshing = False
+            db.close()
+
+    def get(self, db) -> dict:
+        """
+        Current counters plus staleness information.
+
+        `age_seconds` is the time since the last full recount and
+        `updates_since` the number of incremental changes applied on top.
+        """
+        if self._counts is None:
+            self.refresh(db)
+        with self._lock:
+            age = time.time() - self._computed_at
+            if age > self.max_age and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+            return {
+                **{k: v for k, v in self._counts.items() if k != "domains"},
+                "domains": dict(self._counts["domains"]),
+                "as_of": self._computed_at,
+                "age_seconds": age,
+                "updates_since": self._updates_since,
+            }
+
+    def record(self, name: str, n: int = 1, domain: str = None) -> None:
+        """Apply a committed change of `n` rows to counter `name`."""
+        with self._lock:
+            if self._counts is None:
+                return
+            self._counts[name] += n
+            if domain is not None:
+                domains = self._counts["domains"]
+                domains[domain] = domains.get(domain, 0) + n
+                if domains[domain] <= 0:
+                    del domains[domain]
+            self._updates_since += 1
+
+    def invalidate(self) -> None:
+        """Force a full recount on the next read."""
+        with self._lock:
+            self._counts = None
+
+
+stats = StatsSnapshot()
+
+
+# ORM writes update the snapshot once their transaction commits. Bulk Core
+# inserts bypass the session and must call stats.record() themselves.
+
+@event.listens_for(Session, "after_flush")
+def _collect_counted_rows(session, flush_context):
+    pending = session.info.setdefault("stats_changes", [])
+    for objects, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            name = _COUNTED.get(type(obj))
+            if name:
+                domain = obj.domain if name == "opportunities" else None
+                pending.append((name, sign, domain))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_counted_rows(session):
+    for name, sign, domain in session.info.pop("stats_changes", ()):
+        stats.record(name, sign, domain)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_counted_rows(session):
+    session.info.pop("stats_changes", None)
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+import anyio
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import select
+
+from database import POOL_SIZE
+from models import Opportunity, Student
+
+logger = logging.getLogger(__name__)
+
+# Listings longer than this many rows are streamed rather than rendered in
+# one piece. Streamed pages bypass the response cache (see cache.py), so the
+# common short listings keep being served from it.
+STREAM_THRESHOLD = int(os.environ.get("STREAM_THRESHOLD", "500"))
+# ORM rows fetched per round trip while a streamed page renders
+STREAM_BATCH_SIZE = 500
+# Rendered text is sent in pieces of about this size, not per template node
+CHUNK_BYTES = 16 * 1024
+# Rows per read (and per NDJSON chunk) in the exports
+EXPORT_BATCH_SIZE = 1000
+# Each stream holds a read connection until its last byte is sent. At most
+# this many run at once, so streams leave the rest of the read pool to
+# ordinary requests; more get a 503 with Retry-After.
+STREAM_LIMIT = int(os.environ.get("STREAM_LIMIT", max(1, POOL_SIZE // 2)))
+# A client that takes longer than this to accept one chunk is dropped, and
+# its connection returned to the pool
+SEND_TIMEOUT_SECONDS = float(os.environ.get("STREAM_SEND_TIMEOUT", "30"))
+
+stream_slots = threading.BoundedSemaphore(STREAM_LIMIT)
+
+
+def stream_busy() -> PlainTextResponse:
+    """The answer when every stream slot is taken."""
+    return PlainTextResponse("Too many streams in progress, retry shortly.", status_code=503,
+                             headers={"Retry-After": "1"})
+
+
+def _chunks(pieces: Iterable[str], size: int = CHUNK_BYTES) -> Iterator[bytes]:
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+class _Closable:
+    """
+    Iterates `chunks` until close(), which closes it and calls `on_close`
+    once. A chunk being produced in a worker thread is finished first, so
+    the generator and its session are never closed under a running query.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], on_close: Optional[Callable[[], None]] = None):
+        self._chunks = chunks
+        self._on_close = on_close
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                chunk = next(self._chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._chunks.close()
+            if self._on_close is not None:
+                self._on_close()
+
+
+class LimitedStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that takes one of the STREAM_LIMIT slots while it
+    sends, and drops a client that does not accept a chunk within
+    SEND_TIMEOUT_SECONDS.
+
+    However the response ends (sent, timed out, client gone or no slot
+    free) the chunk generator is closed and `on_close` called, which is
+    where the caller's session is closed. A caller that must know it has a
+    slot before opening that session takes it itself and passes
+    `slot_held`; the response releases it all the same.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], on_close: Optional[Callable[[], None]] = None,
+                 media_type: Optional[str] = None, slot_held: bool = False):
+        self._stream = _Closable(chunks, on_close)
+        self._slot_held = slot_held
+        super().__init__(iter(self._stream), media_type=media_type)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not self._slot_held and not stream_slots.acquire(blocking=False):
+            await anyio.to_thread.run_sync(self._stream.close)
+            await stream_busy()(scope, receive, send)
+            return
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(self._stream.close)
+            stream_slots.release()
+
+    async def stream_response(self, send) -> None:
+        async def send_in_time(message):
+            with anyio.fail_after(SEND_TIMEOUT_SECONDS):
+                await send(message)
+        try:
+            await super().stream_response(send_in_time)
+        except TimeoutError:
+            # Leaves the response incomplete, so the server closes the connection
+            logger.warning("dropped a client that did not read for %ss", SEND_TIMEOUT_SECONDS)
+
+
+def stream_template(templates, name: str, context: dict, db=None,
+                    slot_held: bool = False) -> StreamingResponse:
+    """
+    Render template `name` incrementally with Template.generate().
+
+    The first bytes go out once the page head has rendered, and memory stays
+    flat however long the listing: pass rows as a Query with yield_per()
+    rather than a list. The query's session `db` must outlive the handler,
+    so it is one of the caller's own (not a request dependency, which
+    FastAPI closes before the body is sent) and is closed here once the
+    response ends. Pass `slot_held` if the caller already took one of
+    `stream_slots` for it.
+    """
+    template = templates.get_template(name)
+    return LimitedStreamingResponse(_chunks(template.generate(context)),
+                                    db.close if db is not None else None,
+                                    media_type="text/html; charset=utf-8", slot_held=slot_held)
+
+
+def ndjson_lines(engine, statement, rank: bool = False,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    One JSON object per row of `statement`, `batch_size` rows per chunk.
+
+    Rows are read `batch_size` at a time on a connection held for the whole
+    export, so memory does not grow with the table. With `rank`, each
+    object starts with its 1-based position.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(statement)
+        keys = list(result.keys())
+        position = 0
+        for rows in result.partitions():
+            lines = []
+            for row in rows:
+                record = dict(zip(keys, row))
+                if rank:
+                    position += 1
+                    record = {"rank": position, **record}
+                lines.append(json.dumps(record, default=str))
+            yield ("\n".join(lines) + "\n").encode()
+
+
+def ndjson_response(engine, statement, rank: bool = False) -> StreamingResponse:
+    return LimitedStreamingResponse(ndjson_lines(engine, statement, rank), media_type="application/x-ndjson")
+
+
+def opportunity_export(domain: Optional[str] = None):
+    """
+    Every opportunity in id order, or those in `domain` in posting order.
+    Both orders are index order, so neither export sorts.
+    """
+    statement = select(
+        Opportunity.id, Opportunity.title, Opportunity.description, Opportunity.university,
+        Opportunity.domain, Opportunity.posted_date, Opportunity.application_count
+    )
+    if domain:
+        # Off ix_opportunities_domain_posted_date
+        return statement.where(Opportunity.domain == domain).order_by(Opportunity.posted_date, Opportunity.id)
+    return statement.order_by(Opportunity.id)
+
+
+def leaderboard_export():
+    """Every student in leaderboard order, off ix_students_incoscore_id."""
+    return select(
+        Student.id, Student.name, Student.domain_interest, Student.incoscore,
+        Student.application_count
+    ).order_by(Student.incoscore.desc(), Student.id)
@@ -0,0 +1,203 @@
+import heapq
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from changes import LogFollower
+from classifier import split_words
+from models import Student
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Index entries looked at per round trip when extra query words filter some out
+SCAN_BATCH = 200
+# Adds larger than this (bulk ingestion) are merged in rather than inserted
+MERGE_THRESHOLD = 1000
+
+
+def _name_words(name: Optional[str]) -> Set[str]:
+    return set(split_words(name or ""))
+
+
+class NameIndex(LogFollower):
+    """
+    Sorted (word, id) pairs over student names for prefix lookups.
+
+    Every word of a name is indexed, so "che" finds "Alice Chen". Words and
+    ids are kept in two parallel lists sorted by (word, id): a lookup is a
+    bisect to the first word >= the prefix and a walk forward while words
+    still start with it, so it costs O(log n + page) however many students
+    there are. Words are interned and ids packed in an array, which keeps
+    the index to a few tens of bytes per name.
+
+    It is built from one pass over (id, name), normally in the background
+    at startup (`warm`), and follows the change log (see changes.py), so
+    students added by `manage.py`, another worker or raw SQL are found at
+    the next lookup. Replaying a change indexes the student's current name;
+    adds are idempotent. Words of a former name, or of a deleted student,
+    stay until the next rebuild, and lookups skip them by checking each
+    candidate's actual name.
+    """
+
+    tables = ("students",)
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._words: List[str] = []
+        self._ids = array("q")
+
+    def _load(self, db) -> None:
+        words, ids = [], array("q")
+        intern = sys.intern
+        # Core rows straight off the connection: no ORM row processing
+        rows = db.connection().execute(select(Student.id, Student.name).order_by(Student.id))
+        for sid, name in rows:
+            for word in _name_words(name):
+                words.append(intern(word))
+                ids.append(sid)
+        # Rows arrive in id order and the sort is stable, so sorting on the
+        # word alone leaves equal words in id order
+        order = sorted(range(len(words)), key=words.__getitem__)
+        with self._lock:
+            self._words = [words[i] for i in order]
+            self._ids = array("q", [ids[i] for i in order])
+
+    def _replay(self, db, table: str, ids) -> None:
+        rows = db.connection().execute(select(Student.id, Student.name).where(Student.id.in_(ids))).all()
+        with self._lock:
+            self._add(rows)
+
+    def _find(self, word: str, sid: int) -> int:
+        lo = bisect_left(self._words, word)
+        hi = bisect_right(self._words, word, lo)
+        return bisect_left(self._ids, sid, lo, hi)
+
+    def _has(self, i: int, word: str, sid: int) -> bool:
+        return i < len(self._ids) and self._ids[i] == sid and self._words[i] == word
+
+    def _add(self, rows: Iterable[Tuple[int, str]]) -> None:
+        pairs = sorted((sys.intern(word), sid) for sid, name in rows for word in _name_words(name))
+        if len(pairs) > MERGE_THRESHOLD:
+            # One merge pass instead of an O(n) insert per word
+            words, ids = [], array("q")
+            for word, sid in heapq.merge(zip(self._words, self._ids), pairs):
+                if not words or words[-1] != word or ids[-1] != sid:
+                    words.append(word)
+                    ids.append(sid)
+            self._words, self._ids = words, ids
+            return
+        for word, sid in pairs:
+            i = self._find(word, sid)
+            if not self._has(i, word, sid):
+                self._words.insert(i, word)
+                self._ids.insert(i, sid)
+
+    def scan(self, prefix: str, after: Optional[Tuple[str, int]] = None,
+             limit: int = SCAN_BATCH) -> List[Tuple[str, int]]:
+        """Up to `limit` (word, id) entries whose word starts with `prefix`, after `after`."""
+        with self._lock:
+            if after is None:
+                i = bisect_left(self._words, prefix)
+            else:
+                word, sid = after
+                lo = bisect_left(self._words, word)
+                hi = bisect_right(self._words, word, lo)
+                i = bisect_right(self._ids, sid, lo, hi)
+            entries = []
+            while i < len(self._words) and len(entries) < limit and self._words[i].startswith(prefix):
+                entries.append((self._words[i], self._ids[i]))
+                i += 1
+            return entries
+
+    def count(self, prefix: str) -> int:
+        """Number of entries whose word starts with `prefix`."""
+        with self._lock:
+            start = bisect_left(self._words, prefix)
+            end = bisect_left(self._words, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+            return end - start
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+
+name_index = NameIndex()
+
+
+def encode_cursor(word: str, sid: int) -> str:
+    # split_words() strips punctuation, so ":" never appears in a word
+    return f"{word}:{sid}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not cursor:
+        return None
+    word, _, sid = cursor.rpartition(":")
+    if not sid.isdigit():
+        raise ValueError("invalid cursor")
+    return word, int(sid)
+
+
+def _matches(name: str, words: List[str]) -> bool:
+    name_words = split_words(name or "")
+    return all(any(nw.startswith(w) for nw in name_words) for w in words)
+
+
+def find_students(db, query: str = "", limit: int = PAGE_SIZE, cursor: Optional[str] = None):
+    """
+    One page of students whose name has a word starting with each word of
+    `query`, ordered by the matched word. Returns (students, next_cursor).
+
+    The query word with the fewest index entries is looked up in the index;
+    any other words are checked against the names of the candidates, which
+    are loaded by primary key one batch at a time. An empty query pages
+    through students by id. Raises ValueError on a malformed cursor.
+    """
+    words = split_words(query or "")
+    if not words:
+        after = int(cursor) if cursor else 0
+        rows = (db.query(Student).filter(Student.id > after)
+                .order_by(Student.id).limit(limit + 1).all())
+        return rows[:limit], (str(rows[limit - 1].id) if len(rows) > limit else None)
+
+    name_index.ensure_current(db)
+    position = decode_cursor(cursor)
+    if position is None:
+        key = min(words, key=name_index.count)
+    else:
+        # Continue on the word the first page used, even if counts moved since
+        keys = [w for w in words if position[0].startswith(w)]
+        if not keys:
+            raise ValueError("cursor does not match the query")
+        key = max(keys, key=len)
+    found = []
+    while True:
+        entries = name_index.scan(key, position, max(SCAN_BATCH, limit))
+        if not entries:
+            return found, None
+        ids = {sid for _, sid in entries}
+        rows = {s.id: s for s in db.query(Student).filter(Student.id.in_(ids))}
+        for position in entries:
+            word, sid = position
+            student = rows.get(sid)
+            if student is None:
+                continue
+            # A name with two words starting with the key ("Mark Martin") is
+            # listed under the first of them only, so it never shows up twice
+            name_words = _name_words(student.name)
+            if word not in name_words or word != min(w for w in name_words if w.startswith(key)):
+                continue
+            if _matches(student.name, words):
+                found.append(student)
+                if len(found) == limit:
+                    more = name_index.scan(key, position, 1)
+                    return found, (encode_cursor(*position) if more else None)
+
+
+def student_json(student: Student) -> dict:
+    return {"id": student.id, "name": student.name,
+            "domain_interest": student.domain_interest, "incoscore": student.incoscore}
@@ -0,0 +1,166 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Tuple
+
+from database import SessionLocal
+
+# Most jobs to fold into one transaction, and how long the writer waits for
+# more jobs to arrive once it has one
+BATCH_SIZE = 64
+BATCH_WAIT_SECONDS = 0
+# Set DB_GROUP_COMMIT=0 to run every write in its own transaction instead
+GROUP_COMMIT = os.environ.get("DB_GROUP_COMMIT", "1") != "0"
+
+Job = Callable[[Any], Any]
+
+
+class WriteQueue:
+    """
+    Single writer thread that group-commits small writes.
+
+    SQLite allows one writer at a time, so concurrent request handlers
+    committing on their own mostly wait on each other's fsyncs (or fail with
+    "database is locked"). Handlers instead submit a job, a function taking
+    a Session, and block on its future. The writer drains up to BATCH_SIZE
+    queued jobs, runs them in one transaction, flushing after each, and
+    commits once; every future then resolves with its job's return value.
+
+    If any job in a batch raises, the batch is rolled back and its jobs are
+    re-run one transaction each, so a bad job fails alone. Jobs must
+    therefore be safe to re-run, and should return plain values rather than
+    ORM objects, which are expired once the batch commits.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = BATCH_SIZE,
+                 batch_wait: float = BATCH_WAIT_SECONDS, enabled: bool = GROUP_COMMIT):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.enabled = enabled
+        self._queue: "queue.Queue[Tuple[Job, Future]]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.jobs = 0
+        self.retried_batches = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Finish the queued jobs, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def submit(self, job: Job) -> Future:
+        future = Future()
+        # Run in the caller's context, so per-request metrics (see metrics.py)
+        # count the job's statements
+        job = _in_context(job, contextvars.copy_context())
+        if not self.enabled:
+            try:
+                future.set_result(self._run_alone(job))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        if self._thread is None:
+            self.start()
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job: Job, timeout: float = 30) -> Any:
+        """Submit `job` and wait for its result (or exception)."""
+        return self.submit(job).result(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: List[Tuple[Job, Future]]) -> None:
+        self.batches += 1
+        self.jobs += len(batch)
+        db = self.session_factory()
+        try:
+            results = []
+            for job, _ in batch:
+                results.append(job(db))
+                db.flush()
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            self.retried_batches += 1
+            results = None
+        finally:
+            db.close()
+
+        if results is not None:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            return
+        for job, future in batch:
+            try:
+                future.set_result(self._run_alone(job))
+            except Exception as exc:
+                future.set_exception(exc)
+
+    def _run_alone(self, job: Job) -> Any:
+        db = self.session_factory()
+        try:
+            result = job(db)
+            db.commit()
+            return result
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "jobs_per_batch": round(self.jobs / self.batches, 2) if self.batches else 0.0,
+            "retried_batches": self.retried_batches,
+            "queued": self._queue.qsize(),
+        }
+
+
+def _in_context(job: Job, context: contextvars.Context) -> Job:
+    def run(db):
+        def job_and_flush():
+            result = job(db)
+            db.flush()
+            return result
+        return context.run(job_and_flush)
+    return run
+
+
+write_queue = WriteQueue()